@@ -0,0 +1,260 @@
+"""
+Alternative routes: the k shortest loopless paths between two nodes, or a
+set of diverse alternatives.
+
+`k_shortest_paths` is Yen's algorithm with three savings over running it
+on top of `shortest_path`:
+
+* One Dijkstra search from the goal over the reversed roads gives the
+  exact distance to the goal from every node. It is the first route, and
+  it is an A* heuristic for every spur search: banning nodes and roads
+  only makes distances longer, so it stays a lower bound, and it is so
+  tight that spur searches settle little more than the spur path itself.
+  When the tree path from a spur node avoids every banned node and road it
+  is the spur path, and no search runs at all.
+* Lawler's rule: a new route only spawns spur searches from its deviation
+  node onwards, since the earlier ones were run for its parent route.
+* Lower-bound pruning: a spur search is skipped when the root cost plus
+  the distance to the goal cannot beat the candidates already in hand,
+  and the remaining searches stop at that bound.
+
+The "penalty" mode finds routes that share fewer roads: after each route,
+the cost of its roads is multiplied by a penalty factor and the search is
+repeated. Routes are still reported with their real costs.
+"""
+import bisect
+import heapq
+import math
+import time
+from collections.abc import Sequence
+from typing import Optional
+
+from helpers import Map
+from indexed_heap import IndexedMinHeap
+from search_stats import SearchStats
+from student_code import one_to_all
+
+Route = tuple[float, list[int]]
+
+# A route while it is being built: (cost, nodes, roads)
+_Path = tuple[float, tuple[int, ...], tuple[int, ...]]
+
+
+class _Searcher:
+    """
+    A* towards a fixed goal with exact goal distances as the heuristic,
+    shared by all spur searches of a query.
+    """
+
+    def __init__(self, M: Map, goal: int, to_goal: Sequence[float]) -> None:
+        self.offsets, self.targets, self.weights = M.offsets, M.targets, M.weights
+        self.goal = goal
+        self.to_goal = to_goal
+        # expanded, relaxed, pushes, decreases, summed over every search
+        self.counters = [0, 0, 0, 0]
+        self.peak_open_set = 0
+
+    def tree_path(self, source: int, banned_nodes: set[int], banned_roads: set[int]) -> Optional[_Path]:
+        # Follows the shortest-path tree towards the goal and gives up if it
+        # needs a banned node or road; the caller then runs a real search
+        offsets, targets, weights, to_goal = self.offsets, self.targets, self.weights, self.to_goal
+        nodes, roads = [source], []
+        node = source
+        while node != self.goal:
+            best_road, best_cost = -1, math.inf
+            for road in range(offsets[node], offsets[node + 1]):
+                cost = weights[road] + to_goal[targets[road]]
+                if cost < best_cost:
+                    best_road, best_cost = road, cost
+            if best_road < 0 or best_road in banned_roads or targets[best_road] in banned_nodes:
+                return None
+            roads.append(best_road)
+            node = targets[best_road]
+            nodes.append(node)
+        return sum((weights[road] for road in roads), 0.0), tuple(nodes), tuple(roads)
+
+    def search(self, source: int, banned_nodes: set[int], banned_roads: set[int], bound: float = math.inf,
+               factors: Optional[dict[int, float]] = None) -> Optional[_Path]:
+        """
+        Find the cheapest path from source to the goal avoiding banned nodes and
+        roads, with road costs multiplied by `factors`, or None if none costs
+        less than `bound`.
+        """
+        offsets, targets, weights, to_goal = self.offsets, self.targets, self.weights, self.to_goal
+        goal = self.goal
+        came_from: dict[int, int] = {}
+        g_score = {source: 0.0}
+        open_set = IndexedMinHeap()
+        open_set.push(source, to_goal[source])
+        expanded = relaxed = pushes = decreases = 0
+        peak_open_set = 1
+        found = False
+        while open_set:
+            f_score, current = open_set.pop()
+            if f_score >= bound:
+                break
+            expanded += 1
+            if current == goal:
+                found = True
+                break
+            current_g_score = g_score[current]
+            first_road, end_road = offsets[current], offsets[current + 1]
+            relaxed += end_road - first_road
+            for road in range(first_road, end_road):
+                neighbor = targets[road]
+                if neighbor in banned_nodes or road in banned_roads:
+                    continue
+                weight = weights[road]
+                if factors is not None:
+                    weight *= factors.get(road, 1.0)
+                tentative_g_score = current_g_score + weight
+                if tentative_g_score < g_score.get(neighbor, math.inf):
+                    came_from[neighbor] = road
+                    g_score[neighbor] = tentative_g_score
+                    if open_set.push_or_decrease(neighbor, tentative_g_score + to_goal[neighbor]):
+                        pushes += 1
+                        if len(open_set) > peak_open_set:
+                            peak_open_set = len(open_set)
+                    else:
+                        decreases += 1
+        counters = self.counters
+        counters[0] += expanded
+        counters[1] += relaxed
+        counters[2] += pushes + 1
+        counters[3] += decreases
+        self.peak_open_set = max(self.peak_open_set, peak_open_set)
+        if not found:
+            return None
+
+        roads = []
+        node = goal
+        while node != source:
+            road = came_from[node]
+            roads.append(road)
+            node = self._tail(road)
+        roads.reverse()
+        nodes = [source] + [targets[road] for road in roads]
+        return sum((weights[road] for road in roads), 0.0), tuple(nodes), tuple(roads)
+
+    def _tail(self, road: int) -> int:
+        # The node a road leaves, by binary search over the CSR offsets
+        return bisect.bisect_right(self.offsets, road) - 1
+
+
+def k_shortest_paths(M: Map, start: int, goal: int, k: int, mode: str = "yen", penalty: float = 1.5,
+                     stats: Optional[SearchStats] = None) -> list[Route]:
+    """
+    Find up to k alternative routes between two nodes.
+
+    Args:
+        M (Map): The map to route on; its current weights are used.
+        start (int): The starting node.
+        goal (int): The goal node.
+        k (int): The number of routes.
+        mode (str): "yen" for the k shortest loopless paths, or "penalty" for
+            diverse alternatives that share fewer roads.
+        penalty (float): In "penalty" mode, the factor applied to the cost of the
+            roads of every route found, for the following searches.
+        stats (Optional[SearchStats]): If given, receives the counters of all searches.
+
+    Returns:
+        list[Route]: Up to k (cost, path) pairs, cheapest first; fewer if the
+            map does not have k distinct loopless routes.
+    """
+    if mode not in ("yen", "penalty"):
+        raise ValueError(f"unknown alternatives mode {mode!r}")
+    if mode == "penalty" and penalty <= 1.0:
+        raise ValueError("penalty must be greater than 1")
+    began = time.perf_counter() if stats is not None else 0.0
+    if k <= 0:
+        return []
+    to_goal = one_to_all(*M.reverse(), goal)
+    searcher = _Searcher(M, goal, to_goal)
+    searched = time.perf_counter() if stats is not None else 0.0
+
+    if to_goal[start] == math.inf:
+        paths = []
+    elif mode == "yen":
+        paths = _yen(searcher, start, k)
+    else:
+        paths = _penalized(M, searcher, start, k, penalty)
+
+    if stats is not None:
+        expanded, relaxed, pushes, decreases = searcher.counters
+        stats.record(expanded, relaxed, pushes, decreases, expanded, 0, searcher.peak_open_set,
+                     (searched - began, time.perf_counter() - searched, 0.0))
+    return [(cost, list(nodes)) for cost, nodes, _ in paths]
+
+
+def _yen(searcher: _Searcher, start: int, k: int) -> list[_Path]:
+    weights = searcher.weights
+    first = searcher.tree_path(start, set(), set())
+    if first is None:
+        first = searcher.search(start, set(), set())
+    accepted = [first]
+    deviations = [0]
+    # Candidate routes as (cost, roads, nodes, deviation index), and every route seen so far
+    candidates: list[tuple[float, tuple[int, ...], tuple[int, ...], int]] = []
+    seen = {first[2]}
+    while len(accepted) < k:
+        _, nodes, roads = accepted[-1]
+        deviation = deviations[-1]
+        root_cost = sum(weights[road] for road in roads[:deviation])
+        for index in range(deviation, len(nodes) - 1):
+            if index > deviation:
+                root_cost += weights[roads[index - 1]]
+            spur = nodes[index]
+            # Enough candidates in hand: routes through this spur can only rank below them
+            needed = k - len(accepted)
+            bound = math.inf
+            if len(candidates) >= needed:
+                bound = heapq.nsmallest(needed, candidates)[-1][0] - root_cost
+                if searcher.to_goal[spur] >= bound:
+                    continue
+            root_roads = roads[:index]
+            banned_roads = {path_roads[index] for _, _, path_roads in accepted
+                            if path_roads[:index] == root_roads}
+            banned_nodes = set(nodes[:index])
+            spur_path = searcher.tree_path(spur, banned_nodes, banned_roads)
+            if spur_path is None:
+                spur_path = searcher.search(spur, banned_nodes, banned_roads, bound)
+            if spur_path is None:
+                continue
+            spur_cost, spur_nodes, spur_roads = spur_path
+            route_roads = root_roads + spur_roads
+            if route_roads not in seen:
+                seen.add(route_roads)
+                heapq.heappush(candidates, (root_cost + spur_cost, route_roads, nodes[:index] + spur_nodes, index))
+        if not candidates:
+            break
+        cost, route_roads, route_nodes, deviation = heapq.heappop(candidates)
+        accepted.append((cost, route_nodes, route_roads))
+        deviations.append(deviation)
+    return accepted
+
+
+def _penalized(M: Map, searcher: _Searcher, start: int, k: int, penalty: float) -> list[_Path]:
+    offsets, targets = M.offsets, M.targets
+    factors: dict[int, float] = {}
+    found: list[_Path] = []
+    seen = set()
+    # Penalties only raise costs, so the goal distances stay a lower bound.
+    # Repeated routes are possible when alternatives are scarce, hence the cap
+    for _ in range(3 * k):
+        path = searcher.search(start, set(), set(), factors=factors)
+        if path is None:
+            break
+        _, nodes, roads = path
+        if roads not in seen:
+            seen.add(roads)
+            found.append(path)
+            if len(found) == k:
+                break
+        for road, (source, target) in zip(roads, zip(nodes, nodes[1:])):
+            factors[road] = factors.get(road, 1.0) * penalty
+            # Penalize the opposite direction of a two-way road too
+            for back in range(offsets[target], offsets[target + 1]):
+                if targets[back] == source:
+                    factors[back] = factors.get(back, 1.0) * penalty
+    found.sort()
+    return found
@@ -0,0 +1,55 @@
+"""
+Checks for `alternatives.k_shortest_paths` in both modes on map-40.
+
+Usage:
+    python alternatives_test.py
+"""
+import math
+import os
+
+from alternatives import k_shortest_paths
+from engines_test import path_cost
+from helpers import load_map
+from student_code import shortest_path
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def check_routes(mode: str, k: int) -> None:
+    M = load_map(os.path.join(HERE, 'map-40.pickle'))
+    for start in range(len(M)):
+        for goal in range(0, len(M), 3):
+            routes = k_shortest_paths(M, start, goal, k, mode=mode)
+            assert 1 <= len(routes) <= k, (mode, start, goal, len(routes))
+            costs = [cost for cost, _ in routes]
+            paths = [path for _, path in routes]
+            assert costs == sorted(costs), (mode, start, goal, costs)
+            assert len({tuple(path) for path in paths}) == len(paths), (mode, start, goal, "repeated route")
+            for cost, path in routes:
+                assert path[0] == start and path[-1] == goal
+                assert len(set(path)) == len(path), (mode, start, goal, "route with a loop", path)
+                assert math.isclose(cost, path_cost(M, path), abs_tol=1e-9), (mode, start, goal, cost)
+            assert paths[0] == shortest_path(M, start, goal), (mode, start, goal, paths[0])
+
+
+def test_yen() -> None:
+    check_routes("yen", 5)
+
+
+def test_yen_finds_every_route_of_a_short_list() -> None:
+    # Routes come cheapest first, so asking for more only appends routes
+    M = load_map(os.path.join(HERE, 'map-40.pickle'))
+    shorter = k_shortest_paths(M, 5, 34, 3)
+    longer = k_shortest_paths(M, 5, 34, 6)
+    assert [cost for cost, _ in shorter] == [cost for cost, _ in longer[:3]]
+
+
+def test_penalty() -> None:
+    check_routes("penalty", 4)
+
+
+if __name__ == '__main__':
+    for name, function in list(globals().items()):
+        if name.startswith('test_'):
+            function()
+    print("All tests pass!")
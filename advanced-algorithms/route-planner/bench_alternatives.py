@@ -0,0 +1,116 @@
+"""
+Benchmark `alternatives.k_shortest_paths` against Yen's algorithm run
+naively on top of an A* search with the straight-line heuristic, which
+searches again from scratch for every spur node of every route.
+
+Usage:
+    python bench_alternatives.py [--sizes 1000 10000] [--queries 10] [--k 5]
+"""
+import argparse
+import math
+import time
+from typing import Optional
+
+from alternatives import k_shortest_paths
+from helpers import Map, load_map
+from indexed_heap import IndexedMinHeap
+from synthetic_maps import grid_map, random_queries
+
+
+def astar_avoiding(M: Map, start: int, goal: int, banned_nodes: set[int],
+                   banned_roads: set[tuple[int, int]]) -> Optional[tuple[float, list[int]]]:
+    """
+    A* from start to goal that skips banned nodes and (node, neighbor) roads.
+    """
+    xs, ys = M.xs, M.ys
+    scale = M.heuristic_scale
+    came_from = {}
+    g_score = {start: 0.0}
+    open_set = IndexedMinHeap()
+    open_set.push(start, 0.0)
+    while open_set:
+        _, current = open_set.pop()
+        if current == goal:
+            path = [goal]
+            while path[-1] in came_from:
+                path.append(came_from[path[-1]])
+            path.reverse()
+            return g_score[goal], path
+        for edge in range(M.offsets[current], M.offsets[current + 1]):
+            neighbor = M.targets[edge]
+            if neighbor in banned_nodes or (current, neighbor) in banned_roads:
+                continue
+            tentative_g_score = g_score[current] + M.weights[edge]
+            if tentative_g_score < g_score.get(neighbor, math.inf):
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                h = scale * math.sqrt((xs[goal] - xs[neighbor])**2 + (ys[goal] - ys[neighbor])**2)
+                open_set.push_or_decrease(neighbor, tentative_g_score + h)
+    return None
+
+
+def yen_naive(M: Map, start: int, goal: int, k: int) -> list[tuple[float, list[int]]]:
+    """
+    Textbook Yen: one spur search per node of every accepted route.
+    """
+    first = astar_avoiding(M, start, goal, set(), set())
+    if first is None:
+        return []
+    accepted = [first]
+    candidates: list[tuple[float, list[int]]] = []
+    while len(accepted) < k:
+        _, path = accepted[-1]
+        for index in range(len(path) - 1):
+            root = path[:index + 1]
+            root_cost = sum(M.weights[M.find_edge(node, neighbor)] for node, neighbor in zip(root, root[1:]))
+            banned_roads = {(other[index], other[index + 1]) for _, other in accepted if other[:index + 1] == root}
+            spur = astar_avoiding(M, path[index], goal, set(root[:-1]), banned_roads)
+            if spur is not None:
+                candidate = (root_cost + spur[0], root[:-1] + spur[1])
+                if candidate not in candidates and candidate[1] not in [other for _, other in accepted]:
+                    candidates.append(candidate)
+        if not candidates:
+            break
+        candidates.sort()
+        accepted.append(candidates.pop(0))
+    return accepted
+
+
+def run(name: str, M: Map, queries: list[tuple[int, int]], k: int) -> None:
+    began = time.perf_counter()
+    naive = [yen_naive(M, start, goal, k) for start, goal in queries]
+    naive_time = time.perf_counter() - began
+    began = time.perf_counter()
+    shared = [k_shortest_paths(M, start, goal, k) for start, goal in queries]
+    shared_time = time.perf_counter() - began
+    began = time.perf_counter()
+    for start, goal in queries:
+        k_shortest_paths(M, start, goal, k, mode="penalty")
+    penalty_time = time.perf_counter() - began
+
+    same_costs = all(len(a) == len(b) and all(abs(x[0] - y[0]) < 1e-9 for x, y in zip(a, b))
+                     for a, b in zip(naive, shared))
+    print(f"{name:>14} | {len(M):>8} | {k:>2} | {naive_time * 1000 / len(queries):>13.1f} | "
+          f"{shared_time * 1000 / len(queries):>13.1f} | {naive_time / shared_time:>7.1f}x | "
+          f"{penalty_time * 1000 / len(queries):>15.1f} | {'yes' if same_costs else 'NO'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--queries', type=int, default=10)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'map':>14} | {'nodes':>8} | {'k':>2} | {'naive Yen ms/q':>13} | {'shared ms/q':>13} | "
+          f"{'speedup':>8} | {'penalty ms/q':>15} | same costs")
+    map_40 = load_map('map-40.pickle')
+    run('map-40.pickle', map_40, random_queries(map_40, args.queries, args.seed), args.k)
+    for size in args.sizes:
+        M = grid_map(size, seed=args.seed)
+        run(f'grid-{size}', M, random_queries(M, args.queries, args.seed), args.k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark Contraction Hierarchies against A* (`student_code.shortest_path`):
+preprocessing time, memory and query latency on generated maps.
+
+Usage:
+    python bench_contraction.py [--sizes 1000 5000 20000] [--queries 200]
+"""
+import argparse
+import random
+import time
+
+from contraction import ContractionHierarchy
+from helpers import Map
+from student_code import shortest_path
+from synthetic_maps import grid_map, random_queries
+
+
+def path_cost(M: Map, path: list[int]) -> float:
+    cost = 0.0
+    for source, target in zip(path, path[1:]):
+        cost += min(M.weights[edge] for edge in range(M.offsets[source], M.offsets[source + 1])
+                    if M.targets[edge] == target)
+    return cost
+
+
+def run(size: int, queries: int, seed: int) -> None:
+    M = grid_map(size, seed=seed)
+    rng = random.Random(seed)
+    # Travel-time-like weights make straight-line A* weaker, as on real roads
+    M.set_weights([length * rng.uniform(1.0, 3.0) for length in M.lengths])
+    pairs = random_queries(M, queries, seed)
+
+    began = time.perf_counter()
+    hierarchy = ContractionHierarchy.build(M)
+    build_time = time.perf_counter() - began
+
+    began = time.perf_counter()
+    astar_paths = [shortest_path(M, start, goal) for start, goal in pairs]
+    astar_time = time.perf_counter() - began
+    began = time.perf_counter()
+    ch_paths = [hierarchy.shortest_path(start, goal) for start, goal in pairs]
+    ch_time = time.perf_counter() - began
+
+    same = all(abs(path_cost(M, a) - path_cost(M, b)) < 1e-9 for a, b in zip(astar_paths, ch_paths))
+    print(f"{len(M):>8} | {build_time:>9.1f} | "
+          f"{M.nbytes() / 2**20:>8.2f} | {hierarchy.nbytes() / 2**20:>7.2f} | "
+          f"{astar_time * 1000 / queries:>9.2f} | {ch_time * 1000 / queries:>9.2f} | "
+          f"{astar_time / ch_time:>7.1f}x | {'yes' if same else 'NO'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 20000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'nodes':>8} | {'build s':>9} | {'map MB':>8} | {'CH MB':>7} | "
+          f"{'A* ms/q':>9} | {'CH ms/q':>9} | {'speedup':>8} | same costs")
+    for size in args.sizes:
+        run(size, args.queries, args.seed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark the precomputed edge-weight table and per-query heuristic cache
+used by `student_code.shortest_path` against recomputing both with
+`heuristic()` on every edge relaxation.
+
+Usage:
+    python bench_edge_weights.py [--sizes 1000 10000 100000] [--queries 50]
+"""
+import argparse
+import math
+import time
+from typing import Callable, Optional
+
+from helpers import Map, load_map
+from indexed_heap import IndexedMinHeap
+from student_code import heuristic, reconstruct_path, shortest_path
+from synthetic_maps import grid_map, random_queries
+
+
+def shortest_path_recompute(M: Map, start: int, goal: int) -> Optional[list[int]]:
+    """
+    A* that calls `heuristic()` twice per relaxation, once for the edge cost and
+    once for the goal estimate, as `shortest_path` did before the weight table.
+    """
+    came_from = {}
+    open_set = IndexedMinHeap()
+    g_score = {start: 0.0}
+    open_set.push(start, heuristic(M.intersections[start], M.intersections[goal]))
+
+    while open_set:
+        _, current = open_set.pop()
+        if current == goal:
+            return reconstruct_path(came_from, goal)
+        for neighbor in M.roads[current]:
+            tentative_g_score = g_score[current] + heuristic(M.intersections[current], M.intersections[neighbor])
+            if tentative_g_score < g_score.get(neighbor, math.inf):
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                f_score = tentative_g_score + heuristic(M.intersections[neighbor], M.intersections[goal])
+                open_set.push_or_decrease(neighbor, f_score)
+
+    return None
+
+
+def time_queries(function: Callable[[Map, int, int], Optional[list[int]]], M: Map,
+                 queries: list[tuple[int, int]]) -> tuple[float, list[Optional[list[int]]]]:
+    began = time.perf_counter()
+    paths = [function(M, start, goal) for start, goal in queries]
+    return time.perf_counter() - began, paths
+
+
+def run(name: str, M: Map, queries: list[tuple[int, int]]) -> None:
+    recompute_time, recompute_paths = time_queries(shortest_path_recompute, M, queries)
+    table_time, table_paths = time_queries(shortest_path, M, queries)
+    print(f"{name:>14} | {len(M):>8} | {len(queries):>7} | "
+          f"{recompute_time * 1000 / len(queries):>13.2f} | {table_time * 1000 / len(queries):>10.2f} | "
+          f"{recompute_time / table_time:>7.1f}x | {'yes' if recompute_paths == table_paths else 'NO'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'map':>14} | {'nodes':>8} | {'queries':>7} | {'recompute ms/q':>13} | {'table ms/q':>10} | "
+          f"{'speedup':>8} | same paths")
+    map_40 = load_map('map-40.pickle')
+    run('map-40.pickle', map_40, random_queries(map_40, args.queries, args.seed))
+    for size in args.sizes:
+        M = grid_map(size, seed=args.seed)
+        run(f'grid-{size}', M, random_queries(M, args.queries, args.seed))
+
+
+if __name__ == '__main__':
+    main()
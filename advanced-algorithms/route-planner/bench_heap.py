@@ -0,0 +1,90 @@
+"""
+Benchmark the indexed-heap A* in `student_code.shortest_path` against the
+previous heapq implementation, which scanned the whole open set on every
+edge relaxation.
+
+Usage:
+    python bench_heap.py [--sizes 1000 10000 40000] [--queries 20]
+"""
+import argparse
+import heapq
+import time
+from typing import Callable, Optional
+
+from helpers import Map, load_map
+from student_code import heuristic, reconstruct_path, shortest_path
+from synthetic_maps import grid_map, random_queries
+
+
+def shortest_path_heapq(M: Map, start: int, goal: int) -> Optional[list[int]]:
+    """
+    The heapq A* that `shortest_path` used before the indexed heap, kept as a baseline.
+    """
+    came_from = {}
+    min_heap = []
+
+    g_score = {node: float('inf') for node in M.intersections}
+    g_score[start] = 0
+    heapq.heappush(min_heap, (heuristic(M.intersections[start], M.intersections[goal]), start))
+
+    while len(min_heap) > 0:
+        _, current = heapq.heappop(min_heap)
+
+        if current == goal:
+            return reconstruct_path(came_from, goal)
+
+        for neighbor in M.roads[current]:
+            tentative_g_score = g_score[current] + heuristic(M.intersections[current], M.intersections[neighbor])
+            if tentative_g_score < g_score[neighbor]:
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                f_score = tentative_g_score + heuristic(M.intersections[neighbor], M.intersections[goal])
+                if all(neighbor != item[1] for item in min_heap):
+                    heapq.heappush(min_heap, (f_score, neighbor))
+
+    return None
+
+
+def path_length(M: Map, path: Optional[list[int]]) -> float:
+    if path is None:
+        return float('inf')
+    return sum(heuristic(M.intersections[a], M.intersections[b]) for a, b in zip(path, path[1:]))
+
+
+def time_queries(function: Callable[[Map, int, int], Optional[list[int]]], M: Map,
+                 queries: list[tuple[int, int]]) -> tuple[float, list[float]]:
+    lengths = []
+    began = time.perf_counter()
+    for start, goal in queries:
+        lengths.append(path_length(M, function(M, start, goal)))
+    return time.perf_counter() - began, lengths
+
+
+def run(name: str, M: Map, queries: list[tuple[int, int]]) -> None:
+    baseline_time, baseline_lengths = time_queries(shortest_path_heapq, M, queries)
+    indexed_time, indexed_lengths = time_queries(shortest_path, M, queries)
+    # The old version never re-queued improved nodes, so it may return longer paths
+    not_worse = all(new <= old + 1e-9 for new, old in zip(indexed_lengths, baseline_lengths))
+    print(f"{name:>14} | {len(M.intersections):>8} | {len(queries):>7} | "
+          f"{baseline_time * 1000 / len(queries):>12.2f} | {indexed_time * 1000 / len(queries):>12.2f} | "
+          f"{baseline_time / indexed_time:>7.1f}x | {'yes' if not_worse else 'NO'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 40000])
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'map':>14} | {'nodes':>8} | {'queries':>7} | {'heapq ms/q':>12} | {'indexed ms/q':>12} | "
+          f"{'speedup':>8} | paths ok")
+    map_40 = load_map('map-40.pickle')
+    run('map-40.pickle', map_40, random_queries(map_40, args.queries, args.seed))
+    for size in args.sizes:
+        M = grid_map(size, seed=args.seed)
+        run(f'grid-{size}', M, random_queries(M, args.queries, args.seed))
+
+
+if __name__ == '__main__':
+    main()
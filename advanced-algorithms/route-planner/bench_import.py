@@ -0,0 +1,74 @@
+"""
+Measure how long the routing core takes to import in a fresh interpreter,
+and check that it does not pull in the plotting stack or networkx.
+
+Each module is imported in its own subprocess, several times, and the best
+time is reported. The script exits with status 1 if a module loads a
+forbidden package or is slower than the budget.
+
+Usage:
+    python bench_import.py [--repeat 5] [--budget-ms 150]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+CORE_MODULES = ['route_map', 'helpers', 'student_code', 'map_format']
+FORBIDDEN_PACKAGES = ['networkx', 'plotly', 'chart_studio']
+
+_PROBE = """
+import json, sys, time
+began = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - began
+print(json.dumps({{'seconds': elapsed, 'loaded': [name for name in {forbidden!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str, repeat: int) -> tuple[float, list[str]]:
+    """
+    Import a module in fresh interpreters and return its best import time.
+
+    Args:
+        module (str): The module to import.
+        repeat (int): The number of fresh interpreters to try.
+
+    Returns:
+        tuple[float, list[str]]: The best import time in seconds, and the
+            forbidden packages the import loaded.
+    """
+    best = float('inf')
+    loaded: list[str] = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, forbidden=FORBIDDEN_PACKAGES)],
+                                check=True, capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = min(best, result['seconds'])
+        loaded = result['loaded']
+    return best, loaded
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=150.0)
+    parser.add_argument('--plotting', action='store_true', help="also time map_plot, for comparison")
+    args = parser.parse_args()
+
+    modules = CORE_MODULES + (['map_plot'] if args.plotting else [])
+    failed = False
+    print(f"{'module':>14} | {'import ms':>9} | forbidden packages loaded")
+    for module in modules:
+        seconds, loaded = measure(module, args.repeat)
+        print(f"{module:>14} | {seconds * 1000:>9.1f} | {', '.join(loaded) or '-'}")
+        if module in CORE_MODULES and (loaded or seconds * 1000 > args.budget_ms):
+            failed = True
+    if failed:
+        print(f"FAIL: a core module loaded a plotting package or took more than {args.budget_ms} ms")
+        sys.exit(1)
+    print("OK: the routing core stays cheap to import")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark update-then-query latency: apply a batch of road-cost changes
+and get the new route, either by repairing a `LifelongPlanner` (LPA*) or by
+rerunning `student_code.shortest_path` from scratch.
+
+Two workloads are measured. In "off-route" every batch changes random
+roads, as a city-wide traffic feed does; most of them do not touch the
+current route or the search around it. In "on-route" half of every batch
+also slows down roads of the current route, which forces a detour and
+invalidates every node behind the slowed road. New costs stay between 1x
+and 4x the road length, like travel times.
+
+Usage:
+    python bench_replanning.py [--sizes 10000 100000] [--updates 50] [--batch 10]
+"""
+import argparse
+import random
+import time
+
+from helpers import Map
+from replanning import LifelongPlanner
+from student_code import shortest_path
+from synthetic_maps import grid_map
+
+
+def path_cost(M: Map, path: list[int]) -> float:
+    return sum(M.weights[M.find_edge(source, target)] for source, target in zip(path, path[1:]))
+
+
+def run(name: str, M: Map, workload: str, updates: int, batch: int, seed: int) -> None:
+    rng = random.Random(seed)
+    start, goal = rng.randrange(len(M)), rng.randrange(len(M))
+    planner = LifelongPlanner(M, start, goal)
+    path = planner.shortest_path()
+
+    repair_time = scratch_time = 0.0
+    same_costs = True
+    for _ in range(updates):
+        changes = {}
+        random_roads = batch if workload == 'off-route' else batch // 2
+        for _ in range(random_roads):
+            edge = rng.randrange(len(M.targets))
+            changes[edge] = M.lengths[edge] * rng.uniform(1.0, 4.0)
+        if workload == 'on-route' and path is not None and len(path) > 1:
+            for _ in range(batch - batch // 2):
+                index = rng.randrange(len(path) - 1)
+                edge = M.find_edge(path[index], path[index + 1])
+                changes[edge] = M.lengths[edge] * rng.uniform(2.0, 4.0)
+
+        began = time.perf_counter()
+        planner.update_weights(changes)
+        path = planner.shortest_path()
+        repair_time += time.perf_counter() - began
+
+        began = time.perf_counter()
+        scratch_path = shortest_path(M, start, goal)
+        scratch_time += time.perf_counter() - began
+
+        if (path is None) != (scratch_path is None) or (
+                path is not None and abs(path_cost(M, path) - path_cost(M, scratch_path)) > 1e-9):
+            same_costs = False
+
+    print(f"{name:>12} | {len(M):>8} | {workload:>9} | {batch:>5} | {scratch_time * 1000 / updates:>14.2f} | "
+          f"{repair_time * 1000 / updates:>13.2f} | {scratch_time / repair_time:>7.1f}x | "
+          f"{'yes' if same_costs else 'NO'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--updates', type=int, default=50, help="the number of update batches")
+    parser.add_argument('--batch', type=int, default=10, help="the roads changed per batch")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'map':>12} | {'nodes':>8} | {'workload':>9} | {'batch':>5} | {'scratch ms/upd':>14} | "
+          f"{'repair ms/upd':>13} | {'speedup':>8} | same costs")
+    for size in args.sizes:
+        for workload in ('off-route', 'on-route'):
+            M = grid_map(size, seed=args.seed)
+            # Travel-time-like costs, so the straight-line heuristic is not exact
+            rng = random.Random(args.seed)
+            M.set_weights([length * rng.uniform(1.0, 2.0) for length in M.lengths])
+            run(f'grid-{size}', M, workload, args.updates, args.batch, args.seed)
+
+
+if __name__ == '__main__':
+    main()
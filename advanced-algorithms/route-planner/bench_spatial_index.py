@@ -0,0 +1,63 @@
+"""
+Benchmark snapping coordinates to intersections with `SpatialGrid.nearest`
+against a linear scan over `M.intersections`.
+
+Usage:
+    python bench_spatial_index.py [--sizes 1000 10000 100000] [--points 1000]
+"""
+import argparse
+import random
+import time
+
+from helpers import Map, load_map
+from spatial_index import SpatialGrid
+from synthetic_maps import random_geometric_map
+
+
+def nearest_scan(M: Map, x: float, y: float) -> int:
+    """
+    Snap a point with a linear scan, the way callers did before the spatial index.
+    """
+    return min(M.intersections, key=lambda node: ((M.intersections[node][0] - x)**2
+                                                 + (M.intersections[node][1] - y)**2, node))
+
+
+def run(name: str, M: Map, points: int, seed: int) -> None:
+    rng = random.Random(seed)
+    xs = [rng.random() for _ in range(points)]
+    ys = [rng.random() for _ in range(points)]
+    # The scan is slow, so time it on a sample and report per point
+    sample = min(points, max(10, 200000 // len(M)))
+
+    began = time.perf_counter()
+    scanned = [nearest_scan(M, x, y) for x, y in zip(xs[:sample], ys[:sample])]
+    scan_time = (time.perf_counter() - began) / sample
+
+    began = time.perf_counter()
+    grid = SpatialGrid.build(M)
+    build_time = time.perf_counter() - began
+    began = time.perf_counter()
+    snapped = grid.nearest_many(xs, ys)
+    grid_time = (time.perf_counter() - began) / points
+
+    print(f"{name:>16} | {len(M):>8} | {build_time * 1000:>8.1f} | {scan_time * 1e6:>11.1f} | "
+          f"{grid_time * 1e6:>11.1f} | {scan_time / grid_time:>8.0f}x | "
+          f"{'yes' if list(snapped[:sample]) == scanned else 'NO'}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'map':>16} | {'nodes':>8} | {'build ms':>8} | {'scan us/pt':>11} | {'grid us/pt':>11} | "
+          f"{'speedup':>9} | same nodes")
+    run('map-40.pickle', load_map('map-40.pickle'), args.points, args.seed)
+    for size in args.sizes:
+        run(f'geometric-{size}', random_geometric_map(size, args.seed), args.points, args.seed)
+
+
+if __name__ == '__main__':
+    main()
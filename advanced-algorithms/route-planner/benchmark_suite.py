@@ -0,0 +1,156 @@
+"""
+Route-planner benchmark suite over synthetic road networks.
+
+For every map family and size it generates a seeded map, runs a seeded
+query workload against each engine and prints one JSON object per
+(family, size, engine) with latency percentiles, throughput, expanded
+nodes, the aggregated search counters of search_stats.py and memory.
+
+Engines:
+    astar          student_code.shortest_path
+    bidirectional  student_code.shortest_path_bidirectional
+    alt            A* with landmark bounds (landmarks.py)
+    ch             Contraction Hierarchies (contraction.py)
+
+Usage:
+    python benchmark_suite.py [--families grid geometric planar]
+                              [--sizes 1000 10000 100000 1000000]
+                              [--engines astar bidirectional alt ch]
+                              [--queries 200] [--seed 0] [--output results.jsonl]
+"""
+import argparse
+import json
+import random
+import resource
+import sys
+import time
+from collections.abc import Callable
+from typing import Optional
+
+from contraction import ContractionHierarchy
+from helpers import Map
+from landmarks import LandmarkTable
+from search_stats import SearchStats, aggregate, percentile
+from student_code import shortest_path, shortest_path_bidirectional
+from synthetic_maps import GENERATORS, random_queries
+
+ENGINES = ['astar', 'bidirectional', 'alt', 'ch']
+
+Query = Callable[[int, int, SearchStats], Optional[list[int]]]
+
+
+def peak_rss_mb() -> float:
+    """
+    Return the peak resident set size of this process so far, in MiB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def prepare_engine(engine: str, M: Map, workers: Optional[int]) -> tuple[Query, int]:
+    """
+    Preprocess a map for an engine.
+
+    Returns:
+        tuple[Query, int]: The query function and the bytes of its index.
+    """
+    if engine == 'astar':
+        return (lambda start, goal, stats: shortest_path(M, start, goal, stats=stats)), 0
+    if engine == 'bidirectional':
+        M.reverse()
+        return (lambda start, goal, stats: shortest_path_bidirectional(M, start, goal, stats)), 0
+    if engine == 'alt':
+        table = LandmarkTable.build(M, workers=workers)
+        index_bytes = sum(len(values) * values.itemsize for values in table.from_landmark + table.to_landmark)
+        return (lambda start, goal, stats: shortest_path(M, start, goal, stats=stats, landmarks=table)), index_bytes
+    if engine == 'ch':
+        hierarchy = ContractionHierarchy.build(M)
+        return (lambda start, goal, stats: hierarchy.shortest_path(start, goal, stats)), hierarchy.nbytes()
+    raise ValueError(f"unknown engine {engine!r}")
+
+
+def run_engine(engine: str, M: Map, queries: list[tuple[int, int]], workers: Optional[int]) -> dict:
+    """
+    Preprocess a map for an engine, run the queries and summarize them.
+    """
+    began = time.perf_counter()
+    query, index_bytes = prepare_engine(engine, M, workers)
+    preprocess_seconds = time.perf_counter() - began
+
+    latencies = []
+    expanded = []
+    all_stats = []
+    unreachable = 0
+    for start, goal in queries:
+        stats = SearchStats()
+        began = time.perf_counter()
+        path = query(start, goal, stats)
+        latencies.append(time.perf_counter() - began)
+        expanded.append(stats.nodes_expanded)
+        all_stats.append(stats)
+        if path is None:
+            unreachable += 1
+    total = sum(latencies)
+    latencies.sort()
+    expanded.sort()
+    return {
+        'engine': engine,
+        'queries': len(queries),
+        'unreachable': unreachable,
+        'preprocess_s': round(preprocess_seconds, 4),
+        'latency_ms': {name: round(percentile(latencies, fraction) * 1000, 4)
+                       for name, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('max', 1.0))},
+        'mean_latency_ms': round(total * 1000 / len(queries), 4),
+        'throughput_qps': round(len(queries) / total, 2) if total else None,
+        'expanded_nodes': {'mean': round(sum(expanded) / len(expanded), 2),
+                           'p50': percentile(expanded, 0.5), 'p99': percentile(expanded, 0.99)},
+        'search_stats': aggregate(all_stats),
+        'index_mb': round(index_bytes / 2**20, 3),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--families', nargs='+', choices=sorted(GENERATORS), default=sorted(GENERATORS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=['astar', 'bidirectional', 'alt'])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--weights', choices=['length', 'travel-time'], default='length',
+                        help="road costs; travel-time multiplies lengths by a seeded factor in [1, 3)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes for ALT preprocessing")
+    parser.add_argument('--ch-max-nodes', type=int, default=50000,
+                        help="skip Contraction Hierarchies on larger maps, whose preprocessing is slow")
+    parser.add_argument('--output', help="write JSON lines to this file instead of stdout")
+    args = parser.parse_args()
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for family in args.families:
+            for size in args.sizes:
+                began = time.perf_counter()
+                M = GENERATORS[family](size, args.seed)
+                if args.weights == 'travel-time':
+                    rng = random.Random(args.seed)
+                    M.set_weights([length * rng.uniform(1.0, 3.0) for length in M.lengths])
+                generate_seconds = time.perf_counter() - began
+                queries = random_queries(M, args.queries, args.seed)
+                for engine in args.engines:
+                    record = {'family': family, 'nodes': len(M), 'edges': len(M.targets), 'seed': args.seed,
+                              'weights': args.weights, 'generate_s': round(generate_seconds, 4),
+                              'map_mb': round(M.nbytes() / 2**20, 3)}
+                    if engine == 'ch' and len(M) > args.ch_max_nodes:
+                        record.update({'engine': engine, 'skipped': f"more than {args.ch_max_nodes} nodes"})
+                    else:
+                        record.update(run_engine(engine, M, queries, args.workers))
+                    output.write(json.dumps(record) + '\n')
+                    output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,416 @@
+"""
+Contraction Hierarchies (CH) for answering many point-to-point queries on a
+static map.
+
+Preprocessing contracts the nodes one by one in order of importance. When a
+node is removed, a shortcut is added between two of its neighbours whenever
+the path through it is the only shortest path between them. A query then runs
+a bidirectional Dijkstra that only ever moves "upward" to more important
+nodes, which settles a tiny fraction of the map. Shortcuts remember the node
+they bypass, so paths are unpacked back into original roads.
+
+Usage:
+    python contraction.py map-40.pickle
+"""
+import argparse
+import heapq
+import math
+import os
+import pickle
+import time
+from array import array
+from collections.abc import Sequence
+from typing import Optional
+
+from helpers import Map, load_map
+from indexed_heap import IndexedMinHeap
+from search_stats import SearchStats
+
+HIERARCHY_VERSION = 1
+
+# A shortcut's middle node is NO_MIDDLE when it is an original road
+NO_MIDDLE = -1
+
+
+def hierarchy_path(map_path: str) -> str:
+    """
+    Return where the contraction hierarchy of a map is persisted, next to the map file.
+
+    Args:
+        map_path (str): The path of the map, e.g. "map-40.pickle".
+
+    Returns:
+        str: The path of the hierarchy file, e.g. "map-40.ch".
+    """
+    return os.path.splitext(map_path)[0] + '.ch'
+
+
+class _Contractor:
+    """
+    The mutable overlay graph used while contracting a map.
+    """
+
+    def __init__(self, M: Map, settle_limit: int) -> None:
+        num_nodes = len(M)
+        self.settle_limit = settle_limit
+        # out_edges[u][w] and in_edges[w][u] are (weight, middle node) of the edge u -> w
+        self.out_edges: list[dict[int, tuple[float, int]]] = [{} for _ in range(num_nodes)]
+        self.in_edges: list[dict[int, tuple[float, int]]] = [{} for _ in range(num_nodes)]
+        offsets, targets, weights = M.offsets, M.targets, M.weights
+        for node in range(num_nodes):
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[edge]
+                if neighbor != node:
+                    self._add_edge(node, neighbor, weights[edge], NO_MIDDLE)
+        self.deleted_neighbors = [0] * num_nodes
+        # The shortcuts every node would need, from its last simulated contraction.
+        # A node's edges only change when a neighbour is contracted, which drops
+        # its entry; other contractions keep every distance between the remaining
+        # nodes, so the witnesses behind a cached list still exist.
+        self._shortcuts: dict[int, list[tuple[int, int, float]]] = {}
+
+    def _add_edge(self, source: int, target: int, weight: float, middle: int) -> None:
+        current = self.out_edges[source].get(target)
+        if current is None or weight < current[0]:
+            self.out_edges[source][target] = (weight, middle)
+            self.in_edges[target][source] = (weight, middle)
+
+    def _witness_distances(self, source: int, excluded: int, targets: set[int],
+                           max_cost: float) -> dict[int, float]:
+        # A local Dijkstra that avoids `excluded`; it stops once every target is
+        # settled, the settle limit is hit, or nothing under max_cost is left.
+        # These searches are tiny and run by the thousand, where heapq with
+        # stale entries skipped beats the decrease-key of IndexedMinHeap
+        distance = {source: 0.0}
+        queue = [(0.0, source)]
+        remaining = set(targets)
+        settled = 0
+        out_edges = self.out_edges
+        settle_limit = self.settle_limit
+        while queue and remaining and settled < settle_limit:
+            current_distance, current = heapq.heappop(queue)
+            if current_distance > distance[current]:
+                continue
+            settled += 1
+            remaining.discard(current)
+            for neighbor, (weight, _) in out_edges[current].items():
+                tentative_distance = current_distance + weight
+                if tentative_distance <= max_cost and tentative_distance < distance.get(neighbor, math.inf) \
+                        and neighbor != excluded:
+                    distance[neighbor] = tentative_distance
+                    heapq.heappush(queue, (tentative_distance, neighbor))
+        return distance
+
+    def shortcuts(self, node: int) -> list[tuple[int, int, float]]:
+        """
+        Return the (source, target, weight) shortcuts that contracting `node` requires.
+        """
+        result = self._shortcuts.get(node)
+        if result is None:
+            result = self._shortcuts[node] = self._find_shortcuts(node)
+        return result
+
+    def _find_shortcuts(self, node: int) -> list[tuple[int, int, float]]:
+        result = []
+        outgoing = self.out_edges[node]
+        for source, (in_weight, _) in self.in_edges[node].items():
+            targets = {target for target in outgoing if target != source}
+            if not targets:
+                continue
+            max_cost = in_weight + max(outgoing[target][0] for target in targets)
+            witness = self._witness_distances(source, node, targets, max_cost)
+            for target, (out_weight, _) in outgoing.items():
+                if target == source:
+                    continue
+                via = in_weight + out_weight
+                if witness.get(target, math.inf) > via:
+                    result.append((source, target, via))
+        return result
+
+    def priority(self, node: int) -> float:
+        """
+        Return the contraction priority of a node; lower values are contracted first.
+        """
+        shortcuts = self.shortcuts(node)
+        removed = len(self.in_edges[node]) + len(self.out_edges[node])
+        # Weighting shortcuts twice keeps the remaining graph sparser, which
+        # makes later witness searches cheaper
+        return 2 * len(shortcuts) - removed + self.deleted_neighbors[node]
+
+    def contract(self, node: int) -> tuple[list[tuple[int, float, int]], list[tuple[int, float, int]]]:
+        """
+        Remove a node from the overlay graph, adding the shortcuts it needs.
+
+        Returns:
+            tuple: The (neighbor, weight, middle) edges leaving and entering the
+                node, all of which go to nodes contracted later.
+        """
+        for source, target, weight in self.shortcuts(node):
+            self._add_edge(source, target, weight, node)
+        upward = [(target, weight, middle) for target, (weight, middle) in self.out_edges[node].items()]
+        downward = [(source, weight, middle) for source, (weight, middle) in self.in_edges[node].items()]
+        del self._shortcuts[node]
+        for target in self.out_edges[node]:
+            del self.in_edges[target][node]
+            self.deleted_neighbors[target] += 1
+            self._shortcuts.pop(target, None)
+        for source in self.in_edges[node]:
+            del self.out_edges[source][node]
+            self.deleted_neighbors[source] += 1
+            self._shortcuts.pop(source, None)
+        self.out_edges[node] = {}
+        self.in_edges[node] = {}
+        return upward, downward
+
+
+def _to_csr(rows: list[list[tuple[int, float, int]]]) -> tuple[array, array, array, array]:
+    offsets = array('q', [0])
+    targets = array('q')
+    weights = array('d')
+    middles = array('q')
+    for row in rows:
+        for target, weight, middle in row:
+            targets.append(target)
+            weights.append(weight)
+            middles.append(middle)
+        offsets.append(len(targets))
+    return offsets, targets, weights, middles
+
+
+class ContractionHierarchy:
+    """
+    A contracted map answering shortest-path queries with an upward bidirectional search.
+
+    Attributes:
+        rank (array[int]): The contraction order of every node.
+        up (tuple[array, ...]): CSR (offsets, targets, weights, middles) of the
+            edges from every node to higher-ranked nodes.
+        down (tuple[array, ...]): CSR (offsets, sources, weights, middles) of the
+            edges into every node from higher-ranked nodes.
+    """
+
+    def __init__(self, rank: Sequence[int], up: tuple[Sequence[int], Sequence[int], Sequence[float], Sequence[int]],
+                 down: tuple[Sequence[int], Sequence[int], Sequence[float], Sequence[int]]) -> None:
+        """
+        Initialize the hierarchy from its arrays; use `build` or `load` to create one.
+        """
+        self.rank = rank
+        self.up = up
+        self.down = down
+
+    @classmethod
+    def build(cls, M: Map, settle_limit: int = 50) -> "ContractionHierarchy":
+        """
+        Contract every node of a map.
+
+        Nodes are ordered by edge difference (shortcuts added minus edges
+        removed, with shortcuts counted twice) plus the number of already
+        contracted neighbours, with lazy priority updates. The simulated
+        contraction behind a priority is kept until a neighbour is contracted,
+        so rechecking an unchanged node and then contracting it cost no
+        witness searches. On grid-like maps the top of the hierarchy is a
+        dense separator, so preprocessing still grows faster than the map.
+
+        Args:
+            M (Map): The map to preprocess; its current weights are used.
+            settle_limit (int): The maximum number of nodes a witness search settles.
+                Lower values preprocess faster but may add unneeded shortcuts.
+
+        Returns:
+            ContractionHierarchy: The hierarchy of the map.
+        """
+        contractor = _Contractor(M, settle_limit)
+        num_nodes = len(M)
+        queue = IndexedMinHeap()
+        for node in range(num_nodes):
+            queue.push(node, contractor.priority(node))
+
+        rank = array('q', bytes(8 * num_nodes))
+        up_rows: list[list[tuple[int, float, int]]] = [[] for _ in range(num_nodes)]
+        down_rows: list[list[tuple[int, float, int]]] = [[] for _ in range(num_nodes)]
+        order = 0
+        while queue:
+            _, node = queue.pop()
+            # Lazy update: the stored priority may be stale, so recompute it
+            # and put the node back if it is no longer the smallest
+            priority = contractor.priority(node)
+            if queue and priority > queue.peek()[0]:
+                queue.push(node, priority)
+                continue
+            rank[node] = order
+            order += 1
+            up_rows[node], down_rows[node] = contractor.contract(node)
+        return cls(rank, _to_csr(up_rows), _to_csr(down_rows))
+
+    def save(self, filename: str) -> None:
+        """
+        Save the hierarchy to a file.
+
+        Args:
+            filename (str): The name of the file, usually `hierarchy_path(map_path)`.
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump({'version': HIERARCHY_VERSION, 'rank': self.rank, 'up': self.up, 'down': self.down}, f)
+
+    @classmethod
+    def load(cls, filename: str) -> "ContractionHierarchy":
+        """
+        Load a hierarchy saved with `save`.
+
+        Args:
+            filename (str): The name of the file to load.
+
+        Returns:
+            ContractionHierarchy: The loaded hierarchy.
+        """
+        with open(filename, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('version') != HIERARCHY_VERSION:
+            raise ValueError(f"unsupported hierarchy file version {data.get('version')!r}")
+        return cls(data['rank'], data['up'], data['down'])
+
+    def nbytes(self) -> int:
+        """
+        Return the memory taken by the hierarchy arrays, in bytes.
+        """
+        arrays = [self.rank, *self.up, *self.down]
+        return sum(len(values) * values.itemsize for values in arrays)
+
+    def shortest_path(self, start: int, goal: int, stats: Optional[SearchStats] = None) -> Optional[list[int]]:
+        """
+        Find the shortest path between two nodes.
+
+        Args:
+            start (int): The starting node.
+            goal (int): The goal node.
+            stats (Optional[SearchStats]): If given, receives the search counters.
+
+        Returns:
+            Optional[list[int]]: The path from start to goal over original roads, in
+                the same format as `student_code.shortest_path`, or None if there is none.
+        """
+        began = time.perf_counter() if stats is not None else 0.0
+        # Index 0 searches upward from start, index 1 searches upward from goal over reversed edges
+        graphs = (self.up, self.down)
+        distances = ({start: 0.0}, {goal: 0.0})
+        parents = ({}, {})
+        open_sets = (IndexedMinHeap(), IndexedMinHeap())
+        open_sets[0].push(start, 0.0)
+        open_sets[1].push(goal, 0.0)
+        best_length = 0.0 if start == goal else math.inf
+        meeting_node = start if start == goal else None
+        expanded = relaxed = pushes = decreases = pops = 0
+        peak_open_set = 2
+        track_peak = stats is not None
+        inf = math.inf
+        searched = time.perf_counter() if stats is not None else 0.0
+
+        while True:
+            # A side stops once its smallest key cannot improve the best path;
+            # of the sides that can, the one with the smaller key goes next
+            forward_key = open_sets[0].peek()[0] if open_sets[0] else inf
+            backward_key = open_sets[1].peek()[0] if open_sets[1] else inf
+            if forward_key >= best_length and backward_key >= best_length:
+                break
+            side = 0 if forward_key <= backward_key else 1
+            open_set = open_sets[side]
+            current_distance, current = open_set.pop()
+            pops += 1
+            distance, other_distance, parent = distances[side], distances[1 - side], parents[side]
+            distance_get = distance.get
+            # Stall-on-demand: if a higher node already reached by this side
+            # offers a shorter way into `current`, its key is not a true
+            # distance and expanding it is wasted work
+            stall_offsets, stall_targets, stall_weights, _ = graphs[1 - side]
+            stalled = False
+            for edge in range(stall_offsets[current], stall_offsets[current + 1]):
+                if distance_get(stall_targets[edge], inf) + stall_weights[edge] < current_distance:
+                    stalled = True
+                    break
+            if stalled:
+                continue
+            expanded += 1
+            offsets, targets, weights, _ = graphs[side]
+            first_edge, end_edge = offsets[current], offsets[current + 1]
+            relaxed += end_edge - first_edge
+            for edge in range(first_edge, end_edge):
+                neighbor = targets[edge]
+                tentative_distance = current_distance + weights[edge]
+                if tentative_distance < distance_get(neighbor, inf):
+                    distance[neighbor] = tentative_distance
+                    parent[neighbor] = current
+                    if open_set.push_or_decrease(neighbor, tentative_distance):
+                        pushes += 1
+                        if track_peak and len(open_sets[0]) + len(open_sets[1]) > peak_open_set:
+                            peak_open_set = len(open_sets[0]) + len(open_sets[1])
+                    else:
+                        decreases += 1
+                    other = other_distance.get(neighbor)
+                    if other is not None and tentative_distance + other < best_length:
+                        best_length = tentative_distance + other
+                        meeting_node = neighbor
+
+        reconstructed = time.perf_counter() if stats is not None else 0.0
+        path = None if meeting_node is None else self._unpack_path(start, meeting_node, parents)
+        if stats is not None:
+            stats.record(expanded, relaxed, pushes + 2, decreases, pops, pops - expanded, peak_open_set,
+                         (searched - began, reconstructed - searched, time.perf_counter() - reconstructed))
+        return path
+
+    def _unpack_path(self, start: int, meeting_node: int, parents: tuple[dict[int, int], dict[int, int]]) -> list[int]:
+        upward = [meeting_node]
+        while upward[-1] in parents[0]:
+            upward.append(parents[0][upward[-1]])
+        upward.reverse()
+        downward = [meeting_node]
+        while downward[-1] in parents[1]:
+            downward.append(parents[1][downward[-1]])
+        hierarchy_path = upward + downward[1:]
+
+        path = [start]
+        for source, target in zip(hierarchy_path, hierarchy_path[1:]):
+            self._unpack(source, target, path)
+        return path
+
+    def _middle(self, source: int, target: int) -> int:
+        # An edge is stored at its lower-ranked end: in `up` if that is the
+        # source, in `down` if that is the target
+        if self.rank[source] < self.rank[target]:
+            offsets, targets, weights, middles = self.up
+            node, other = source, target
+        else:
+            offsets, targets, weights, middles = self.down
+            node, other = target, source
+        best_weight, best_middle = math.inf, NO_MIDDLE
+        for edge in range(offsets[node], offsets[node + 1]):
+            if targets[edge] == other and weights[edge] < best_weight:
+                best_weight, best_middle = weights[edge], middles[edge]
+        return best_middle
+
+    def _unpack(self, source: int, target: int, path: list[int]) -> None:
+        # Expands a hierarchy edge into original roads and appends them to path,
+        # iteratively so deep shortcut chains do not hit the recursion limit
+        stack = [(source, target)]
+        while stack:
+            source, target = stack.pop()
+            middle = self._middle(source, target)
+            if middle == NO_MIDDLE:
+                path.append(target)
+            else:
+                stack.append((middle, target))
+                stack.append((source, middle))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('map', help="the map pickle to preprocess")
+    parser.add_argument('--settle-limit', type=int, default=50, help="the node limit of witness searches")
+    args = parser.parse_args()
+
+    hierarchy = ContractionHierarchy.build(load_map(args.map), args.settle_limit)
+    hierarchy.save(hierarchy_path(args.map))
+    print(f"Saved contraction hierarchy to {hierarchy_path(args.map)}")
+
+
+if __name__ == '__main__':
+    main()
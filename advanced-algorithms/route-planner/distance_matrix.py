@@ -0,0 +1,79 @@
+"""
+Many-to-many shortest-path distances over a Map, e.g. for fleet assignment.
+
+One Dijkstra search runs per source and stops as soon as every target is
+settled. Sources are spread across a process pool. The map arrays are sent
+to each worker once, through the pool initializer, not once per task; a
+memory-mapped map only sends its file path and workers share its pages.
+"""
+import math
+import os
+from array import array
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from helpers import Map
+from map_format import resolve_worker_graph, worker_graph
+from student_code import one_to_many, reconstruct_path
+
+# Graph arrays and targets shared with each worker process once, through the pool initializer
+_worker_state: dict[str, object] = {}
+
+
+def _init_worker(graph: tuple, targets: list[int], with_paths: bool) -> None:
+    _worker_state['graph'] = resolve_worker_graph(graph)
+    _worker_state['targets'] = targets
+    _worker_state['with_paths'] = with_paths
+
+
+def _row(source: int) -> tuple[array, Optional[list[Optional[list[int]]]]]:
+    return _search_row(_worker_state['graph'], _worker_state['targets'], _worker_state['with_paths'], source)
+
+
+def _search_row(graph: tuple, targets: list[int], with_paths: bool,
+                source: int) -> tuple[array, Optional[list[Optional[list[int]]]]]:
+    distance, came_from = one_to_many(*graph, source, targets)
+    row = array('d', (distance.get(target, math.inf) for target in targets))
+    if not with_paths:
+        return row, None
+    paths = []
+    for target in targets:
+        paths.append(reconstruct_path(came_from, target) if target in distance else None)
+    return row, paths
+
+
+def distance_matrix(M: Map, sources: Sequence[int], targets: Sequence[int], with_paths: bool = False,
+                    workers: Optional[int] = None) -> tuple[list[array], Optional[list[list[Optional[list[int]]]]]]:
+    """
+    Compute the shortest-path cost from every source to every target.
+
+    Args:
+        M (Map): The map to route on; its current weights are used.
+        sources (Sequence[int]): The origin nodes, one matrix row each.
+        targets (Sequence[int]): The destination nodes, one matrix column each.
+        with_paths (bool): Whether to also return the node path of every pair.
+        workers (Optional[int]): The number of worker processes; None uses one
+            per CPU and 1 runs everything in this process.
+
+    Returns:
+        tuple[list[array], Optional[list[list[Optional[list[int]]]]]]: One float64
+            array of costs per source, with math.inf for unreachable targets, and
+            the matching paths (None for unreachable targets) if requested.
+    """
+    graph = worker_graph(M)
+    targets = list(targets)
+    if workers == 1 or len(sources) <= 1:
+        # Searched here on local arrays, leaving the worker globals of this process unset
+        resolved = resolve_worker_graph(graph)
+        results = [_search_row(resolved, targets, with_paths, source) for source in sources]
+    else:
+        workers = workers or os.cpu_count() or 1
+        # A few chunks per worker balances load without one round trip per source
+        chunksize = max(1, len(sources) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(graph, targets, with_paths)) as pool:
+            results = list(pool.map(_row, sources, chunksize=chunksize))
+    matrix = [row for row, _ in results]
+    paths = [row_paths for _, row_paths in results] if with_paths else None
+    return matrix, paths
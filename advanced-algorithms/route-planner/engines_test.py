@@ -0,0 +1,131 @@
+"""
+Checks that the faster route engines find routes as short as plain A*,
+for every (start, goal) pair on the project maps and on a seeded
+synthetic map that has unreachable nodes. start == goal is included.
+
+Usage:
+    python engines_test.py
+"""
+import math
+import os
+import random
+from collections.abc import Callable
+from typing import Optional
+
+import distance_matrix as dm
+import landmarks
+from contraction import ContractionHierarchy
+from helpers import Map, load_map
+from student_code import shortest_path
+from synthetic_maps import random_geometric_map
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+Engine = Callable[[int, int], Optional[list[int]]]
+
+
+def path_cost(M: Map, path: Optional[list[int]]) -> float:
+    """
+    The cost of a path over the cheapest road between consecutive nodes, or
+    infinity for None; fails if a step is not a road.
+    """
+    if path is None:
+        return math.inf
+    cost = 0.0
+    for node, neighbor in zip(path, path[1:]):
+        weights = [M.weights[edge] for edge in range(M.offsets[node], M.offsets[node + 1])
+                   if M.targets[edge] == neighbor]
+        assert weights, f"{node} -> {neighbor} is not a road"
+        cost += min(weights)
+    return cost
+
+
+def maps_and_pairs() -> list[tuple[str, Map, list[tuple[int, int]]]]:
+    """
+    The maps to check, each with its (start, goal) pairs.
+    """
+    maps = []
+    for name in ('map-10.pickle', 'map-40.pickle'):
+        M = load_map(os.path.join(HERE, name))
+        maps.append((name, M, [(start, goal) for start in range(len(M)) for goal in range(len(M))]))
+    # Every node as a goal from a sample of starts; this map has a few unreachable nodes
+    M = random_geometric_map(300, seed=2)
+    starts = random.Random(2).sample(range(len(M)), 12) + [len(M) - 1]
+    maps.append(('random-geometric-300', M, [(start, goal) for start in starts for goal in range(len(M))]))
+    return maps
+
+
+def check_engine(name: str, make_engine: Callable[[Map], Engine]) -> None:
+    """
+    Assert that an engine's route costs equal A*'s on every test pair.
+
+    Args:
+        name (str): The engine name, for failure messages.
+        make_engine (Callable[[Map], Engine]): Builds the engine's query
+            function for a map.
+    """
+    unreachable = 0
+    for map_name, M, pairs in maps_and_pairs():
+        query = make_engine(M)
+        for start, goal in pairs:
+            expected = path_cost(M, shortest_path(M, start, goal))
+            path = query(start, goal)
+            cost = path_cost(M, path)
+            if expected == math.inf:
+                unreachable += 1
+                assert path is None, f"{name} on {map_name}: {start} -> {goal} should be unreachable"
+                continue
+            assert path[0] == start and path[-1] == goal, f"{name} on {map_name}: {start} -> {goal} gave {path}"
+            assert math.isclose(cost, expected, rel_tol=1e-9, abs_tol=1e-9), \
+                f"{name} on {map_name}: {start} -> {goal} costs {cost}, A* {expected}"
+    assert unreachable > 0, "the test maps should include unreachable pairs"
+
+
+def test_bidirectional() -> None:
+    check_engine('bidirectional', lambda M: lambda start, goal: shortest_path(M, start, goal, mode="bidirectional"))
+
+
+def test_landmarks() -> None:
+    def make_engine(M: Map) -> Engine:
+        table = landmarks.LandmarkTable.build(M, count=4, workers=1)
+        return lambda start, goal: shortest_path(M, start, goal, landmarks=table)
+    check_engine('ALT', make_engine)
+
+
+def test_landmarks_in_process_leaves_no_worker_state() -> None:
+    landmarks.LandmarkTable.build(load_map(os.path.join(HERE, 'map-40.pickle')), count=4, workers=1)
+    assert landmarks._worker_graphs == {}
+
+
+def test_landmarks_bidirectional() -> None:
+    def make_engine(M: Map) -> Engine:
+        table = landmarks.LandmarkTable.build(M, count=4, workers=1)
+        return lambda start, goal: shortest_path(M, start, goal, mode="bidirectional", landmarks=table)
+    check_engine('bidirectional ALT', make_engine)
+
+
+def test_contraction_hierarchy() -> None:
+    check_engine('contraction hierarchy', lambda M: ContractionHierarchy.build(M).shortest_path)
+
+
+def test_contraction_hierarchy_small_witness_searches() -> None:
+    # Witness searches that give up early add extra shortcuts, which must not change the routes
+    check_engine('contraction hierarchy', lambda M: ContractionHierarchy.build(M, settle_limit=2).shortest_path)
+
+
+def test_distance_matrix() -> None:
+    M = load_map(os.path.join(HERE, 'map-40.pickle'))
+    sources, targets = list(range(0, len(M), 4)), list(range(len(M)))
+    matrix, paths = dm.distance_matrix(M, sources, targets, with_paths=True, workers=1)
+    assert dm._worker_state == {}
+    for source, row, row_paths in zip(sources, matrix, paths):
+        for target, cost, path in zip(targets, row, row_paths):
+            assert math.isclose(cost, path_cost(M, shortest_path(M, source, target)), abs_tol=1e-9), (source, target)
+            assert math.isclose(path_cost(M, path), cost, abs_tol=1e-9), (source, target)
+
+
+if __name__ == '__main__':
+    for name, function in list(globals().items()):
+        if name.startswith('test_'):
+            function()
+    print("All tests pass!")
@@ -0,0 +1,136 @@
+"""
+Checks for `indexed_heap.IndexedMinHeap` and the A* search built on it.
+
+Usage:
+    python heap_test.py
+"""
+import heapq
+import math
+import os
+import random
+from typing import Optional
+
+from bench_heap import path_length, shortest_path_heapq
+from helpers import Map, load_map
+from indexed_heap import IndexedMinHeap
+from student_code import shortest_path
+from synthetic_maps import grid_map, random_queries
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def dijkstra_distance(M: Map, start: int, goal: int) -> float:
+    """
+    The cost of the shortest path by a lazy-deletion heapq Dijkstra, as a reference.
+    """
+    distance = {start: 0.0}
+    queue = [(0.0, start)]
+    while queue:
+        d, node = heapq.heappop(queue)
+        if node == goal:
+            return d
+        if d > distance[node]:
+            continue
+        for edge in range(M.offsets[node], M.offsets[node + 1]):
+            candidate = d + M.weights[edge]
+            if candidate < distance.get(M.targets[edge], math.inf):
+                distance[M.targets[edge]] = candidate
+                heapq.heappush(queue, (candidate, M.targets[edge]))
+    return math.inf
+
+
+def test_push_pop_order() -> None:
+    rng = random.Random(0)
+    priorities = {item: rng.random() for item in range(200)}
+    heap = IndexedMinHeap()
+    for item, priority in priorities.items():
+        heap.push(item, priority)
+    assert len(heap) == 200
+    assert heap.peek() == min((priority, item) for item, priority in priorities.items())
+    popped = [heap.pop() for _ in range(200)]
+    assert popped == sorted((priority, item) for item, priority in priorities.items())
+    assert not heap
+
+
+def test_ties_order_like_heapq() -> None:
+    heap = IndexedMinHeap()
+    for item in (3, 1, 2):
+        heap.push(item, 1.0)
+    assert [heap.pop() for _ in range(3)] == [(1.0, 1), (1.0, 2), (1.0, 3)]
+
+
+def test_decrease_key() -> None:
+    heap = IndexedMinHeap()
+    for item in range(10):
+        heap.push(item, 10.0 + item)
+    heap.decrease_key(7, 1.0)
+    assert heap.priority(7) == 1.0
+    assert heap.pop() == (1.0, 7)
+    try:
+        heap.decrease_key(3, 100.0)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("raising a priority with decrease_key must fail")
+    assert heap.push_or_decrease(3, 0.5) is False
+    assert heap.push_or_decrease(42, 0.25) is True
+    assert heap.pop() == (0.25, 42)
+    assert heap.pop() == (0.5, 3)
+
+
+def test_membership_after_pop() -> None:
+    heap = IndexedMinHeap()
+    heap.push('a', 1.0)
+    heap.push('b', 2.0)
+    assert 'a' in heap and 'b' in heap
+    heap.pop()
+    assert 'a' not in heap and 'b' in heap
+    # A popped item can be queued again
+    heap.push('a', 3.0)
+    assert list(heap.pop() for _ in range(2)) == [(2.0, 'b'), (3.0, 'a')]
+    try:
+        heap.push('c', 1.0)
+        heap.push('c', 2.0)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("pushing a queued item twice must fail")
+
+
+def test_empty_pop() -> None:
+    heap = IndexedMinHeap()
+    try:
+        heap.pop()
+    except IndexError:
+        pass
+    else:
+        raise AssertionError("popping an empty heap must raise IndexError")
+    assert len(heap) == 0 and not heap
+
+
+def _check_map(M: Map, queries: list[tuple[int, int]]) -> None:
+    for start, goal in queries:
+        path: Optional[list[int]] = shortest_path(M, start, goal)
+        cost = path_length(M, path)
+        expected = dijkstra_distance(M, start, goal)
+        assert math.isclose(cost, expected) or cost == expected == math.inf, (start, goal, cost, expected)
+        if path is not None:
+            assert path[0] == start and path[-1] == goal
+        # The heapq baseline never re-queued improved nodes, so it is never shorter
+        baseline = path_length(M, shortest_path_heapq(M, start, goal))
+        assert cost <= baseline + 1e-9, (start, goal, cost, baseline)
+
+
+def test_shortest_path_matches_heapq() -> None:
+    for name in ('map-10.pickle', 'map-40.pickle'):
+        M = load_map(os.path.join(HERE, name))
+        _check_map(M, [(start, goal) for start in range(len(M)) for goal in range(len(M))])
+    M = grid_map(2000, seed=3)
+    _check_map(M, random_queries(M, 50, seed=3))
+
+
+if __name__ == '__main__':
+    for name, function in list(globals().items()):
+        if name.startswith('test_'):
+            function()
+    print("All tests pass!")
@@ -0,0 +1,195 @@
+from typing import Hashable, Iterator
+
+
+class IndexedMinHeap:
+    """
+    A binary min-heap that keeps a position map from each item to its slot,
+    so membership tests are O(1) and `decrease_key` is O(log n).
+
+    Entries are ordered by (priority, item), which matches the ordering of
+    `heapq` when it is fed (priority, item) tuples.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty heap.
+        """
+        self._heap: list[tuple[float, Hashable]] = []
+        self._position: dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+    def __contains__(self, item: Hashable) -> bool:
+        return item in self._position
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(self._position)
+
+    def priority(self, item: Hashable) -> float:
+        """
+        Return the current priority of a queued item.
+
+        Args:
+            item (Hashable): The queued item.
+
+        Returns:
+            float: The priority of the item.
+        """
+        return self._heap[self._position[item]][0]
+
+    def peek(self) -> tuple[float, Hashable]:
+        """
+        Return the (priority, item) pair with the lowest priority without removing it.
+
+        Returns:
+            tuple[float, Hashable]: The smallest entry of the heap.
+        """
+        return self._heap[0]
+
+    def push(self, item: Hashable, priority: float) -> None:
+        """
+        Insert a new item into the heap.
+
+        Args:
+            item (Hashable): The item to insert. It must not already be queued.
+            priority (float): The priority of the item.
+        """
+        if item in self._position:
+            raise KeyError(f"{item!r} is already in the heap")
+        self._heap.append((priority, item))
+        self._position[item] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def pop(self) -> tuple[float, Hashable]:
+        """
+        Remove and return the (priority, item) pair with the lowest priority.
+
+        Returns:
+            tuple[float, Hashable]: The smallest entry of the heap.
+        """
+        heap = self._heap
+        last = heap.pop()
+        if not heap:
+            del self._position[last[1]]
+            return last
+        top = heap[0]
+        heap[0] = last
+        self._position[last[1]] = 0
+        del self._position[top[1]]
+        self._sift_down(0)
+        return top
+
+    def decrease_key(self, item: Hashable, priority: float) -> None:
+        """
+        Lower the priority of a queued item.
+
+        Args:
+            item (Hashable): The queued item.
+            priority (float): The new priority, which must not exceed the current one.
+        """
+        index = self._position[item]
+        if priority > self._heap[index][0]:
+            raise ValueError(f"new priority {priority} is greater than current priority {self._heap[index][0]}")
+        self._heap[index] = (priority, item)
+        self._sift_up(index)
+
+    def push_or_decrease(self, item: Hashable, priority: float) -> bool:
+        """
+        Insert an item, or lower its priority if it is already queued with a higher one.
+
+        Args:
+            item (Hashable): The item to insert or update.
+            priority (float): The new priority.
+
+        Returns:
+            bool: True if the item was inserted, False if it was already queued.
+        """
+        index = self._position.get(item)
+        if index is None:
+            self.push(item, priority)
+            return True
+        if priority < self._heap[index][0]:
+            self._heap[index] = (priority, item)
+            self._sift_up(index)
+        return False
+
+    def update(self, item: Hashable, priority: float) -> None:
+        """
+        Change the priority of a queued item, up or down.
+
+        Args:
+            item (Hashable): The queued item.
+            priority (float): The new priority.
+        """
+        index = self._position[item]
+        old_priority = self._heap[index][0]
+        self._heap[index] = (priority, item)
+        if priority < old_priority:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def remove(self, item: Hashable) -> float:
+        """
+        Remove a queued item wherever it is in the heap.
+
+        Args:
+            item (Hashable): The queued item.
+
+        Returns:
+            float: The priority the item had.
+        """
+        heap = self._heap
+        index = self._position.pop(item)
+        priority = heap[index][0]
+        last = heap.pop()
+        if index < len(heap):
+            heap[index] = last
+            self._position[last[1]] = index
+            # The moved entry may belong above or below its new slot
+            if last < (priority, item):
+                self._sift_up(index)
+            else:
+                self._sift_down(index)
+        return priority
+
+    def _sift_up(self, index: int) -> None:
+        heap = self._heap
+        position = self._position
+        entry = heap[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            parent_entry = heap[parent]
+            if entry < parent_entry:
+                heap[index] = parent_entry
+                position[parent_entry[1]] = index
+                index = parent
+            else:
+                break
+        heap[index] = entry
+        position[entry[1]] = index
+
+    def _sift_down(self, index: int) -> None:
+        heap = self._heap
+        position = self._position
+        size = len(heap)
+        entry = heap[index]
+        child = 2 * index + 1
+        while child < size:
+            right = child + 1
+            if right < size and heap[right] < heap[child]:
+                child = right
+            child_entry = heap[child]
+            if child_entry < entry:
+                heap[index] = child_entry
+                position[child_entry[1]] = index
+                index = child
+                child = 2 * index + 1
+            else:
+                break
+        heap[index] = entry
+        position[entry[1]] = index
@@ -0,0 +1,234 @@
+"""
+ALT (A*, Landmarks, Triangle inequality) preprocessing for the route planner.
+
+A handful of landmark intersections are chosen, and the shortest distances
+from and to every landmark are stored. For any node v and goal t the
+triangle inequality gives the lower bounds
+
+    d(v, t) >= d(L, t) - d(L, v)    and    d(v, t) >= d(v, L) - d(t, L)
+
+which are usually much tighter than the straight-line distance when roads
+are far from straight lines.
+
+Usage:
+    python landmarks.py map-40.pickle [--count 8] [--workers 4]
+"""
+import argparse
+import math
+import os
+import pickle
+from array import array
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from helpers import Map, load_map
+from map_format import resolve_worker_graph, worker_graph
+from student_code import one_to_all
+
+LANDMARKS_VERSION = 1
+
+# Graph arrays shared with each worker process once, through the pool initializer
+_worker_graphs: dict[str, tuple[Sequence[int], Sequence[int], Sequence[float]]] = {}
+
+
+def landmarks_path(map_path: str) -> str:
+    """
+    Return where the landmark tables of a map are persisted, next to the map file.
+
+    Args:
+        map_path (str): The path of the map, e.g. "map-40.pickle".
+
+    Returns:
+        str: The path of the landmark file, e.g. "map-40.landmarks".
+    """
+    return os.path.splitext(map_path)[0] + '.landmarks'
+
+
+def select_landmarks(M: Map, count: int) -> list[int]:
+    """
+    Pick landmarks by farthest-point selection on the intersection coordinates.
+
+    The first landmark is the node farthest from the centre of the map; each
+    next one is the node whose distance to its closest chosen landmark is the
+    largest. This spreads landmarks around the edge of the map, where they
+    give the best bounds, without running a shortest-path search per pick.
+
+    Args:
+        M (Map): The map to choose landmarks on.
+        count (int): The number of landmarks.
+
+    Returns:
+        list[int]: The chosen landmark nodes.
+    """
+    num_nodes = len(M)
+    count = min(count, num_nodes)
+    if count <= 0:
+        return []
+    xs, ys = M.xs, M.ys
+    centre_x = sum(xs) / num_nodes
+    centre_y = sum(ys) / num_nodes
+    closest = array('d', ((xs[node] - centre_x)**2 + (ys[node] - centre_y)**2 for node in range(num_nodes)))
+    landmarks = []
+    while len(landmarks) < count:
+        landmark = max(range(num_nodes), key=closest.__getitem__)
+        landmarks.append(landmark)
+        x, y = xs[landmark], ys[landmark]
+        for node in range(num_nodes):
+            squared = (xs[node] - x)**2 + (ys[node] - y)**2
+            if squared < closest[node]:
+                closest[node] = squared
+    return landmarks
+
+
+def _init_worker(graphs: dict[str, tuple]) -> None:
+    for direction, graph in graphs.items():
+        _worker_graphs[direction] = resolve_worker_graph(graph)
+
+
+def _distance_table(task: tuple[str, int]) -> array:
+    direction, landmark = task
+    return one_to_all(*_worker_graphs[direction], landmark)
+
+
+class LandmarkTable:
+    """
+    Shortest distances from and to a set of landmarks, used as an A* lower bound.
+
+    Attributes:
+        landmarks (list[int]): The landmark nodes.
+        from_landmark (list[array]): from_landmark[i][v] is d(landmarks[i], v).
+        to_landmark (list[array]): to_landmark[i][v] is d(v, landmarks[i]).
+    """
+
+    def __init__(self, landmarks: list[int], from_landmark: list[array], to_landmark: list[array]) -> None:
+        """
+        Initialize the table from precomputed distances.
+
+        Args:
+            landmarks (list[int]): The landmark nodes.
+            from_landmark (list[array]): The distances from every landmark.
+            to_landmark (list[array]): The distances to every landmark.
+        """
+        self.landmarks = landmarks
+        self.from_landmark = from_landmark
+        self.to_landmark = to_landmark
+
+    @classmethod
+    def build(cls, M: Map, count: int = 8, workers: Optional[int] = None) -> "LandmarkTable":
+        """
+        Select landmarks on a map and compute their distance tables.
+
+        The one-to-all searches, two per landmark, run in a process pool. The
+        map arrays are sent to each worker once, not once per landmark; for a
+        memory-mapped map only its file path is sent.
+
+        Args:
+            M (Map): The map to preprocess.
+            count (int): The number of landmarks.
+            workers (Optional[int]): The number of worker processes; None uses
+                one per CPU and 1 runs everything in this process.
+
+        Returns:
+            LandmarkTable: The landmark tables of the map.
+        """
+        landmarks = select_landmarks(M, count)
+        graphs = {'forward': worker_graph(M), 'backward': worker_graph(M, reverse=True)}
+        tasks = [(direction, landmark) for direction in ('forward', 'backward') for landmark in landmarks]
+        if workers == 1 or len(tasks) <= 1:
+            # Searched here on local arrays, leaving the worker globals of this process unset
+            resolved = {direction: resolve_worker_graph(graph) for direction, graph in graphs.items()}
+            tables = [one_to_all(*resolved[direction], landmark) for direction, landmark in tasks]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(graphs,)) as pool:
+                tables = list(pool.map(_distance_table, tasks))
+        return cls(landmarks, tables[:len(landmarks)], tables[len(landmarks):])
+
+    def save(self, filename: str) -> None:
+        """
+        Save the landmark tables to a file.
+
+        Args:
+            filename (str): The name of the file, usually `landmarks_path(map_path)`.
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump({'version': LANDMARKS_VERSION,
+                         'landmarks': self.landmarks,
+                         'from_landmark': self.from_landmark,
+                         'to_landmark': self.to_landmark}, f)
+
+    @classmethod
+    def load(cls, filename: str) -> "LandmarkTable":
+        """
+        Load landmark tables saved with `save`.
+
+        Args:
+            filename (str): The name of the file to load.
+
+        Returns:
+            LandmarkTable: The loaded tables.
+        """
+        with open(filename, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('version') != LANDMARKS_VERSION:
+            raise ValueError(f"unsupported landmark file version {data.get('version')!r}")
+        return cls(data['landmarks'], data['from_landmark'], data['to_landmark'])
+
+    def bound_to(self, goal: int) -> Callable[[int], float]:
+        """
+        Return a function giving a lower bound on d(v, goal) for any node v.
+
+        Args:
+            goal (int): The goal node.
+
+        Returns:
+            Callable[[int], float]: The lower bound function.
+        """
+        pairs = [(self.from_landmark[i], self.to_landmark[i], self.from_landmark[i][goal], self.to_landmark[i][goal])
+                 for i in range(len(self.landmarks))]
+        return lambda node: _max_bound(pairs, node)
+
+    def bound_from(self, source: int) -> Callable[[int], float]:
+        """
+        Return a function giving a lower bound on d(source, v) for any node v.
+
+        Args:
+            source (int): The source node.
+
+        Returns:
+            Callable[[int], float]: The lower bound function.
+        """
+        # d(s, v) >= d(L, v) - d(L, s) and d(s, v) >= d(s, L) - d(v, L), i.e. the
+        # bound to a goal with the roles of the tables swapped
+        pairs = [(self.to_landmark[i], self.from_landmark[i], self.to_landmark[i][source], self.from_landmark[i][source])
+                 for i in range(len(self.landmarks))]
+        return lambda node: _max_bound(pairs, node)
+
+
+def _max_bound(pairs: list[tuple[array, array, float, float]], node: int) -> float:
+    best = 0.0
+    for from_table, to_table, from_goal, to_goal in pairs:
+        from_node = from_table[node]
+        to_node = to_table[node]
+        # Infinite entries mean a landmark is unreachable; they carry no bound
+        if from_goal < math.inf and from_node < math.inf and from_goal - from_node > best:
+            best = from_goal - from_node
+        if to_node < math.inf and to_goal < math.inf and to_node - to_goal > best:
+            best = to_node - to_goal
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('map', help="the map pickle to preprocess")
+    parser.add_argument('--count', type=int, default=8, help="the number of landmarks")
+    parser.add_argument('--workers', type=int, default=None, help="the number of worker processes")
+    args = parser.parse_args()
+
+    table = LandmarkTable.build(load_map(args.map), args.count, args.workers)
+    table.save(landmarks_path(args.map))
+    print(f"Saved {len(table.landmarks)} landmarks to {landmarks_path(args.map)}")
+
+
+if __name__ == '__main__':
+    main()
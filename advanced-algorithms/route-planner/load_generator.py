@@ -0,0 +1,160 @@
+"""
+Load generator for route_service.py: measures throughput and tail latency.
+
+Every connection keeps up to --window requests in flight. A --hot-fraction
+of the requests start from one of a few --hot-sources, like a fleet of
+vehicles leaving the same depots, which exercises request coalescing; the
+rest use random sources. With --spawn the service is started on a free
+port for the run and stopped afterwards.
+
+Usage:
+    python load_generator.py --spawn map-40.pickle [--workers 4]
+    python load_generator.py [--host 127.0.0.1] [--port 8765 | --unix /tmp/routes.sock] --nodes 40
+                             [--connections 8] [--window 16] [--requests 5000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from search_stats import percentile
+
+
+async def _open(host: str, port: int, unix: Optional[str]) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if unix is not None:
+        return await asyncio.open_unix_connection(unix)
+    return await asyncio.open_connection(host, port)
+
+
+async def _client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, requests: list[tuple[int, int]],
+                  window: int, latencies: list[float], errors: list[str]) -> None:
+    sent_at: dict[int, float] = {}
+    in_flight = asyncio.Semaphore(window)
+
+    async def receive() -> None:
+        for _ in requests:
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - sent_at.pop(response['id']))
+            if 'error' in response:
+                errors.append(response['error'])
+            in_flight.release()
+
+    receiver = asyncio.create_task(receive())
+    for request_id, (source, target) in enumerate(requests):
+        await in_flight.acquire()
+        sent_at[request_id] = time.perf_counter()
+        writer.write(json.dumps({'id': request_id, 'source': source, 'target': target}).encode() + b'\n')
+        await writer.drain()
+    await receiver
+    writer.close()
+
+
+async def _service_stats(host: str, port: int, unix: Optional[str]) -> dict:
+    reader, writer = await _open(host, port, unix)
+    writer.write(b'{"id": 0, "op": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def run_load(host: str, port: int, unix: Optional[str], num_nodes: int, connections: int, window: int,
+                   num_requests: int, hot_sources: int, hot_fraction: float, seed: int) -> dict:
+    """
+    Send a seeded workload to a running service and summarize it.
+
+    Returns:
+        dict: The throughput, latency percentiles and service counters of the run.
+    """
+    rng = random.Random(seed)
+    hot = [rng.randrange(num_nodes) for _ in range(hot_sources)]
+    requests = [(rng.choice(hot) if hot and rng.random() < hot_fraction else rng.randrange(num_nodes),
+                 rng.randrange(num_nodes)) for _ in range(num_requests)]
+    before = await _service_stats(host, port, unix)
+    streams = [await _open(host, port, unix) for _ in range(connections)]
+    latencies: list[float] = []
+    errors: list[str] = []
+    began = time.perf_counter()
+    await asyncio.gather(*(_client(reader, writer, requests[index::connections], window, latencies, errors)
+                           for index, (reader, writer) in enumerate(streams)))
+    elapsed = time.perf_counter() - began
+    after = await _service_stats(host, port, unix)
+
+    latencies.sort()
+    searches = after['searches'] - before['searches']
+    return {
+        'requests': num_requests,
+        'connections': connections,
+        'window': window,
+        'errors': len(errors),
+        'throughput_rps': round(num_requests / elapsed, 1),
+        'latency_ms': {name: round(percentile(latencies, fraction) * 1000, 3)
+                       for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0))},
+        'searches': searches,
+        'requests_per_search': round(num_requests / searches, 2) if searches else None,
+    }
+
+
+def spawn_service(map_path: str, workers: Optional[int], max_pending: int) -> tuple[subprocess.Popen, int, int]:
+    """
+    Start route_service.py on a free port and wait until it listens.
+
+    Returns:
+        tuple[subprocess.Popen, int, int]: The service process, its port and the
+            number of intersections it serves.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_service.py')
+    command = [sys.executable, script, map_path, '--port', '0', '--max-pending', str(max_pending)]
+    if workers is not None:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    banner = process.stdout.readline()
+    match = re.match(r"Serving (\d+) intersections on [^:]+:(\d+)", banner)
+    if match is None:
+        process.kill()
+        raise RuntimeError(f"route_service.py did not start: {banner!r}")
+    return process, int(match.group(2)), int(match.group(1))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--spawn', metavar='MAP', help="start route_service.py on this map for the run")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes of a spawned service")
+    parser.add_argument('--max-pending', type=int, default=1024, help="backpressure limit of a spawned service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help="connect to this Unix socket instead of TCP")
+    parser.add_argument('--nodes', type=int, help="the number of intersections of the served map")
+    parser.add_argument('--connections', type=int, default=8)
+    parser.add_argument('--window', type=int, default=16, help="requests in flight per connection")
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--hot-sources', type=int, default=8)
+    parser.add_argument('--hot-fraction', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    process = None
+    port, unix, num_nodes = args.port, args.unix, args.nodes
+    if args.spawn:
+        process, port, num_nodes = spawn_service(args.spawn, args.workers, args.max_pending)
+        unix = None
+    elif num_nodes is None:
+        parser.error("--nodes is required without --spawn")
+    try:
+        summary = asyncio.run(run_load(args.host, port, unix, num_nodes, args.connections, args.window,
+                                       args.requests, args.hot_sources, args.hot_fraction, args.seed))
+        print(json.dumps(summary))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
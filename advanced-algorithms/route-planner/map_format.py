@@ -0,0 +1,187 @@
+"""
+A versioned binary map format that is opened with mmap.
+
+The file holds the coordinate arrays, the CSR adjacency and the road
+weights of a Map as raw little-endian arrays, each aligned to 8 bytes:
+
+    header   magic "RMAP\\0\\0\\0\\0", version (u32), flags (u32),
+             num_nodes (u64), num_edges (u64), heuristic_scale (f64)
+    xs       num_nodes x f64
+    ys       num_nodes x f64
+    offsets  (num_nodes + 1) x i64
+    targets  num_edges x i64
+    lengths  num_edges x f64
+    weights  num_edges x f64, only if flags has HAS_WEIGHTS
+
+Opening a file maps it read-only and wraps the sections in memoryviews,
+so nothing is parsed or copied. Processes that open the same file share
+its pages through the OS page cache. This module never imports networkx.
+
+Usage:
+    python map_format.py map-40.pickle [map-10.pickle ...]
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from helpers import Map
+
+MAGIC = b'RMAP\0\0\0\0'
+FORMAT_VERSION = 1
+HAS_WEIGHTS = 1
+_HEADER = struct.Struct('<8sIIQQd')
+
+
+def binary_path(map_path: str) -> str:
+    """
+    Return where the binary version of a map lives, next to the map file.
+
+    Args:
+        map_path (str): The path of the map, e.g. "map-40.pickle".
+
+    Returns:
+        str: The path of the binary map, e.g. "map-40.rmap".
+    """
+    return os.path.splitext(map_path)[0] + '.rmap'
+
+
+def _check_byteorder() -> None:
+    if sys.byteorder != 'little':
+        raise OSError("binary maps are little-endian and can only be mapped on little-endian machines")
+
+
+def save_binary(M: Map, filename: str) -> None:
+    """
+    Write a map in the binary format.
+
+    Args:
+        M (Map): The map to write.
+        filename (str): The name of the file to write.
+    """
+    _check_byteorder()
+    has_weights = M.weights is not M.lengths
+    sections = [(M.xs, 'd'), (M.ys, 'd'), (M.offsets, 'q'), (M.targets, 'q'), (M.lengths, 'd')]
+    if has_weights:
+        sections.append((M.weights, 'd'))
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, HAS_WEIGHTS if has_weights else 0,
+                             len(M), len(M.targets), M.heuristic_scale))
+        for values, typecode in sections:
+            if not (isinstance(values, array) and values.typecode == typecode):
+                values = array(typecode, values)
+            values.tofile(f)
+
+
+def open_binary(filename: str) -> Map:
+    """
+    Open a binary map with mmap, without copying its arrays.
+
+    Args:
+        filename (str): The name of the file to open.
+
+    Returns:
+        Map: A map whose arrays are read-only views of the mapped file.
+    """
+    _check_byteorder()
+    with open(filename, 'rb') as f:
+        # The mapping stays valid after the file is closed
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapped) < _HEADER.size:
+        raise ValueError(f"{filename} is too short to be a binary map")
+    magic, version, flags, num_nodes, num_edges, heuristic_scale = _HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a binary map")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported binary map version {version}")
+    has_weights = bool(flags & HAS_WEIGHTS)
+    expected = _HEADER.size + 8 * (3 * num_nodes + 1 + (3 if has_weights else 2) * num_edges)
+    if len(mapped) != expected:
+        raise ValueError(f"{filename} has {len(mapped)} bytes, expected {expected}")
+
+    view = memoryview(mapped)
+    position = _HEADER.size
+
+    def section(count: int, typecode: str) -> memoryview:
+        nonlocal position
+        start, position = position, position + 8 * count
+        return view[start:position].cast(typecode)
+
+    xs = section(num_nodes, 'd')
+    ys = section(num_nodes, 'd')
+    offsets = section(num_nodes + 1, 'q')
+    targets = section(num_edges, 'q')
+    lengths = section(num_edges, 'd')
+    M = Map.from_arrays(xs, ys, offsets, targets, lengths)
+    if has_weights:
+        M.set_weights(section(num_edges, 'd'), heuristic_scale)
+    M.binary_path = filename
+    return M
+
+
+def worker_graph(M: Map, reverse: bool = False) -> tuple:
+    """
+    Return what a worker process needs to get the CSR arrays of a map.
+
+    For a memory-mapped map this is just the file path, so workers map the
+    same pages instead of receiving a pickled copy of the arrays.
+
+    Args:
+        M (Map): The map.
+        reverse (bool): Whether the worker needs the transposed arrays.
+
+    Returns:
+        tuple: Either (path, reverse) or the (offsets, targets, weights) arrays;
+            pass it to `resolve_worker_graph` in the worker.
+    """
+    if M.binary_path is not None:
+        return (M.binary_path, reverse)
+    return M.reverse() if reverse else (M.offsets, M.targets, M.weights)
+
+
+def resolve_worker_graph(graph: tuple) -> tuple:
+    """
+    Turn the result of `worker_graph` back into (offsets, targets, weights) arrays.
+
+    Args:
+        graph (tuple): The value returned by `worker_graph`.
+
+    Returns:
+        tuple: The (offsets, targets, weights) arrays.
+    """
+    if not isinstance(graph[0], str):
+        return graph
+    path, reverse = graph
+    M = open_binary(path)
+    return M.reverse() if reverse else (M.offsets, M.targets, M.weights)
+
+
+def convert(map_path: str) -> str:
+    """
+    Convert a pickled networkx map, such as map-40.pickle, to the binary format.
+
+    Args:
+        map_path (str): The path of the pickled map.
+
+    Returns:
+        str: The path of the written binary map.
+    """
+    # Only the converter needs networkx, to unpickle the graph
+    from helpers import load_map
+    output = binary_path(map_path)
+    save_binary(load_map(map_path, keep_graph=False), output)
+    return output
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('maps', nargs='+', help="the map pickles to convert")
+    args = parser.parse_args()
+    for map_path in args.maps:
+        print(f"Wrote {convert(map_path)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Plotly rendering of route-planner maps.
+
+Importing this module loads plotly; prefer `helpers.show_map`, which only
+imports it on first use.
+"""
+import math
+import os
+from typing import Optional
+
+from plotly.graph_objs import Data, Figure, Layout, Line, Marker, Scatter, XAxis, YAxis
+from plotly.offline import init_notebook_mode, iplot
+
+from route_map import Map
+
+# Maps with more intersections than this are decimated by default
+DEFAULT_MAX_NODES = 20000
+
+_notebook_mode_initialized = False
+
+
+def is_headless() -> bool:
+    """
+    Return whether figures should be built without being displayed.
+
+    Headless mode is enabled by setting the ROUTE_PLANNER_HEADLESS environment
+    variable to a non-empty value other than "0".
+    """
+    return os.environ.get('ROUTE_PLANNER_HEADLESS', '') not in ('', '0')
+
+
+def _decimate(M: Map, max_nodes: int, pinned: set[int]) -> list[int]:
+    """
+    Map every node to a representative node for level-of-detail rendering.
+
+    The bounding box of the map is split into about `max_nodes` square-ish
+    cells, and the first node seen in a cell represents all of its nodes.
+    Pinned nodes (start, goal and path) always represent themselves.
+
+    Returns:
+        list[int]: The representative of every node.
+    """
+    xs, ys = M.xs, M.ys
+    min_x, max_x = min(xs), max(xs)
+    min_y, max_y = min(ys), max(ys)
+    side = max(1, math.isqrt(max_nodes))
+    cell_width = (max_x - min_x) / side or 1.0
+    cell_height = (max_y - min_y) / side or 1.0
+    cell_representative: dict[int, int] = {}
+    representative = [0] * len(M)
+    for node in range(len(M)):
+        if node in pinned:
+            representative[node] = node
+            continue
+        column = min(side - 1, int((xs[node] - min_x) / cell_width))
+        row = min(side - 1, int((ys[node] - min_y) / cell_height))
+        representative[node] = cell_representative.setdefault(row * side + column, node)
+    return representative
+
+
+def _build_traces(M: Map, start: Optional[int], goal: Optional[int], path: Optional[list[int]],
+                  max_nodes: Optional[int]) -> tuple[Scatter, Scatter]:
+    xs, ys = M.xs, M.ys
+    offsets, targets = M.offsets, M.targets
+    path_nodes = set(path) if path else set()
+    pinned = path_nodes | {node for node in (start, goal) if node is not None}
+
+    if max_nodes is not None and len(M) > max_nodes:
+        representative = _decimate(M, max_nodes, pinned)
+        nodes = [node for node in range(len(M)) if representative[node] == node]
+        # Roads between two cells collapse into one segment between their representatives
+        segments = set()
+        for node in range(len(M)):
+            source = representative[node]
+            for edge in range(offsets[node], offsets[node + 1]):
+                target = representative[targets[edge]]
+                if source != target:
+                    segments.add((source, target) if source < target else (target, source))
+        segments = list(segments)
+    else:
+        nodes = range(len(M))
+        segments = []
+        for node in nodes:
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbor = targets[edge]
+                # Two-way roads are drawn once, from their lower-numbered end
+                if node < neighbor or (node > neighbor and node not in targets[offsets[neighbor]:offsets[neighbor + 1]]):
+                    segments.append((node, neighbor))
+
+    # Each segment is drawn as x0, x1, None so Plotly breaks the line between segments
+    edge_x = [None] * (3 * len(segments))
+    edge_y = [None] * (3 * len(segments))
+    for index, (source, target) in enumerate(segments):
+        edge_x[3 * index] = xs[source]
+        edge_x[3 * index + 1] = xs[target]
+        edge_y[3 * index] = ys[source]
+        edge_y[3 * index + 1] = ys[target]
+
+    node_x = [xs[node] for node in nodes]
+    node_y = [ys[node] for node in nodes]
+    node_color = [0] * len(node_x)
+    node_text = [""] * len(node_x)
+    for index, node in enumerate(nodes):
+        color = 0
+        if node in path_nodes:
+            color = 2
+        if node == start:
+            color = 3
+        elif node == goal:
+            color = 1
+        node_color[index] = color
+        node_text[index] = "Intersection " + str(node)
+
+    edge_trace = Scatter(
+        x=edge_x,
+        y=edge_y,
+        line=Line(width=0.5, color='#888'),
+        hoverinfo='none',
+        mode='lines')
+
+    node_trace = Scatter(
+        x=node_x,
+        y=node_y,
+        text=node_text,
+        mode='markers',
+        hoverinfo='text',
+        marker=Marker(
+            showscale=False,
+            # colorscale options
+            # 'Greys' | 'Greens' | 'Bluered' | 'Hot' | 'Picnic' | 'Portland' |
+            # Jet' | 'RdBu' | 'Blackbody' | 'Earth' | 'Electric' | 'YIOrRd' | 'YIGnBu'
+            colorscale='Hot',
+            reversescale=True,
+            color=node_color,
+            size=10 if len(node_x) <= 1000 else 4,
+            colorbar=dict(
+                thickness=15,
+                title='Node Connections',
+                xanchor='left',
+                titleside='right'
+            ),
+            line=dict(width=2 if len(node_x) <= 1000 else 0)))
+    return edge_trace, node_trace
+
+
+def show_map(M: Map, start: Optional[int] = None, goal: Optional[int] = None, path: Optional[list[int]] = None,
+             headless: Optional[bool] = None, max_nodes: Optional[int] = DEFAULT_MAX_NODES) -> Optional[Figure]:
+    """
+    Display the map using Plotly.
+
+    Traces are built in one pass over the map arrays. Maps with more than
+    `max_nodes` intersections are decimated: nodes are merged per grid cell
+    and roads between cells are drawn once, while the start, goal and path
+    nodes are always kept.
+
+    Args:
+        M (Map): The map to display.
+        start (Optional[int]): The starting node (default is None).
+        goal (Optional[int]): The goal node (default is None).
+        path (Optional[list[int]]): The path to highlight (default is None).
+        headless (Optional[bool]): If True, only build the figure without displaying
+            it; defaults to the ROUTE_PLANNER_HEADLESS environment variable.
+        max_nodes (Optional[int]): The level-of-detail budget; None draws every node.
+
+    Returns:
+        Optional[Figure]: The Plotly figure of the map when headless; None once it
+            has been displayed, so a notebook cell does not render it twice.
+    """
+    edge_trace, node_trace = _build_traces(M, start, goal, path, max_nodes)
+    fig = Figure(data=Data([edge_trace, node_trace]),
+                 layout=Layout(
+                    title='<br>Network graph made with Python',
+                    titlefont=dict(size=16),
+                    showlegend=False,
+                    hovermode='closest',
+                    margin=dict(b=20,l=5,r=5,t=40),
+                   
+                    xaxis=XAxis(showgrid=False, zeroline=False, showticklabels=False),
+                    yaxis=YAxis(showgrid=False, zeroline=False, showticklabels=False)))
+
+    if headless is None:
+        headless = is_headless()
+    if not headless:
+        global _notebook_mode_initialized
+        if not _notebook_mode_initialized:
+            init_notebook_mode(connected=True)
+            _notebook_mode_initialized = True
+        iplot(fig)
+        return None
+    return fig
@@ -0,0 +1,255 @@
+"""
+Incremental re-routing with Lifelong Planning A* (LPA*, Koenig and
+Likhachev, 2004) for maps whose road costs change while a route is in use.
+
+The planner keeps, for every node it has touched, its distance from the
+start `g` and a one-step lookahead `rhs` (the best g of a predecessor plus
+the road cost). A node whose two values differ is "inconsistent" and sits
+in the open set. After a batch of weight changes only the heads of the
+changed roads are re-examined, and the search repairs the part of the
+shortest-path tree those changes affect instead of starting over.
+
+Roads may cost nothing, and a cycle of free roads would let its nodes
+vouch for each other's outdated distances. So every distance carries the
+number of roads behind it, and of two equal distances the one over fewer
+roads is smaller: in that order every road, and so every cycle, costs
+something, and the shortest-path tree stays a tree.
+
+The repair costs in proportion to the part of the search behind a changed
+road: changes off the route are nearly free, while slowing a road of the
+route close to the start is about as expensive as a new search.
+"""
+import math
+import time
+from collections.abc import Mapping
+from typing import Optional
+
+from helpers import Map
+from indexed_heap import IndexedMinHeap
+from search_stats import SearchStats
+
+
+class LifelongPlanner:
+    """
+    A shortest-path search between two fixed nodes that can be repaired
+    after road costs change.
+
+    Attributes:
+        M (Map): The map being routed on; its weights are updated in place.
+        start (int): The starting node.
+        goal (int): The goal node.
+    """
+
+    def __init__(self, M: Map, start: int, goal: int) -> None:
+        """
+        Initialize the planner; the first `shortest_path` call runs the full search.
+
+        Args:
+            M (Map): The map to route on.
+            start (int): The starting node.
+            goal (int): The goal node.
+        """
+        self.M = M
+        self.start = start
+        self.goal = goal
+        self._g: dict[int, float] = {}
+        self._rhs: dict[int, float] = {start: 0.0}
+        # The number of roads behind every finite g and rhs, which breaks distance ties
+        self._g_roads: dict[int, int] = {}
+        self._rhs_roads: dict[int, int] = {start: 0}
+        self._h: dict[int, float] = {}
+        self._scale = M.heuristic_scale
+        self._open_set = IndexedMinHeap()
+        self._open_set.push(start, self._key(start))
+        # Open-set operations since the last shortest_path call, for SearchStats
+        self._pushes = 1
+        self._updates = 0
+
+    def _heuristic(self, node: int) -> float:
+        h = self._h.get(node)
+        if h is None:
+            xs, ys = self.M.xs, self.M.ys
+            h = self._scale * math.sqrt((xs[self.goal] - xs[node])**2 + (ys[self.goal] - ys[node])**2)
+            self._h[node] = h
+        return h
+
+    def _key(self, node: int) -> tuple[float, int, float]:
+        g, rhs = self._g.get(node, math.inf), self._rhs.get(node, math.inf)
+        g_roads, rhs_roads = self._g_roads.get(node, 0), self._rhs_roads.get(node, 0)
+        if rhs < g or (rhs == g and rhs_roads < g_roads):
+            g, g_roads = rhs, rhs_roads
+        return (g + self._heuristic(node), g_roads, g)
+
+    def _update_rhs(self, node: int) -> None:
+        # Sets rhs(node): the best g of a predecessor plus the road from it
+        if node == self.start:
+            return
+        reverse_offsets, sources, reverse_weights = self.M.reverse()
+        g, g_roads = self._g, self._g_roads
+        best, best_roads = math.inf, 0
+        for slot in range(reverse_offsets[node], reverse_offsets[node + 1]):
+            source = sources[slot]
+            candidate = g.get(source, math.inf) + reverse_weights[slot]
+            if candidate <= best and candidate != math.inf:
+                roads = g_roads[source] + 1
+                if candidate < best or roads < best_roads:
+                    best, best_roads = candidate, roads
+        self._rhs[node] = best
+        self._rhs_roads[node] = best_roads
+
+    def _consistent(self, node: int) -> bool:
+        g = self._g.get(node, math.inf)
+        if g != self._rhs.get(node, math.inf):
+            return False
+        return g == math.inf or self._g_roads[node] == self._rhs_roads[node]
+
+    def _update_node(self, node: int) -> None:
+        # Requeues a node if it became inconsistent, or drops it if it no longer is
+        open_set = self._open_set
+        if not self._consistent(node):
+            if node in open_set:
+                open_set.update(node, self._key(node))
+                self._updates += 1
+            else:
+                open_set.push(node, self._key(node))
+                self._pushes += 1
+        elif node in open_set:
+            open_set.remove(node)
+
+    def update_weights(self, changes: Mapping[int, float]) -> None:
+        """
+        Change the cost of some roads and mark the affected nodes for repair.
+
+        The map is updated with `Map.update_weights`; the repair itself runs on
+        the next `shortest_path` call, so several batches can be applied first.
+
+        Args:
+            changes (Mapping[int, float]): The new cost of every changed road, keyed
+                by road index (see `Map.find_edge`).
+        """
+        M = self.M
+        M.reverse()
+        M.update_weights(changes)
+        if M.heuristic_scale < self._scale:
+            # The old heuristic may now overestimate, so every key is recomputed
+            self._scale = M.heuristic_scale
+            self._h.clear()
+            queued = list(self._open_set)
+            self._open_set = IndexedMinHeap()
+            for node in queued:
+                self._open_set.push(node, self._key(node))
+            self._pushes += len(queued)
+        targets = M.targets
+        for node in {targets[edge] for edge in changes}:
+            if node != self.start:
+                self._update_rhs(node)
+                self._update_node(node)
+
+    def shortest_path(self, stats: Optional[SearchStats] = None) -> Optional[list[int]]:
+        """
+        Bring the search up to date with the current weights and return the route.
+
+        Args:
+            stats (Optional[SearchStats]): If given, receives the search counters.
+
+        Returns:
+            Optional[list[int]]: The shortest path from the start to the goal, or None if no path is found.
+        """
+        began = time.perf_counter() if stats is not None else 0.0
+        offsets, targets, weights = self.M.offsets, self.M.targets, self.M.weights
+        g, rhs = self._g, self._rhs
+        g_roads, rhs_roads = self._g_roads, self._rhs_roads
+        g_get, rhs_get = g.get, rhs.get
+        consistent = self._consistent
+        heuristic = self._heuristic
+        open_set = self._open_set
+        goal = self.goal
+        inf = math.inf
+        expanded = relaxed = pushes = updates = 0
+        peak_open_set = len(open_set)
+        while open_set:
+            # Stop once the goal is consistent and no queued key is below its
+            # key, which is (d, roads, d) for its distance d since h(goal) is 0
+            if consistent(goal):
+                goal_g = g_get(goal, inf)
+                if not open_set.peek()[0] < (goal_g, g_roads.get(goal, 0), goal_g):
+                    break
+            _, current = open_set.pop()
+            expanded += 1
+            first_edge, end_edge = offsets[current], offsets[current + 1]
+            relaxed += end_edge - first_edge
+            current_g, current_rhs = g_get(current, inf), rhs_get(current, inf)
+            if current_rhs < current_g or (current_rhs == current_g and rhs_roads[current] < g_roads[current]):
+                # Overconsistent: settle it, which can only lower its successors'
+                # rhs and so their keys; this is the hot path, inlined
+                g[current] = current_rhs
+                g_roads[current] = roads = rhs_roads[current]
+                roads += 1
+                for edge in range(first_edge, end_edge):
+                    neighbor = targets[edge]
+                    candidate = current_rhs + weights[edge]
+                    neighbor_rhs = rhs_get(neighbor, inf)
+                    if candidate < neighbor_rhs or (candidate == neighbor_rhs and roads < rhs_roads[neighbor]):
+                        rhs[neighbor] = candidate
+                        rhs_roads[neighbor] = roads
+                        neighbor_g = g_get(neighbor, inf)
+                        if neighbor_g != candidate or g_roads[neighbor] != roads:
+                            if candidate < neighbor_g or (candidate == neighbor_g and roads < g_roads[neighbor]):
+                                key = (candidate + heuristic(neighbor), roads, candidate)
+                            else:
+                                key = (neighbor_g + heuristic(neighbor), g_roads[neighbor], neighbor_g)
+                            if open_set.push_or_decrease(neighbor, key):
+                                pushes += 1
+                            else:
+                                updates += 1
+                        elif neighbor in open_set:
+                            open_set.remove(neighbor)
+            else:
+                # Underconsistent: its g was too low, so it and its successors are rechecked
+                g[current] = inf
+                del g_roads[current]
+                self._update_rhs(current)
+                self._update_node(current)
+                for edge in range(first_edge, end_edge):
+                    neighbor = targets[edge]
+                    if neighbor != self.start:
+                        self._update_rhs(neighbor)
+                        self._update_node(neighbor)
+            if stats is not None and len(open_set) > peak_open_set:
+                peak_open_set = len(open_set)
+        self._pushes += pushes
+        self._updates += updates
+
+        reconstructed = time.perf_counter() if stats is not None else 0.0
+        path = self._extract_path()
+        if stats is not None:
+            stats.record(expanded, relaxed, self._pushes, self._updates, expanded, 0, peak_open_set,
+                         (0.0, reconstructed - began, time.perf_counter() - reconstructed))
+        self._pushes = self._updates = 0
+        return path
+
+    def _extract_path(self) -> Optional[list[int]]:
+        # Walks back from the goal along predecessors whose g explains the
+        # current node's: g(pred) + w == g(node) over one road fewer. The road
+        # count falls at every step, so a cycle of free roads cannot trap the walk
+        g, g_roads = self._g, self._g_roads
+        if g.get(self.goal, math.inf) == math.inf:
+            return None
+        reverse_offsets, sources, reverse_weights = self.M.reverse()
+        path = [self.goal]
+        current = self.goal
+        while current != self.start:
+            current_g, roads = g[current], g_roads[current] - 1
+            tolerance = 1e-9 * max(1.0, current_g)
+            for slot in range(reverse_offsets[current], reverse_offsets[current + 1]):
+                source = sources[slot]
+                if (g_roads.get(source) == roads and source in g
+                        and abs(g[source] + reverse_weights[slot] - current_g) <= tolerance):
+                    break
+            else:
+                # No predecessor explains g: the search has not settled a path here
+                return None
+            current = source
+            path.append(current)
+        path.reverse()
+        return path
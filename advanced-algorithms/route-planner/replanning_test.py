@@ -0,0 +1,75 @@
+"""
+Checks for `replanning.LifelongPlanner`.
+
+Usage:
+    python replanning_test.py
+"""
+import math
+import os
+import random
+from array import array
+
+from engines_test import path_cost
+from helpers import Map, load_map
+from replanning import LifelongPlanner
+from student_code import one_to_all, shortest_path
+from synthetic_maps import random_geometric_map
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_matches_astar_after_updates() -> None:
+    M = load_map(os.path.join(HERE, 'map-40.pickle'))
+    rng = random.Random(0)
+    for start, goal in [(5, 34), (8, 24), (5, 5), (0, 39)]:
+        planner = LifelongPlanner(M, start, goal)
+        assert math.isclose(path_cost(M, planner.shortest_path()), path_cost(M, shortest_path(M, start, goal)))
+        for _ in range(5):
+            changes = {edge: M.weights[edge] * rng.choice((0.5, 2.0, 10.0))
+                       for edge in rng.sample(range(len(M.targets)), 6)}
+            planner.update_weights(changes)
+            assert math.isclose(path_cost(M, planner.shortest_path()), path_cost(M, shortest_path(M, start, goal)))
+
+
+def test_zero_cost_cycle() -> None:
+    # 0 -> 1 -> 2 -> 3, with a free two-way road between 1 and 2
+    M = Map.from_arrays(array('d', [0, 1, 2, 3]), array('d', [0, 0, 0, 0]), array('q', [0, 1, 3, 5, 5]),
+                        array('q', [1, 2, 0, 1, 3]), weights=array('d', [1, 0, 1, 0, 1]))
+    assert LifelongPlanner(M, 0, 3).shortest_path() == [0, 1, 2, 3]
+
+
+def test_free_roads_after_updates() -> None:
+    # Updates that make roads free create zero-cost cycles, whose nodes must
+    # not keep each other's old distances alive
+    for seed in range(6):
+        M = random_geometric_map(400, seed=seed)
+        rng = random.Random(seed)
+        for _ in range(5):
+            start, goal = rng.randrange(len(M)), rng.randrange(len(M))
+            planner = LifelongPlanner(M, start, goal)
+            for _ in range(25):
+                path = planner.shortest_path()
+                expected = one_to_all(M.offsets, M.targets, M.weights, start)[goal]
+                if expected == math.inf:
+                    assert path is None, (seed, start, goal)
+                else:
+                    assert path[0] == start and path[-1] == goal, (seed, start, goal, path)
+                    assert math.isclose(path_cost(M, path), expected, rel_tol=1e-9, abs_tol=1e-12), (seed, start, goal)
+                planner.update_weights({edge: M.lengths[edge] * rng.choice((0.3, 0.8, 1.5, 5.0, 0.0))
+                                        for edge in rng.sample(range(len(M.targets)), 8)})
+
+
+def test_inconsistent_g_does_not_loop() -> None:
+    M = load_map(os.path.join(HERE, 'map-40.pickle'))
+    planner = LifelongPlanner(M, 5, 34)
+    planner.shortest_path()
+    # Only the goal has a distance, so no predecessor explains it
+    planner._g, planner._g_roads = {34: 1.0}, {34: 3}
+    assert planner._extract_path() is None
+
+
+if __name__ == '__main__':
+    for name, function in list(globals().items()):
+        if name.startswith('test_'):
+            function()
+    print("All tests pass!")
@@ -0,0 +1,386 @@
+"""
+The routing core of the route planner: the Map and its loader.
+
+This module only depends on the standard library, so batch routing
+workers can import it cheaply. Plotting lives in map_plot.py.
+"""
+import bisect
+import math
+import os
+import pickle
+from array import array
+from collections.abc import Iterator, Mapping, Sequence
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import networkx as nx
+
+    from spatial_index import SpatialGrid
+
+class _IntersectionsView(Mapping):
+    """
+    A read-only {node: (x, y)} view over the coordinate arrays of a Map.
+    """
+
+    def __init__(self, xs: Sequence[float], ys: Sequence[float]) -> None:
+        self._xs = xs
+        self._ys = ys
+
+    def __getitem__(self, node: int) -> tuple[float, float]:
+        if not isinstance(node, int) or not 0 <= node < len(self._xs):
+            raise KeyError(node)
+        return (self._xs[node], self._ys[node])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(len(self._xs)))
+
+    def __len__(self) -> int:
+        return len(self._xs)
+
+
+class _RoadsView(Sequence):
+    """
+    A read-only [node] -> list of neighbours view over the CSR arrays of a Map.
+    """
+
+    def __init__(self, offsets: Sequence[int], targets: Sequence[int]) -> None:
+        self._offsets = offsets
+        self._targets = targets
+
+    def __getitem__(self, node: int) -> list[int]:
+        if node < 0:
+            node += len(self)
+        if not 0 <= node < len(self):
+            raise IndexError(node)
+        return list(self._targets[self._offsets[node]:self._offsets[node + 1]])
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+
+class Map:
+    """
+    A road map stored in compressed sparse row (CSR) form.
+
+    Intersections are numbered 0..n-1. The roads leaving node `u` are the
+    entries `targets[offsets[u]:offsets[u + 1]]`, and `lengths` holds the
+    Euclidean length of each of those roads. Coordinates live in the `xs`
+    and `ys` float64 arrays.
+
+    Attributes:
+        xs (array[float]): The x coordinate of every intersection.
+        ys (array[float]): The y coordinate of every intersection.
+        offsets (array[int]): The CSR row offsets, of length n + 1.
+        targets (array[int]): The CSR column indices, one per directed road.
+        lengths (array[float]): The length of every directed road.
+        weights (Sequence[float]): The cost of every directed road used by the
+            route planner; the same array as `lengths` unless custom weights are set.
+        heuristic_scale (float): The largest factor by which the straight-line
+            distance can be scaled while staying a lower bound on `weights`.
+        intersections (Mapping[int, tuple[float, float]]): A lazy {node: (x, y)} view.
+        roads (Sequence[list[int]]): A lazy view of the neighbours of every node.
+        binary_path (Optional[str]): The binary map file the arrays are memory-mapped
+            from, if any (see map_format.py).
+    """
+
+    def __init__(self, G: Optional["nx.Graph"] = None, keep_graph: bool = True,
+                 weight: Optional[str] = None) -> None:
+        """
+        Initialize the Map object with a graph.
+
+        Args:
+            G (Optional[nx.Graph]): A NetworkX graph representing the map, whose
+                nodes are 0..n-1 and carry a "pos" attribute. Use `Map.from_arrays`
+                to build a map without a graph.
+            keep_graph (bool): Whether to keep a reference to G. Dropping it keeps
+                only the compact arrays in memory.
+            weight (Optional[str]): The name of an edge attribute, such as a travel
+                time, to use as road cost instead of the Euclidean length.
+        """
+        self._graph = None
+        if G is None:
+            return
+        num_nodes = G.number_of_nodes()
+        if any(node not in G for node in range(num_nodes)):
+            raise ValueError("map nodes must be numbered 0..n-1")
+        xs = array('d', bytes(8 * num_nodes))
+        ys = array('d', bytes(8 * num_nodes))
+        offsets = array('q', [0])
+        targets = array('q')
+        weights = array('d') if weight is not None else None
+        for node in range(num_nodes):
+            xs[node], ys[node] = G.nodes[node]['pos']
+            for neighbor, data in G[node].items():
+                targets.append(neighbor)
+                if weights is not None:
+                    weights.append(data[weight])
+            offsets.append(len(targets))
+        self._set_arrays(xs, ys, offsets, targets)
+        if weights is not None:
+            self.set_weights(weights)
+        if keep_graph:
+            self._graph = G
+
+    @classmethod
+    def from_arrays(cls, xs: Sequence[float], ys: Sequence[float], offsets: Sequence[int],
+                    targets: Sequence[int], lengths: Optional[Sequence[float]] = None,
+                    weights: Optional[Sequence[float]] = None) -> "Map":
+        """
+        Build a map directly from its CSR arrays, without a NetworkX graph.
+
+        Args:
+            xs (Sequence[float]): The x coordinate of every intersection.
+            ys (Sequence[float]): The y coordinate of every intersection.
+            offsets (Sequence[int]): The CSR row offsets, of length n + 1.
+            targets (Sequence[int]): The CSR column indices.
+            lengths (Optional[Sequence[float]]): The road lengths; computed from
+                the coordinates when omitted.
+            weights (Optional[Sequence[float]]): Custom road costs; the lengths
+                are used when omitted.
+
+        Returns:
+            Map: The map backed by the given arrays.
+        """
+        if len(xs) != len(ys) or len(offsets) != len(xs) + 1 or offsets[-1] != len(targets):
+            raise ValueError("inconsistent CSR arrays")
+        M = cls()
+        M._set_arrays(xs, ys, offsets, targets, lengths)
+        if weights is not None:
+            M.set_weights(weights)
+        return M
+
+    def _set_arrays(self, xs: Sequence[float], ys: Sequence[float], offsets: Sequence[int],
+                    targets: Sequence[int], lengths: Optional[Sequence[float]] = None) -> None:
+        self.xs = xs
+        self.ys = ys
+        self.offsets = offsets
+        self.targets = targets
+        if lengths is None:
+            lengths = array('d', bytes(8 * len(targets)))
+            for node in range(len(xs)):
+                x, y = xs[node], ys[node]
+                for edge in range(offsets[node], offsets[node + 1]):
+                    neighbor = targets[edge]
+                    # Same formula as student_code.heuristic, so costs match bit for bit
+                    lengths[edge] = math.sqrt((xs[neighbor] - x)**2 + (ys[neighbor] - y)**2)
+        self.lengths = lengths
+        self.weights = lengths
+        self.heuristic_scale = 1.0
+        self._reverse = None
+        self._spatial_index = None
+        self.binary_path = None
+        self.intersections = _IntersectionsView(xs, ys)
+        self.roads = _RoadsView(offsets, targets)
+
+    def __len__(self) -> int:
+        return len(self.xs)
+
+    def nbytes(self) -> int:
+        """
+        Return the memory taken by the map arrays, in bytes.
+        """
+        arrays = [self.xs, self.ys, self.offsets, self.targets, self.lengths]
+        if self.weights is not self.lengths:
+            arrays.append(self.weights)
+        return sum(len(values) * values.itemsize for values in arrays)
+
+    def reverse(self) -> tuple[Sequence[int], Sequence[int], Sequence[float]]:
+        """
+        Return the transposed CSR arrays, i.e. the roads entering every node.
+
+        The result is cached until the weights change.
+
+        Returns:
+            tuple[Sequence[int], Sequence[int], Sequence[float]]: The (offsets, sources,
+                weights) arrays, where sources[offsets[v]:offsets[v + 1]] are the nodes
+                with a road into v.
+        """
+        if self._reverse is not None:
+            return self._reverse
+        num_nodes = len(self)
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        reverse_offsets = array('q', bytes(8 * (num_nodes + 1)))
+        for edge in range(len(targets)):
+            reverse_offsets[targets[edge] + 1] += 1
+        for node in range(num_nodes):
+            reverse_offsets[node + 1] += reverse_offsets[node]
+        fill = array('q', reverse_offsets[:-1])
+        sources = array('q', bytes(8 * len(targets)))
+        reverse_weights = array('d', bytes(8 * len(targets)))
+        for node in range(num_nodes):
+            for edge in range(offsets[node], offsets[node + 1]):
+                slot = fill[targets[edge]]
+                fill[targets[edge]] = slot + 1
+                sources[slot] = node
+                reverse_weights[slot] = weights[edge]
+        self._reverse = (reverse_offsets, sources, reverse_weights)
+        return self._reverse
+
+    def spatial_index(self, filename: Optional[str] = None) -> "SpatialGrid":
+        """
+        Return the spatial index used to snap coordinates to intersections.
+
+        It is created on first use and kept for the lifetime of the map.
+
+        Args:
+            filename (Optional[str]): An index file saved next to the map, usually
+                `spatial_index_path(map_path)`; when it exists the index is loaded
+                from it instead of built.
+
+        Returns:
+            SpatialGrid: The grid index of the intersections.
+        """
+        if self._spatial_index is None:
+            # Imported here because spatial_index.py imports this module
+            from spatial_index import SpatialGrid
+            if filename is not None and os.path.exists(filename):
+                self._spatial_index = SpatialGrid.load(filename, self)
+            else:
+                self._spatial_index = SpatialGrid.build(self)
+        return self._spatial_index
+
+    def set_weights(self, weights: Optional[Sequence[float]], heuristic_scale: Optional[float] = None) -> None:
+        """
+        Replace the road costs used by the route planner, e.g. with travel times.
+
+        The straight-line heuristic is rescaled so it never overestimates the
+        new costs, which keeps A* optimal.
+
+        Args:
+            weights (Optional[Sequence[float]]): One non-negative cost per entry of
+                `targets`, or None to go back to the Euclidean lengths.
+            heuristic_scale (Optional[float]): The heuristic scale of these weights,
+                if already known; it is computed with a pass over the weights otherwise.
+        """
+        self._reverse = None
+        # The weights no longer match the binary file the map was opened from, if any
+        self.binary_path = None
+        if weights is None:
+            self.weights = self.lengths
+            self.heuristic_scale = 1.0
+            return
+        if not isinstance(weights, (array, memoryview)):
+            weights = array('d', weights)
+        if len(weights) != len(self.targets):
+            raise ValueError(f"expected {len(self.targets)} weights, got {len(weights)}")
+        if heuristic_scale is None:
+            scale = math.inf
+            for weight, length in zip(weights, self.lengths):
+                if weight < 0:
+                    raise ValueError("road weights must be non-negative")
+                if length > 0:
+                    scale = min(scale, weight / length)
+            heuristic_scale = 1.0 if scale == math.inf else scale
+        self.weights = weights
+        self.heuristic_scale = heuristic_scale
+
+    def find_edge(self, source: int, target: int) -> int:
+        """
+        Return the index of the road from one intersection to another.
+
+        Args:
+            source (int): The intersection the road leaves.
+            target (int): The intersection the road enters.
+
+        Returns:
+            int: The index of the road in `targets` and `weights`.
+        """
+        targets = self.targets
+        for edge in range(self.offsets[source], self.offsets[source + 1]):
+            if targets[edge] == target:
+                return edge
+        raise KeyError(f"no road from {source} to {target}")
+
+    def update_weights(self, changes: Mapping[int, float]) -> None:
+        """
+        Change the cost of some roads in place, e.g. after a traffic update.
+
+        Unlike `set_weights` this costs O(1) per changed road: the cached
+        reverse arrays are patched rather than dropped, and the heuristic
+        scale is only ever lowered, which keeps it a lower bound without a
+        pass over every weight. Landmark tables and contraction hierarchies
+        built from the old weights no longer match the map.
+
+        Args:
+            changes (Mapping[int, float]): The new non-negative cost of every changed
+                road, keyed by road index (see `find_edge`).
+        """
+        for edge, weight in changes.items():
+            if not 0 <= edge < len(self.targets):
+                raise IndexError(f"road index {edge} out of range")
+            if weight < 0:
+                raise ValueError("road weights must be non-negative")
+        # Lengths and memory-mapped weights must not be written to, so copy them first
+        if self.weights is self.lengths or not isinstance(self.weights, array):
+            self.weights = array('d', self.weights)
+        self.binary_path = None
+        weights, lengths = self.weights, self.lengths
+        scale = self.heuristic_scale
+        for edge, weight in changes.items():
+            weights[edge] = weight
+            if weight < scale * lengths[edge]:
+                scale = weight / lengths[edge]
+            if self._reverse is not None:
+                self._reverse[2][self._reverse_edge(edge)] = weight
+        self.heuristic_scale = scale
+
+    def _reverse_edge(self, edge: int) -> int:
+        # The slot of a road in the reverse arrays. reverse() fills the slots
+        # of a node in increasing road order, so parallel roads keep their order
+        offsets, targets = self.offsets, self.targets
+        source = bisect.bisect_right(offsets, edge) - 1
+        target = targets[edge]
+        parallel = sum(1 for other in range(offsets[source], edge) if targets[other] == target)
+        reverse_offsets, sources, _ = self._reverse
+        for slot in range(reverse_offsets[target], reverse_offsets[target + 1]):
+            if sources[slot] == source:
+                if parallel == 0:
+                    return slot
+                parallel -= 1
+        raise AssertionError("reverse arrays are out of sync with the map")
+
+    def to_networkx(self) -> "nx.Graph":
+        """
+        Return the map as a NetworkX graph, building it from the arrays if needed.
+
+        Returns:
+            nx.Graph: A graph whose nodes carry a "pos" attribute.
+        """
+        if self._graph is not None:
+            return self._graph
+        # Imported here so array-only maps never load networkx
+        import networkx as nx
+        G = nx.Graph()
+        for node in range(len(self)):
+            G.add_node(node, pos=[self.xs[node], self.ys[node]])
+        for node in range(len(self)):
+            for edge in range(self.offsets[node], self.offsets[node + 1]):
+                G.add_edge(node, self.targets[edge])
+        return G
+
+    def save(self, filename):
+        """
+        Save the map to a file.
+
+        Args:
+            filename (str): The name of the file to save the map to.
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump(self.to_networkx(), f)
+
+def load_map(name: str, keep_graph: bool = True, weight: Optional[str] = None) -> Map:
+    """
+    Load a map from a file.
+
+    Args:
+        name (str): The name of the file to load the map from.
+        keep_graph (bool): Whether the map keeps the unpickled NetworkX graph
+            next to its compact arrays.
+        weight (Optional[str]): The edge attribute to use as road cost, if any.
+
+    Returns:
+        Map: The loaded map.
+    """    
+    with open(name, 'rb') as f:
+        G = pickle.load(f)
+    return Map(G, keep_graph=keep_graph, weight=weight)
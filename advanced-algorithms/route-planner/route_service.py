@@ -0,0 +1,318 @@
+"""
+An asyncio route-query service over a local TCP or Unix socket.
+
+Clients send one JSON request per line and get one JSON response per line,
+matched by "id"; responses may arrive out of order:
+
+    {"id": 1, "source": 5, "target": 34}
+    {"id": 1, "path": [5, 16, 37, 12, 34], "cost": 0.71}
+
+A request for an unreachable target gets "path" and "cost" null, and a bad
+request gets an "error". {"id": 2, "op": "stats"} returns the service counters.
+
+Searches run in a process pool whose workers receive the map arrays once,
+as in distance_matrix.py; a memory-mapped map only sends its file path.
+Requests are queued per source: while every worker is busy, requests that
+share a source pile up on the same entry and are answered by a single
+one-to-many search when a worker frees up. A lone request gets an A* search
+instead. An idle service dispatches at once, so batching adds no latency.
+
+Backpressure: at most --max-pending requests are accepted at a time. Once
+the limit is reached, connections stop being read, so clients are slowed
+down by their socket buffers instead of growing the service's memory.
+
+Usage:
+    python route_service.py map-40.pickle [--host 127.0.0.1] [--port 8765]
+                            [--unix /tmp/routes.sock] [--workers 4] [--max-pending 1024]
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from helpers import Map, load_map
+from map_format import open_binary
+from student_code import one_to_many, reconstruct_path, shortest_route
+
+# The map, rebuilt in each worker process once, through the pool initializer
+_worker_state: dict[str, Map] = {}
+
+Route = tuple[Optional[float], Optional[list[int]]]
+
+
+def _worker_map(M: Map) -> tuple:
+    # What a worker needs to rebuild the map: its binary file, or its arrays.
+    # A* needs the coordinates too, so map_format.worker_graph is not enough
+    if M.binary_path is not None:
+        return (M.binary_path,)
+    weights = None if M.weights is M.lengths else M.weights
+    return (M.xs, M.ys, M.offsets, M.targets, M.lengths, weights, M.heuristic_scale)
+
+
+def _init_worker(state: tuple) -> None:
+    if len(state) == 1:
+        _worker_state['map'] = open_binary(state[0])
+        return
+    xs, ys, offsets, targets, lengths, weights, heuristic_scale = state
+    M = Map.from_arrays(xs, ys, offsets, targets, lengths)
+    if weights is not None:
+        M.set_weights(weights, heuristic_scale)
+    _worker_state['map'] = M
+
+
+def _route_batch(source: int, targets: list[int]) -> list[Route]:
+    M = _worker_state['map']
+    if len(targets) == 1:
+        # The search's own distance, like one_to_many's below; re-adding the
+        # path's roads could pick a different one of two parallel roads
+        return [shortest_route(M, source, targets[0])]
+    # One search answers every queued request from this source
+    distance, came_from = one_to_many(M.offsets, M.targets, M.weights, source, targets)
+    routes = []
+    for target in targets:
+        if target in distance:
+            routes.append((distance[target], reconstruct_path(came_from, target)))
+        else:
+            routes.append((None, None))
+    return routes
+
+
+class RouteService:
+    """
+    Routes requests to a process pool, coalescing requests that share a source.
+
+    Attributes:
+        M (Map): The map being served.
+        workers (int): The number of worker processes, and of searches in flight.
+        max_pending (int): The most requests accepted but not yet answered.
+        counters (dict[str, int]): "requests", "searches" and "errors" so far.
+    """
+
+    def __init__(self, M: Map, workers: Optional[int] = None, max_pending: int = 1024) -> None:
+        """
+        Initialize the service; call `start` from a running event loop to start the pool.
+
+        Args:
+            M (Map): The map to serve.
+            workers (Optional[int]): The number of worker processes; None uses one per CPU.
+            max_pending (int): The most requests accepted but not yet answered.
+        """
+        self.M = M
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.counters = {'requests': 0, 'searches': 0, 'errors': 0}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._ready: Optional[asyncio.Queue] = None
+        # Requests waiting for a worker, grouped by source: {source: [(target, future)]}
+        self._batches: dict[int, list[tuple[int, asyncio.Future]]] = {}
+        self._dispatchers: list[asyncio.Task] = []
+        self._pending = 0
+
+    async def start(self) -> None:
+        """
+        Start the worker pool and the dispatchers feeding it.
+        """
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                         initargs=(_worker_map(self.M),))
+        self._slots = asyncio.Semaphore(self.max_pending)
+        self._ready = asyncio.Queue()
+        self._dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """
+        Stop the dispatchers and shut the worker pool down.
+        """
+        for task in self._dispatchers:
+            task.cancel()
+        await asyncio.gather(*self._dispatchers, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+
+    async def route(self, source: int, target: int) -> Route:
+        """
+        Find the shortest route between two nodes.
+
+        Args:
+            source (int): The starting node.
+            target (int): The goal node.
+
+        Returns:
+            Route: The (cost, path) of the route, or (None, None) if no path is found.
+        """
+        num_nodes = len(self.M)
+        if not (0 <= source < num_nodes and 0 <= target < num_nodes):
+            raise ValueError(f"nodes must be in 0..{num_nodes - 1}")
+        future = asyncio.get_running_loop().create_future()
+        batch = self._batches.get(source)
+        if batch is None:
+            self._batches[source] = [(target, future)]
+            self._ready.put_nowait(source)
+        else:
+            batch.append((target, future))
+        return await future
+
+    async def _dispatch(self) -> None:
+        # Each dispatcher keeps one worker busy, taking the next source in arrival order
+        loop = asyncio.get_running_loop()
+        while True:
+            source = await self._ready.get()
+            batch = self._batches.pop(source)
+            targets = list({target for target, _ in batch})
+            self.counters['searches'] += 1
+            try:
+                routes = dict(zip(targets, await loop.run_in_executor(self._pool, _route_batch, source, targets)))
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for target, future in batch:
+                if not future.done():
+                    future.set_result(routes[target])
+
+    async def _answer(self, request: dict) -> dict:
+        response = {'id': request.get('id')}
+        try:
+            if request.get('op') == 'stats':
+                response.update(self.counters, pending=self._pending)
+                return response
+            source, target = request['source'], request['target']
+            # JSON true and false decode to bool, which is a subclass of int
+            if not all(isinstance(node, int) and not isinstance(node, bool) for node in (source, target)):
+                raise ValueError("source and target must be integers")
+            cost, path = await self.route(source, target)
+            response.update(path=path, cost=cost)
+        except (KeyError, TypeError, ValueError) as error:
+            self.counters['errors'] += 1
+            response['error'] = str(error) if not isinstance(error, KeyError) else f"missing field {error}"
+        except Exception as error:
+            # E.g. a worker process died; the client still gets an answer
+            self.counters['errors'] += 1
+            response['error'] = f"internal error: {error!r}"
+        return response
+
+    async def _serve_request(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        try:
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("a request must be a JSON object")
+            except ValueError as error:
+                self.counters['errors'] += 1
+                response = {'id': None, 'error': f"bad request: {error}"}
+            else:
+                self.counters['requests'] += 1
+                response = await self._answer(request)
+            if not writer.is_closing():
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self._pending -= 1
+            self._slots.release()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serve the requests of one client connection until it closes.
+
+        Args:
+            reader (asyncio.StreamReader): The connection's reader.
+            writer (asyncio.StreamWriter): The connection's writer.
+        """
+        tasks = set()
+        try:
+            while True:
+                # Backpressure: stop reading while too many requests are in flight
+                await self._slots.acquire()
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    # A reset connection, or a line longer than the stream limit
+                    line = b''
+                if not line:
+                    self._slots.release()
+                    break
+                self._pending += 1
+                task = asyncio.create_task(self._serve_request(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+
+def open_map(map_path: str) -> Map:
+    """
+    Open a map for serving: binary maps are memory-mapped and shared with the
+    workers, anything else is loaded as a pickled map.
+
+    Args:
+        map_path (str): The path of a ".rmap" or pickled map.
+
+    Returns:
+        Map: The opened map.
+    """
+    if map_path.endswith('.rmap'):
+        return open_binary(map_path)
+    return load_map(map_path, keep_graph=False)
+
+
+async def serve(M: Map, host: str = '127.0.0.1', port: int = 8765, unix: Optional[str] = None,
+                workers: Optional[int] = None, max_pending: int = 1024) -> None:
+    """
+    Run the route service until it is cancelled.
+
+    Args:
+        M (Map): The map to serve.
+        host (str): The TCP host to listen on.
+        port (int): The TCP port to listen on.
+        unix (Optional[str]): A Unix socket path to listen on instead of TCP.
+        workers (Optional[int]): The number of worker processes; None uses one per CPU.
+        max_pending (int): The most requests accepted but not yet answered.
+    """
+    service = RouteService(M, workers, max_pending)
+    await service.start()
+    # Shut the worker pool down on SIGTERM too, or its processes outlive the service
+    loop = asyncio.get_running_loop()
+    serving = asyncio.current_task()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signum, serving.cancel)
+    if unix is not None:
+        server = await asyncio.start_unix_server(service.handle_connection, path=unix)
+        address = unix
+    else:
+        server = await asyncio.start_server(service.handle_connection, host, port)
+        address = f"{host}:{server.sockets[0].getsockname()[1]}"
+    print(f"Serving {len(M)} intersections on {address} with {service.workers} workers", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('map', help="the map to serve, pickled or binary (.rmap)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765, help="the TCP port; 0 picks a free one")
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--workers', type=int, default=None, help="the number of worker processes")
+    parser.add_argument('--max-pending', type=int, default=1024,
+                        help="the most requests accepted but not yet answered")
+    args = parser.parse_args()
+
+    with contextlib.suppress(KeyboardInterrupt, asyncio.CancelledError):
+        asyncio.run(serve(open_map(args.map), args.host, args.port, args.unix, args.workers, args.max_pending))
+
+
+if __name__ == '__main__':
+    main()
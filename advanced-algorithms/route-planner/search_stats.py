@@ -0,0 +1,142 @@
+import math
+from collections.abc import Iterable
+
+
+class SearchStats:
+    """
+    Counters filled in by a route search when it is passed as `stats`.
+
+    Searches count into local variables and add them here once, when they
+    finish, so passing no stats object costs next to nothing. Passing the
+    same object to several searches accumulates their counters.
+
+    Attributes:
+        nodes_expanded (int): The number of nodes popped from the open set(s) and expanded.
+        edges_relaxed (int): The number of roads scanned from expanded nodes.
+        heap_pushes (int): The number of nodes inserted into an open set.
+        heap_decreases (int): The number of decrease-key operations on queued nodes.
+        heap_pops (int): The number of entries popped from an open set.
+        stale_skipped (int): The number of popped entries skipped without being
+            expanded, e.g. nodes stalled by a Contraction Hierarchies query.
+        peak_open_set (int): The largest open-set size seen (combined for
+            bidirectional searches).
+        phase_seconds (dict[str, float]): Wall time per phase: "setup", "search"
+            and "reconstruct".
+    """
+
+    COUNTERS = ('nodes_expanded', 'edges_relaxed', 'heap_pushes', 'heap_decreases', 'heap_pops', 'stale_skipped')
+
+    def __init__(self) -> None:
+        """
+        Initialize all counters to zero.
+        """
+        self.nodes_expanded = 0
+        self.edges_relaxed = 0
+        self.heap_pushes = 0
+        self.heap_decreases = 0
+        self.heap_pops = 0
+        self.stale_skipped = 0
+        self.peak_open_set = 0
+        self.phase_seconds: dict[str, float] = {}
+
+    def record(self, expanded: int, relaxed: int, pushes: int, decreases: int, pops: int, stale: int,
+               peak_open_set: int, phases: tuple[float, float, float]) -> None:
+        """
+        Add the local counters of one finished search.
+
+        Args:
+            expanded (int): The nodes expanded.
+            relaxed (int): The roads scanned.
+            pushes (int): The open-set insertions.
+            decreases (int): The decrease-key operations.
+            pops (int): The open-set pops.
+            stale (int): The popped entries skipped without expansion.
+            peak_open_set (int): The largest open-set size of the search.
+            phases (tuple[float, float, float]): The seconds spent in the "setup",
+                "search" and "reconstruct" phases.
+        """
+        self.nodes_expanded += expanded
+        self.edges_relaxed += relaxed
+        self.heap_pushes += pushes
+        self.heap_decreases += decreases
+        self.heap_pops += pops
+        self.stale_skipped += stale
+        self.peak_open_set = max(self.peak_open_set, peak_open_set)
+        for phase, seconds in zip(('setup', 'search', 'reconstruct'), phases):
+            self.add_phase(phase, seconds)
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        """
+        Add wall time to a phase.
+
+        Args:
+            phase (str): The name of the phase.
+            seconds (float): The time spent in it.
+        """
+        self.phase_seconds[phase] = self.phase_seconds.get(phase, 0.0) + seconds
+
+    def as_dict(self) -> dict[str, object]:
+        """
+        Return the counters and phase times as a plain dictionary.
+        """
+        result: dict[str, object] = {name: getattr(self, name) for name in self.COUNTERS}
+        result['peak_open_set'] = self.peak_open_set
+        result['phase_seconds'] = dict(self.phase_seconds)
+        return result
+
+    def __repr__(self) -> str:
+        counters = ', '.join(f"{name}={getattr(self, name)}" for name in self.COUNTERS + ('peak_open_set',))
+        return f"SearchStats({counters})"
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Return the nearest-rank percentile of an already sorted list, or NaN if it is empty.
+
+    Args:
+        sorted_values (list[float]): The values, in increasing order.
+        fraction (float): The percentile as a fraction, e.g. 0.95 for p95.
+
+    Returns:
+        float: The smallest value with at least `fraction` of the values at or below it.
+    """
+    if not sorted_values:
+        return math.nan
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def aggregate(stats: Iterable[SearchStats]) -> dict[str, dict[str, float]]:
+    """
+    Summarize the stats of a batch of queries, one SearchStats per query.
+
+    Args:
+        stats (Iterable[SearchStats]): The per-query stats.
+
+    Returns:
+        dict[str, dict[str, float]]: For every counter, and for every phase as
+            "<phase>_seconds", its total, mean, p50, p95 and max over the batch.
+    """
+    stats = list(stats)
+    series: dict[str, list[float]] = {name: [] for name in SearchStats.COUNTERS + ('peak_open_set',)}
+    phases = sorted({phase for item in stats for phase in item.phase_seconds})
+    for phase in phases:
+        series[f"{phase}_seconds"] = []
+    for item in stats:
+        for name in SearchStats.COUNTERS + ('peak_open_set',):
+            series[name].append(getattr(item, name))
+        for phase in phases:
+            series[f"{phase}_seconds"].append(item.phase_seconds.get(phase, 0.0))
+
+    summary = {}
+    for name, values in series.items():
+        total = sum(values)
+        values.sort()
+        summary[name] = {
+            'total': total,
+            'mean': total / len(values) if values else math.nan,
+            'p50': percentile(values, 0.5),
+            'p95': percentile(values, 0.95),
+            'max': values[-1] if values else math.nan,
+        }
+    return summary
@@ -0,0 +1,304 @@
+"""
+A uniform-grid spatial index over the intersections of a map, used to snap
+raw (x, y) coordinates to intersection ids.
+
+The bounding box of the map is cut into square cells holding about two
+intersections each, and the intersections are bucketed by cell with a
+counting sort into CSR arrays, like the roads of the Map. A nearest
+neighbour query scans rings of cells around the query point and stops as
+soon as no unscanned cell can hold a closer intersection, so it looks at a
+handful of nodes instead of all of them.
+
+Usage:
+    python spatial_index.py map-40.pickle
+"""
+import argparse
+import heapq
+import math
+import os
+import pickle
+from array import array
+from collections.abc import Iterator, Sequence
+
+from helpers import Map, load_map
+
+SPATIAL_INDEX_VERSION = 1
+
+
+def spatial_index_path(map_path: str) -> str:
+    """
+    Return where the spatial index of a map is persisted, next to the map file.
+
+    Args:
+        map_path (str): The path of the map, e.g. "map-40.pickle".
+
+    Returns:
+        str: The path of the index file, e.g. "map-40.grid".
+    """
+    return os.path.splitext(map_path)[0] + '.grid'
+
+
+class SpatialGrid:
+    """
+    A uniform grid of square cells over the intersections of a map.
+
+    Attributes:
+        min_x (float): The x coordinate of the left edge of the grid.
+        min_y (float): The y coordinate of the bottom edge of the grid.
+        cell_size (float): The side of every cell.
+        columns (int): The number of cells along x.
+        rows (int): The number of cells along y.
+        cell_offsets (array[int]): CSR offsets of every cell, of length columns * rows + 1;
+            cell `row * columns + col` holds `cell_nodes[cell_offsets[c]:cell_offsets[c + 1]]`.
+        cell_nodes (array[int]): The intersections, grouped by cell.
+    """
+
+    def __init__(self, M: Map, min_x: float, min_y: float, cell_size: float, columns: int, rows: int,
+                 cell_offsets: Sequence[int], cell_nodes: Sequence[int]) -> None:
+        """
+        Initialize the index from its arrays; use `build` or `load` to create one.
+        """
+        self._xs = M.xs
+        self._ys = M.ys
+        self.min_x = min_x
+        self.min_y = min_y
+        self.cell_size = cell_size
+        self.columns = columns
+        self.rows = rows
+        self.cell_offsets = cell_offsets
+        self.cell_nodes = cell_nodes
+
+    @classmethod
+    def build(cls, M: Map, nodes_per_cell: float = 2.0) -> "SpatialGrid":
+        """
+        Bucket the intersections of a map into grid cells.
+
+        Args:
+            M (Map): The map to index.
+            nodes_per_cell (float): The average number of intersections per cell.
+
+        Returns:
+            SpatialGrid: The index of the map.
+        """
+        xs, ys = M.xs, M.ys
+        num_nodes = len(M)
+        if num_nodes == 0:
+            return cls(M, 0.0, 0.0, 1.0, 1, 1, array('q', [0, 0]), array('q'))
+        min_x, max_x = min(xs), max(xs)
+        min_y, max_y = min(ys), max(ys)
+        width, height = max_x - min_x, max_y - min_y
+        num_cells = max(1.0, num_nodes / nodes_per_cell)
+        if width > 0 and height > 0:
+            cell_size = math.sqrt(width * height / num_cells)
+        else:
+            # All intersections on a line or a point
+            cell_size = max(width, height) / num_cells or 1.0
+        columns = max(1, math.ceil(width / cell_size))
+        rows = max(1, math.ceil(height / cell_size))
+
+        grid = cls(M, min_x, min_y, cell_size, columns, rows, array('q'), array('q'))
+        cells = array('q', (grid._cell(xs[node], ys[node]) for node in range(num_nodes)))
+        offsets = array('q', bytes(8 * (columns * rows + 1)))
+        for cell in cells:
+            offsets[cell + 1] += 1
+        for cell in range(columns * rows):
+            offsets[cell + 1] += offsets[cell]
+        fill = array('q', offsets[:-1])
+        nodes = array('q', bytes(8 * num_nodes))
+        for node in range(num_nodes):
+            nodes[fill[cells[node]]] = node
+            fill[cells[node]] += 1
+        grid.cell_offsets = offsets
+        grid.cell_nodes = nodes
+        return grid
+
+    def save(self, filename: str) -> None:
+        """
+        Save the index to a file.
+
+        Args:
+            filename (str): The name of the file, usually `spatial_index_path(map_path)`.
+        """
+        with open(filename, 'wb') as f:
+            pickle.dump({'version': SPATIAL_INDEX_VERSION,
+                         'num_nodes': len(self.cell_nodes),
+                         'bounds': (self.min_x, self.min_y, self.cell_size, self.columns, self.rows),
+                         'cell_offsets': self.cell_offsets,
+                         'cell_nodes': self.cell_nodes}, f)
+
+    @classmethod
+    def load(cls, filename: str, M: Map) -> "SpatialGrid":
+        """
+        Load an index saved with `save`.
+
+        Args:
+            filename (str): The name of the file to load.
+            M (Map): The map the index was built from; its coordinates are not stored in the file.
+
+        Returns:
+            SpatialGrid: The loaded index.
+        """
+        with open(filename, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('version') != SPATIAL_INDEX_VERSION:
+            raise ValueError(f"unsupported spatial index file version {data.get('version')!r}")
+        if data['num_nodes'] != len(M):
+            raise ValueError(f"spatial index has {data['num_nodes']} nodes, the map has {len(M)}")
+        return cls(M, *data['bounds'], data['cell_offsets'], data['cell_nodes'])
+
+    def nbytes(self) -> int:
+        """
+        Return the memory taken by the index arrays, in bytes.
+        """
+        return sum(len(values) * values.itemsize for values in (self.cell_offsets, self.cell_nodes))
+
+    def _column_row(self, x: float, y: float) -> tuple[int, int]:
+        # Points outside the grid are clamped to its border cells
+        col = min(self.columns - 1, max(0, int((x - self.min_x) / self.cell_size)))
+        row = min(self.rows - 1, max(0, int((y - self.min_y) / self.cell_size)))
+        return col, row
+
+    def _cell(self, x: float, y: float) -> int:
+        col, row = self._column_row(x, y)
+        return row * self.columns + col
+
+    def _ring(self, col: int, row: int, radius: int) -> Iterator[int]:
+        # The cells at Chebyshev distance `radius` from (col, row), clipped to the grid
+        columns, rows = self.columns, self.rows
+        if radius == 0:
+            yield row * columns + col
+            return
+        first_col, last_col = max(0, col - radius), min(columns - 1, col + radius)
+        for ring_row in (row - radius, row + radius):
+            if 0 <= ring_row < rows:
+                for ring_col in range(first_col, last_col + 1):
+                    yield ring_row * columns + ring_col
+        for ring_row in range(max(0, row - radius + 1), min(rows, row + radius)):
+            for ring_col in (col - radius, col + radius):
+                if 0 <= ring_col < columns:
+                    yield ring_row * columns + ring_col
+
+    def nearest(self, x: float, y: float) -> int:
+        """
+        Return the intersection closest to a point, the lowest id on ties.
+
+        Args:
+            x (float): The x coordinate of the point.
+            y (float): The y coordinate of the point.
+
+        Returns:
+            int: The closest intersection, or -1 if the map is empty.
+        """
+        xs, ys = self._xs, self._ys
+        offsets, nodes = self.cell_offsets, self.cell_nodes
+        col, row = self._column_row(x, y)
+        max_radius = max(self.columns, self.rows)
+        best, best_squared = -1, math.inf
+        radius = 0
+        while radius <= max_radius:
+            for cell in self._ring(col, row, radius):
+                for index in range(offsets[cell], offsets[cell + 1]):
+                    node = nodes[index]
+                    squared = (xs[node] - x)**2 + (ys[node] - y)**2
+                    if squared < best_squared or (squared == best_squared and node < best):
+                        best, best_squared = node, squared
+            # Every unscanned cell is at least `radius` cells away from the point
+            gap = radius * self.cell_size
+            if best_squared < gap * gap:
+                break
+            radius += 1
+        return best
+
+    def k_nearest(self, x: float, y: float, k: int) -> list[int]:
+        """
+        Return the k intersections closest to a point.
+
+        Args:
+            x (float): The x coordinate of the point.
+            y (float): The y coordinate of the point.
+            k (int): The number of intersections.
+
+        Returns:
+            list[int]: Up to k intersections, closest first, lowest id first on ties.
+        """
+        if k <= 0:
+            return []
+        xs, ys = self._xs, self._ys
+        offsets, nodes = self.cell_offsets, self.cell_nodes
+        col, row = self._column_row(x, y)
+        max_radius = max(self.columns, self.rows)
+        # A max-heap of the k best (squared distance, node) pairs, stored negated
+        best: list[tuple[float, int]] = []
+        radius = 0
+        while radius <= max_radius:
+            for cell in self._ring(col, row, radius):
+                for index in range(offsets[cell], offsets[cell + 1]):
+                    node = nodes[index]
+                    entry = (-((xs[node] - x)**2 + (ys[node] - y)**2), -node)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+            gap = radius * self.cell_size
+            if len(best) == k and -best[0][0] < gap * gap:
+                break
+            radius += 1
+        return [-node for _, node in sorted(best, reverse=True)]
+
+    def within_bbox(self, min_x: float, min_y: float, max_x: float, max_y: float) -> array:
+        """
+        Return the intersections inside an axis-aligned box, borders included.
+
+        Args:
+            min_x (float): The left edge of the box.
+            min_y (float): The bottom edge of the box.
+            max_x (float): The right edge of the box.
+            max_y (float): The top edge of the box.
+
+        Returns:
+            array: An int64 array of the intersections in the box, in increasing order.
+        """
+        found = array('q')
+        if min_x > max_x or min_y > max_y:
+            return found
+        xs, ys = self._xs, self._ys
+        offsets, nodes = self.cell_offsets, self.cell_nodes
+        first_col, first_row = self._column_row(min_x, min_y)
+        last_col, last_row = self._column_row(max_x, max_y)
+        for row in range(first_row, last_row + 1):
+            for cell in range(row * self.columns + first_col, row * self.columns + last_col + 1):
+                for index in range(offsets[cell], offsets[cell + 1]):
+                    node = nodes[index]
+                    if min_x <= xs[node] <= max_x and min_y <= ys[node] <= max_y:
+                        found.append(node)
+        return array('q', sorted(found))
+
+    def nearest_many(self, xs: Sequence[float], ys: Sequence[float]) -> array:
+        """
+        Snap many points at once.
+
+        Args:
+            xs (Sequence[float]): The x coordinates of the points.
+            ys (Sequence[float]): The y coordinates of the points.
+
+        Returns:
+            array: An int64 array with the closest intersection of every point.
+        """
+        if len(xs) != len(ys):
+            raise ValueError(f"got {len(xs)} x coordinates and {len(ys)} y coordinates")
+        nearest = self.nearest
+        return array('q', (nearest(x, y) for x, y in zip(xs, ys)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('map', help="the map pickle to index")
+    args = parser.parse_args()
+
+    grid = SpatialGrid.build(load_map(args.map, keep_graph=False))
+    grid.save(spatial_index_path(args.map))
+    print(f"Saved a {grid.columns}x{grid.rows} spatial grid to {spatial_index_path(args.map)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,16 @@
-import heapq
-from typing import Optional
+from array import array
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING, Optional, Union
 
 from helpers import Map
+from indexed_heap import IndexedMinHeap
+from search_stats import SearchStats
+
+if TYPE_CHECKING:
+    from landmarks import LandmarkTable
 
 import math
+import time
 
 def heuristic(a: tuple[float, float], b: tuple[float, float]) -> float:
     """
@@ -37,48 +44,352 @@ def reconstruct_path(came_from: dict[int, int], current: int) -> list[int]:
     path.reverse()
     return path
 
-def shortest_path(M: Map, start: int, goal: int) -> Optional[list[int]]:
+def one_to_all(offsets: Sequence[int], targets: Sequence[int], weights: Sequence[float],
+               source: int) -> array:
+    """
+    Compute the shortest distance from one node to every node with Dijkstra's algorithm.
+
+    It works on bare CSR arrays rather than a Map so it can run in worker
+    processes that only received the arrays.
+
+    Args:
+        offsets (Sequence[int]): The CSR row offsets.
+        targets (Sequence[int]): The CSR column indices.
+        weights (Sequence[float]): The cost of every road.
+        source (int): The node to search from.
+
+    Returns:
+        array: A float64 array of distances, with math.inf for unreachable nodes.
+    """
+    distance = array('d', [math.inf]) * (len(offsets) - 1)
+    distance[source] = 0.0
+    open_set = IndexedMinHeap()
+    open_set.push(source, 0.0)
+    while open_set:
+        current_distance, current = open_set.pop()
+        for edge in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[edge]
+            tentative_distance = current_distance + weights[edge]
+            if tentative_distance < distance[neighbor]:
+                distance[neighbor] = tentative_distance
+                open_set.push_or_decrease(neighbor, tentative_distance)
+    return distance
+
+def one_to_many(offsets: Sequence[int], targets: Sequence[int], weights: Sequence[float],
+                source: int, goals: Iterable[int]) -> tuple[dict[int, float], dict[int, int]]:
+    """
+    Run Dijkstra's algorithm from one node until every goal node is settled.
+
+    Like `one_to_all`, it works on bare CSR arrays.
+
+    Args:
+        offsets (Sequence[int]): The CSR row offsets.
+        targets (Sequence[int]): The CSR column indices.
+        weights (Sequence[float]): The cost of every road.
+        source (int): The node to search from.
+        goals (Iterable[int]): The nodes whose distances are needed.
+
+    Returns:
+        tuple[dict[int, float], dict[int, int]]: The distances and the came-from
+            map of the search. A goal missing from the distances is unreachable.
+    """
+    remaining = set(goals)
+    distance = {source: 0.0}
+    came_from = {}
+    open_set = IndexedMinHeap()
+    open_set.push(source, 0.0)
+    while open_set and remaining:
+        current_distance, current = open_set.pop()
+        remaining.discard(current)
+        for edge in range(offsets[current], offsets[current + 1]):
+            neighbor = targets[edge]
+            tentative_distance = current_distance + weights[edge]
+            if tentative_distance < distance.get(neighbor, math.inf):
+                distance[neighbor] = tentative_distance
+                came_from[neighbor] = current
+                open_set.push_or_decrease(neighbor, tentative_distance)
+    return distance, came_from
+
+def reachable_within(M: Map, start: Union[int, Iterable[int]], budget: float,
+                     stats: Optional[SearchStats] = None) -> tuple[array, array]:
+    """
+    Find every intersection reachable from a start within a cost budget.
+
+    It runs Dijkstra's algorithm over `M.weights` and never queues a node
+    whose distance exceeds the budget, so the work is proportional to the
+    size of the service area rather than the map. Several starts are
+    searched in one sweep, as if from a virtual node joined to each of them
+    by a free road, which gives the service area of a set of facilities.
+
+    Args:
+        M (Map): The map to search.
+        start (Union[int, Iterable[int]]): The starting node, or several starting nodes.
+        budget (float): The largest distance to include, in the units of `M.weights`.
+        stats (Optional[SearchStats]): If given, receives the search counters.
+
+    Returns:
+        tuple[array, array]: An int64 array of the reachable nodes, in order of
+            increasing distance, and a float64 array of their distances.
+    """
+    offsets, targets, weights = M.offsets, M.targets, M.weights
+    began = time.perf_counter() if stats is not None else 0.0
+    distance = {}
+    open_set = IndexedMinHeap()
+    for source in ([start] if isinstance(start, int) else start):
+        if source not in distance and budget >= 0:
+            distance[source] = 0.0
+            open_set.push(source, 0.0)
+    nodes = array('q')
+    distances = array('d')
+
+    expanded = relaxed = decreases = 0
+    pushes = peak_open_set = len(open_set)
+    track_peak = stats is not None
+    searched = time.perf_counter() if stats is not None else 0.0
+    while open_set:
+        current_distance, current = open_set.pop()
+        nodes.append(current)
+        distances.append(current_distance)
+        expanded += 1
+        first_edge, end_edge = offsets[current], offsets[current + 1]
+        relaxed += end_edge - first_edge
+        for edge in range(first_edge, end_edge):
+            neighbor = targets[edge]
+            tentative_distance = current_distance + weights[edge]
+            if tentative_distance <= budget and tentative_distance < distance.get(neighbor, math.inf):
+                distance[neighbor] = tentative_distance
+                if open_set.push_or_decrease(neighbor, tentative_distance):
+                    pushes += 1
+                    if track_peak and len(open_set) > peak_open_set:
+                        peak_open_set = len(open_set)
+                else:
+                    decreases += 1
+
+    if stats is not None:
+        stats.record(expanded, relaxed, pushes, decreases, expanded, 0, peak_open_set,
+                     (searched - began, time.perf_counter() - searched, 0.0))
+    return nodes, distances
+
+def shortest_path(M: Map, start: int, goal: int, mode: str = "astar",
+                  stats: Optional[SearchStats] = None,
+                  landmarks: Optional["LandmarkTable"] = None) -> Optional[list[int]]:
     """
     Find the shortest path between two nodes in a map using the A* algorithm.
 
+    Road costs come from `M.weights`, which are the precomputed road lengths
+    unless custom weights were set on the map.
+
     Args:
         M (Map): The map containing the graph, intersections, and roads.
         start (int): The starting node.
         goal (int): The goal node.
+        mode (str): "astar" for a forward search, or "bidirectional" to run
+            `shortest_path_bidirectional` instead.
+        stats (Optional[SearchStats]): If given, receives the search counters.
+        landmarks (Optional[LandmarkTable]): ALT tables of the map; when given, the
+            heuristic is the max of the landmark bounds and the straight-line bound.
 
     Returns:
         Optional[list[int]]: The shortest path from the start node to the goal node, or None if no path is found.
     """
-    came_from = {}
-    min_heap = []
+    if mode == "bidirectional":
+        return shortest_path_bidirectional(M, start, goal, stats, landmarks)
+    if mode != "astar":
+        raise ValueError(f"unknown search mode {mode!r}")
+    return shortest_route(M, start, goal, stats, landmarks)[1]
 
-    g_score = {node: float('inf') for node in M.intersections}
-    f_score = {node: float('inf') for node in M.intersections}
-    
-    g_score[start] = 0 # g_score of start node is 0
-    h_score = heuristic(M.intersections[start],M.intersections[goal])
-    f_score[start] = g_score[start] + h_score
+def shortest_route(M: Map, start: int, goal: int, stats: Optional[SearchStats] = None,
+                   landmarks: Optional["LandmarkTable"] = None) -> tuple[Optional[float], Optional[list[int]]]:
+    """
+    Find the shortest path between two nodes with A*, together with its cost.
 
-    heapq.heappush(min_heap,(f_score[start],start))
+    The cost is the search's own distance to the goal, so it accounts for the
+    roads the search took even when two nodes are joined by parallel roads.
 
-    while len(min_heap) > 0:
-        _,current = heapq.heappop(min_heap)
+    Args:
+        M (Map): The map containing the graph, intersections, and roads.
+        start (int): The starting node.
+        goal (int): The goal node.
+        stats (Optional[SearchStats]): If given, receives the search counters.
+        landmarks (Optional[LandmarkTable]): ALT tables of the map, as for `shortest_path`.
+
+    Returns:
+        tuple[Optional[float], Optional[list[int]]]: The cost and the path, or
+            (None, None) if no path is found.
+    """
+    began = time.perf_counter() if stats is not None else 0.0
+    xs, ys = M.xs, M.ys
+    offsets, targets, weights = M.offsets, M.targets, M.weights
+    scale = M.heuristic_scale
+    goal_position = (xs[goal], ys[goal])
+
+    came_from = {}
+    open_set = IndexedMinHeap()
+
+    # Only nodes the search touches get a g_score, so a query does not pay O(n) up front
+    g_score = {start: 0.0} # g_score of start node is 0
+    # Each node's distance to the goal is computed at most once per query
+    landmark_bound = landmarks.bound_to(goal) if landmarks is not None else None
+    h_score = {start: scale * heuristic((xs[start], ys[start]), goal_position)}
+    if landmark_bound is not None:
+        h_score[start] = max(h_score[start], landmark_bound(start))
+    open_set.push(start, h_score[start])
+
+    # Counters live in locals and are only copied into stats at the end
+    expanded = relaxed = pushes = decreases = 0
+    peak_open_set = 1
+    track_peak = stats is not None
+    searched = time.perf_counter() if stats is not None else 0.0
+    found = False
+    while open_set:
+        _,current = open_set.pop()
+        expanded += 1
 
         if current == goal:
-            return reconstruct_path(came_from , goal)
-        
-        for neighbor in M.roads[current]:
-            neighbor_g_score = heuristic(M.intersections[current],M.intersections[neighbor])
-            tentative_g_score = g_score[current] + neighbor_g_score
-            
-            if tentative_g_score < g_score[neighbor]:
+            found = True
+            break
+
+        current_g_score = g_score[current]
+        first_edge, end_edge = offsets[current], offsets[current + 1]
+        relaxed += end_edge - first_edge
+        for edge in range(first_edge, end_edge):
+            neighbor = targets[edge]
+            tentative_g_score = current_g_score + weights[edge]
+
+            if tentative_g_score < g_score.get(neighbor, math.inf):
                 came_from[neighbor] = current
-                
                 g_score[neighbor] = tentative_g_score
-                h_score = heuristic(M.intersections[neighbor],M.intersections[goal])
-                f_score[neighbor] = g_score[neighbor] + h_score
 
-                if all(neighbor != item[1] for item in min_heap):
-                    heapq.heappush(min_heap,(f_score[neighbor],neighbor))
+                neighbor_h_score = h_score.get(neighbor)
+                if neighbor_h_score is None:
+                    neighbor_h_score = scale * heuristic((xs[neighbor], ys[neighbor]), goal_position)
+                    if landmark_bound is not None:
+                        neighbor_h_score = max(neighbor_h_score, landmark_bound(neighbor))
+                    h_score[neighbor] = neighbor_h_score
+
+                # Re-queues the neighbor if it was already expanded, otherwise
+                # moves it up the open set in O(log n)
+                if open_set.push_or_decrease(neighbor, tentative_g_score + neighbor_h_score):
+                    pushes += 1
+                    if track_peak and len(open_set) > peak_open_set:
+                        peak_open_set = len(open_set)
+                else:
+                    decreases += 1
+
+    reconstructed = time.perf_counter() if stats is not None else 0.0
+    path = reconstruct_path(came_from , goal) if found else None
+    if stats is not None:
+        stats.record(expanded, relaxed, pushes + 1, decreases, expanded, 0, peak_open_set,
+                     (searched - began, reconstructed - searched, time.perf_counter() - reconstructed))
+    return (g_score[goal], path) if found else (None, None)
 
-    return None
\ No newline at end of file
+def shortest_path_bidirectional(M: Map, start: int, goal: int,
+                                stats: Optional[SearchStats] = None,
+                                landmarks: Optional["LandmarkTable"] = None) -> Optional[list[int]]:
+    """
+    Find the shortest path between two nodes with bidirectional A*.
+
+    A forward search from the start and a backward search from the goal run
+    on the same reduced costs, using the average potential
+    p(v) = (h(v, goal) - h(start, v)) / 2, which is consistent for both
+    directions. The search stops as soon as the two smallest keys add up to
+    at least the best start-goal path found so far.
+
+    Args:
+        M (Map): The map containing the graph, intersections, and roads.
+        start (int): The starting node.
+        goal (int): The goal node.
+        stats (Optional[SearchStats]): If given, receives the search counters.
+        landmarks (Optional[LandmarkTable]): ALT tables of the map, used to tighten
+            both directions' heuristics.
+
+    Returns:
+        Optional[list[int]]: The shortest path from the start node to the goal node, or None if no path is found.
+    """
+    if start == goal:
+        if stats is not None:
+            stats.record(1, 0, 1, 0, 1, 0, 1, (0.0, 0.0, 0.0))
+        return [start]
+
+    began = time.perf_counter() if stats is not None else 0.0
+    xs, ys = M.xs, M.ys
+    scale = M.heuristic_scale
+    start_position = (xs[start], ys[start])
+    goal_position = (xs[goal], ys[goal])
+    bound_to_goal = landmarks.bound_to(goal) if landmarks is not None else None
+    bound_from_start = landmarks.bound_from(start) if landmarks is not None else None
+    potential_cache = {}
+
+    def potential(node: int) -> float:
+        value = potential_cache.get(node)
+        if value is None:
+            position = (xs[node], ys[node])
+            to_goal = scale * heuristic(position, goal_position)
+            from_start = scale * heuristic(start_position, position)
+            if landmarks is not None:
+                to_goal = max(to_goal, bound_to_goal(node))
+                from_start = max(from_start, bound_from_start(node))
+            value = (to_goal - from_start) / 2
+            potential_cache[node] = value
+        return value
+
+    reverse_offsets, reverse_sources, reverse_weights = M.reverse()
+    # Index 0 is the forward search from start, index 1 the backward search from goal
+    graphs = ((M.offsets, M.targets, M.weights), (reverse_offsets, reverse_sources, reverse_weights))
+    signs = (1.0, -1.0)
+    g_scores = ({start: 0.0}, {goal: 0.0})
+    came_froms = ({}, {})
+    open_sets = (IndexedMinHeap(), IndexedMinHeap())
+    open_sets[0].push(start, potential(start))
+    open_sets[1].push(goal, -potential(goal))
+
+    best_length = math.inf
+    meeting_node = None
+    expanded = relaxed = pushes = decreases = 0
+    peak_open_set = 2
+    track_peak = stats is not None
+    searched = time.perf_counter() if stats is not None else 0.0
+    while open_sets[0] and open_sets[1]:
+        forward_key = open_sets[0].peek()[0]
+        backward_key = open_sets[1].peek()[0]
+        if forward_key + backward_key >= best_length:
+            break
+        side = 0 if forward_key <= backward_key else 1
+        offsets, targets, weights = graphs[side]
+        g_score, other_g_score = g_scores[side], g_scores[1 - side]
+        came_from, sign = came_froms[side], signs[side]
+
+        _, current = open_sets[side].pop()
+        expanded += 1
+        current_g_score = g_score[current]
+        first_edge, end_edge = offsets[current], offsets[current + 1]
+        relaxed += end_edge - first_edge
+        for edge in range(first_edge, end_edge):
+            neighbor = targets[edge]
+            tentative_g_score = current_g_score + weights[edge]
+            if tentative_g_score < g_score.get(neighbor, math.inf):
+                came_from[neighbor] = current
+                g_score[neighbor] = tentative_g_score
+                if open_sets[side].push_or_decrease(neighbor, tentative_g_score + sign * potential(neighbor)):
+                    pushes += 1
+                    if track_peak and len(open_sets[0]) + len(open_sets[1]) > peak_open_set:
+                        peak_open_set = len(open_sets[0]) + len(open_sets[1])
+                else:
+                    decreases += 1
+                other = other_g_score.get(neighbor)
+                if other is not None and tentative_g_score + other < best_length:
+                    best_length = tentative_g_score + other
+                    meeting_node = neighbor
+
+    reconstructed = time.perf_counter() if stats is not None else 0.0
+    path = None
+    if meeting_node is not None:
+        path = reconstruct_path(came_froms[0], meeting_node)
+        current = meeting_node
+        while current in came_froms[1]:
+            current = came_froms[1][current]
+            path.append(current)
+    if stats is not None:
+        stats.record(expanded, relaxed, pushes + 2, decreases, expanded, 0, peak_open_set,
+                     (searched - began, reconstructed - searched, time.perf_counter() - reconstructed))
+    return path
@@ -0,0 +1,209 @@
+"""
+Reproducible synthetic road networks for benchmarking the route planner.
+
+Every generator takes a node count and a seed and returns a Map built
+directly from CSR arrays, without networkx, so maps of a million nodes can
+be generated in reasonable time and memory. Coordinates lie in the unit
+square and all roads are two-way.
+"""
+import math
+import random
+from array import array
+from collections.abc import Callable, Iterable
+
+from helpers import Map
+
+
+def _map_from_edges(xs: array, ys: array, edges: Iterable[tuple[int, int]]) -> Map:
+    # Builds two-way CSR adjacency from an undirected edge list with a counting sort
+    sources = array('q')
+    targets = array('q')
+    for source, target in edges:
+        sources.append(source)
+        targets.append(target)
+    num_nodes = len(xs)
+    offsets = array('q', bytes(8 * (num_nodes + 1)))
+    for node in sources:
+        offsets[node + 1] += 1
+    for node in targets:
+        offsets[node + 1] += 1
+    for node in range(num_nodes):
+        offsets[node + 1] += offsets[node]
+    fill = array('q', offsets[:-1])
+    adjacency = array('q', bytes(8 * 2 * len(sources)))
+    for source, target in zip(sources, targets):
+        adjacency[fill[source]] = target
+        fill[source] += 1
+        adjacency[fill[target]] = source
+        fill[target] += 1
+    return Map.from_arrays(xs, ys, offsets, adjacency)
+
+
+def _jittered_grid(side: int, rng: random.Random, jitter: float) -> tuple[array, array]:
+    cell = 1.0 / side
+    xs = array('d', bytes(8 * side * side))
+    ys = array('d', bytes(8 * side * side))
+    for row in range(side):
+        for col in range(side):
+            xs[row * side + col] = (col + 0.5 + rng.uniform(-jitter, jitter)) * cell
+            ys[row * side + col] = (row + 0.5 + rng.uniform(-jitter, jitter)) * cell
+    return xs, ys
+
+
+def grid_map(num_nodes: int, seed: int = 0, jitter: float = 0.3, diagonal_probability: float = 0.2) -> Map:
+    """
+    Generate a reproducible road network laid out on a jittered square grid.
+
+    Every intersection is connected to its right and lower neighbours, so the
+    map is always connected. A fraction of cells also get a diagonal road.
+
+    Args:
+        num_nodes (int): The approximate number of intersections; it is rounded down to a square.
+        seed (int): The seed of the random generator.
+        jitter (float): How far, in cell widths, an intersection may move away from its grid point.
+        diagonal_probability (float): The probability that a cell gets a diagonal road.
+
+    Returns:
+        Map: The generated map, with intersections in the unit square.
+    """
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(num_nodes))
+    xs, ys = _jittered_grid(side, rng, jitter)
+    edges = []
+    for row in range(side):
+        for col in range(side):
+            node = row * side + col
+            if col + 1 < side:
+                edges.append((node, node + 1))
+            if row + 1 < side:
+                edges.append((node, node + side))
+                if col + 1 < side and rng.random() < diagonal_probability:
+                    edges.append((node, node + side + 1))
+    return _map_from_edges(xs, ys, edges)
+
+
+def random_geometric_map(num_nodes: int, seed: int = 0, average_degree: float = 6.0) -> Map:
+    """
+    Generate a random geometric graph: uniform random intersections, with a
+    road between every pair closer than a radius chosen for the given degree.
+
+    Neighbours are found by bucketing points into cells of the radius size,
+    so generation is linear in the number of roads. The map may be
+    disconnected, like real extracts with islands.
+
+    Args:
+        num_nodes (int): The number of intersections.
+        seed (int): The seed of the random generator.
+        average_degree (float): The expected number of roads per intersection.
+
+    Returns:
+        Map: The generated map, with intersections in the unit square.
+    """
+    rng = random.Random(seed)
+    xs = array('d', (rng.random() for _ in range(num_nodes)))
+    ys = array('d', (rng.random() for _ in range(num_nodes)))
+    radius = math.sqrt(average_degree / (math.pi * max(num_nodes, 1)))
+    side = max(1, int(1.0 / radius))
+    cells: dict[tuple[int, int], list[int]] = {}
+    for node in range(num_nodes):
+        cells.setdefault((int(xs[node] * side), int(ys[node] * side)), []).append(node)
+    squared_radius = radius * radius
+    edges = []
+    for (cell_x, cell_y), members in cells.items():
+        # Only look at this cell and the four "forward" neighbours so each pair is seen once
+        for offset_x, offset_y in ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+            others = cells.get((cell_x + offset_x, cell_y + offset_y))
+            if others is None:
+                continue
+            for node in members:
+                x, y = xs[node], ys[node]
+                for other in others:
+                    if (offset_x, offset_y) == (0, 0) and other <= node:
+                        continue
+                    if (xs[other] - x)**2 + (ys[other] - y)**2 <= squared_radius:
+                        edges.append((node, other))
+    return _map_from_edges(xs, ys, edges)
+
+
+def perturbed_planar_map(num_nodes: int, seed: int = 0, jitter: float = 0.35, keep_probability: float = 0.6,
+                         diagonal_probability: float = 0.15) -> Map:
+    """
+    Generate a connected planar road network with dead ends and irregular blocks.
+
+    Intersections sit on a jittered grid. A random spanning tree of the grid
+    keeps the map connected; every other grid road is kept with
+    `keep_probability`, and some cells get one diagonal, which never crosses
+    another road.
+
+    Args:
+        num_nodes (int): The approximate number of intersections; it is rounded down to a square.
+        seed (int): The seed of the random generator.
+        jitter (float): How far, in cell widths, an intersection may move away from its grid point.
+        keep_probability (float): The probability of keeping a grid road outside the spanning tree.
+        diagonal_probability (float): The probability that a cell gets a diagonal road.
+
+    Returns:
+        Map: The generated map, with intersections in the unit square.
+    """
+    rng = random.Random(seed)
+    side = max(2, math.isqrt(num_nodes))
+    xs, ys = _jittered_grid(side, rng, jitter)
+    grid_edges = []
+    for row in range(side):
+        for col in range(side):
+            node = row * side + col
+            if col + 1 < side:
+                grid_edges.append((node, node + 1))
+            if row + 1 < side:
+                grid_edges.append((node, node + side))
+    rng.shuffle(grid_edges)
+
+    # Kruskal with a union-find over shuffled edges gives a random spanning tree
+    parent = list(range(side * side))
+
+    def find(node: int) -> int:
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    edges = []
+    for source, target in grid_edges:
+        root_source, root_target = find(source), find(target)
+        if root_source != root_target:
+            parent[root_source] = root_target
+            edges.append((source, target))
+        elif rng.random() < keep_probability:
+            edges.append((source, target))
+    for row in range(side - 1):
+        for col in range(side - 1):
+            if rng.random() < diagonal_probability:
+                node = row * side + col
+                if rng.random() < 0.5:
+                    edges.append((node, node + side + 1))
+                else:
+                    edges.append((node + 1, node + side))
+    return _map_from_edges(xs, ys, edges)
+
+
+GENERATORS: dict[str, Callable[[int, int], Map]] = {
+    'grid': grid_map,
+    'geometric': random_geometric_map,
+    'planar': perturbed_planar_map,
+}
+
+
+def random_queries(M: Map, count: int, seed: int = 0) -> list[tuple[int, int]]:
+    """
+    Draw a reproducible list of (start, goal) pairs from a map.
+
+    Args:
+        M (Map): The map to draw intersections from.
+        count (int): The number of queries.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        list[tuple[int, int]]: The (start, goal) pairs.
+    """
+    rng = random.Random(seed)
+    return [(rng.randrange(len(M)), rng.randrange(len(M))) for _ in range(count)]
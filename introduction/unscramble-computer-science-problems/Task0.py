@@ -1,16 +1,7 @@
 """
-Read file into texts and calls.
-It's ok if you don't understand how to read files.
+The records are read once and summarized by cdr_engine.py.
 """
-import csv
-with open('texts.csv', 'r') as f:
-    reader = csv.reader(f)
-    texts = list(reader)
-
-with open('calls.csv', 'r') as f:
-    reader = csv.reader(f)
-    calls = list(reader)
-
+from cdr_engine import summarize, task0_report
 
 """
 TASK 0:
@@ -19,7 +10,4 @@ Print messages:
 "First record of texts, <incoming number> texts <answering number> at time <time>"
 "Last record of calls, <incoming number> calls <answering number> at time <time>, lasting <during> seconds"
 """
-incoming_number, answering_number, time = texts[0]
-print(f"First record of texts, <{incoming_number}> texts <{answering_number}> at time <{time}>")
-incoming_number, answering_number, time, during = calls[-1]
-print(f"Last record of calls, <{incoming_number}> calls <{answering_number}> at time <{time}>, lasting <{during}> seconds")
+print('\n'.join(task0_report(summarize())))
@@ -0,0 +1,73 @@
+"""
+Benchmark the exact set count of Task1 against HyperLogLog estimates, for
+memory and accuracy across data sizes.
+
+Every size is a stream of synthetic phone numbers in which each distinct
+number appears twice. Memory is the peak traced by tracemalloc while
+counting, which includes the strings the set keeps alive.
+
+Usage:
+    python bench_distinct_count.py [--sizes 1000 10000 100000 1000000] [--errors 0.01 0.02 0.05]
+"""
+import argparse
+import math
+import random
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+
+from distinct_count import HyperLogLog
+
+
+def phone_numbers(distinct: int, seed: int) -> Iterator[str]:
+    """
+    Generate `distinct` different mobile numbers, twice over, without holding them in memory.
+    """
+    # An affine map with a multiplier coprime to the range is a permutation of it
+    span = 3 * 10**9
+    rng = random.Random(seed)
+    multiplier = rng.randrange(1, span)
+    while math.gcd(multiplier, span) != 1:
+        multiplier = rng.randrange(1, span)
+    offset = rng.randrange(span)
+    for _ in range(2):
+        for index in range(distinct):
+            digits = str(7 * 10**9 + (multiplier * index + offset) % span)
+            yield f"{digits[:5]} {digits[5:]}"
+
+
+def measure(count: Callable[[Iterator[str]], int], distinct: int, seed: int) -> tuple[int, float, float]:
+    # Returns the count, the peak traced memory in bytes and the elapsed seconds of an untraced run
+    began = time.perf_counter()
+    result = count(phone_numbers(distinct, seed))
+    elapsed = time.perf_counter() - began
+    tracemalloc.start()
+    count(phone_numbers(distinct, seed))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak, elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--errors', type=float, nargs='+', default=[0.01, 0.02, 0.05])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'distinct':>9} | {'mode':>12} | {'registers':>9} | {'estimate':>9} | {'error':>7} | "
+          f"{'peak memory':>12} | {'seconds':>7}")
+    for size in args.sizes:
+        exact, peak, elapsed = measure(lambda numbers: len(set(numbers)), size, args.seed)
+        print(f"{size:>9} | {'set':>12} | {'':>9} | {exact:>9} | {0:>+7.2%} | {peak / 1024:>9.0f} KB | "
+              f"{elapsed:>7.2f}")
+        for relative_error in args.errors:
+            precision = HyperLogLog.with_error(relative_error).precision
+            estimate, peak, elapsed = measure(lambda numbers: len(HyperLogLog(precision).update(numbers)),
+                                              size, args.seed)
+            print(f"{size:>9} | {f'hll {relative_error:.0%}':>12} | {1 << precision:>9} | {estimate:>9} | "
+                  f"{(estimate - exact) / exact:>+7.2%} | {peak / 1024:>9.0f} KB | {elapsed:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
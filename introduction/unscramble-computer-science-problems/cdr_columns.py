@@ -0,0 +1,344 @@
+"""
+A columnar, dictionary-encoded cache of the call and text records, opened with mmap.
+
+Parsing the CSV files is most of the cost of a run, and every phone number
+read from them becomes its own Python str. `convert` parses them once into
+a binary file that later runs map read-only:
+
+    header      magic "CDRC\\0\\0\\0\\0", version (u32), flags (u32),
+                num_numbers (u64), dictionary_bytes (u64),
+                num_texts (u64), num_calls (u64)
+    offsets     (num_numbers + 1) x i64, into the dictionary
+    dictionary  the UTF-8 phone numbers, back to back, sorted
+    texts       sender, receiver: num_texts x i32 each; time: num_texts x i64
+    calls       caller, receiver: num_calls x i32 each; time: num_calls x i64;
+                duration: num_calls x i32
+
+Every section starts 8-byte aligned. Records keep their file order; a
+phone number is stored once, and records refer to it by its index in the
+sorted dictionary. Times are seconds since the epoch, see
+`cdr_engine.parse_timestamp`.
+
+Because the dictionary is sorted, the numbers of an area code such as
+"(080)" have consecutive ids, so the Task3 tests are integer comparisons.
+`summarize_columns` computes the whole `CDRSummary` with set operations
+and tight loops over the integer columns, without decoding a number
+until a report prints it.
+
+Usage:
+    python cdr_columns.py [--texts texts.csv] [--calls calls.csv] [--cache records.cdrc] [--rebuild]
+"""
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from typing import Union, overload
+
+from cdr_engine import (BANGALORE, CALL_RECEIVER, CALLER, REPORTS, TEXT_RECEIVER, TEXT_SENDER, CDRSummary,
+                        area_code, format_timestamp, parse_timestamp, read_records)
+
+MAGIC = b'CDRC\0\0\0\0'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<8sIIQQQQ')
+
+DEFAULT_CACHE = 'records.cdrc'
+
+
+def _check_byteorder() -> None:
+    if sys.byteorder != 'little':
+        raise OSError("record caches are little-endian and can only be mapped on little-endian machines")
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+class NumberDictionary(Sequence):
+    """
+    The sorted phone numbers of a cache, decoded on access.
+    """
+
+    def __init__(self, offsets: Sequence[int], blob: memoryview) -> None:
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[str]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[str, list[str]]:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("number id out of range")
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def index(self, number: str, start: int = 0, stop: int = sys.maxsize) -> int:
+        """
+        Return the id of a phone number, by binary search.
+
+        Raises:
+            ValueError: If the number is not in the records.
+        """
+        position = bisect.bisect_left(self, number, start, min(stop, len(self)))
+        if position < len(self) and self[position] == number:
+            return position
+        raise ValueError(f"{number!r} is not in the records")
+
+    def prefix_range(self, prefix: str) -> range:
+        """
+        Return the ids of the numbers that start with a prefix, e.g. an area code.
+        """
+        start = bisect.bisect_left(self, prefix)
+        # Every number starting with the prefix sorts below the prefix followed by the highest code point
+        return range(start, bisect.bisect_left(self, prefix + '\U0010ffff', start))
+
+
+class CDRColumns:
+    """
+    The records of a cache as integer columns.
+
+    Attributes:
+        numbers (NumberDictionary): The phone number of every id.
+        text_senders, text_receivers (Sequence[int]): The number ids of the texts.
+        text_times (Sequence[int]): The time of every text, in seconds since the epoch.
+        call_callers, call_receivers (Sequence[int]): The number ids of the calls.
+        call_times (Sequence[int]): The time of every call, in seconds since the epoch.
+        call_durations (Sequence[int]): The duration of every call, in seconds.
+    """
+
+    def __init__(self, numbers: NumberDictionary, text_senders: Sequence[int], text_receivers: Sequence[int],
+                 text_times: Sequence[int], call_callers: Sequence[int], call_receivers: Sequence[int],
+                 call_times: Sequence[int], call_durations: Sequence[int]) -> None:
+        self.numbers = numbers
+        self.text_senders = text_senders
+        self.text_receivers = text_receivers
+        self.text_times = text_times
+        self.call_callers = call_callers
+        self.call_receivers = call_receivers
+        self.call_times = call_times
+        self.call_durations = call_durations
+
+    def text_record(self, index: int) -> list[str]:
+        """
+        Return a text as the fields of its CSV row.
+        """
+        numbers = self.numbers
+        return [numbers[self.text_senders[index]], numbers[self.text_receivers[index]],
+                format_timestamp(self.text_times[index])]
+
+    def call_record(self, index: int) -> list[str]:
+        """
+        Return a call as the fields of its CSV row.
+        """
+        numbers = self.numbers
+        return [numbers[self.call_callers[index]], numbers[self.call_receivers[index]],
+                format_timestamp(self.call_times[index]), str(self.call_durations[index])]
+
+
+def convert(texts_path: str = 'texts.csv', calls_path: str = 'calls.csv', output: str = DEFAULT_CACHE) -> str:
+    """
+    Parse both record files once and write them as a columnar cache.
+
+    Args:
+        texts_path (str): The texts CSV file.
+        calls_path (str): The calls CSV file.
+        output (str): The name of the cache file to write.
+
+    Returns:
+        str: The path of the written cache.
+    """
+    _check_byteorder()
+    # Numbers get ids in order of appearance first, then are renumbered in sorted order
+    ids: dict[str, int] = {}
+    text_senders, text_receivers, text_times = array('i'), array('i'), array('q')
+    for record in read_records(texts_path):
+        if not record:
+            continue
+        text_senders.append(ids.setdefault(record[0], len(ids)))
+        text_receivers.append(ids.setdefault(record[1], len(ids)))
+        text_times.append(parse_timestamp(record[2]))
+    call_callers, call_receivers, call_times, call_durations = array('i'), array('i'), array('q'), array('i')
+    for record in read_records(calls_path):
+        if not record:
+            continue
+        call_callers.append(ids.setdefault(record[0], len(ids)))
+        call_receivers.append(ids.setdefault(record[1], len(ids)))
+        call_times.append(parse_timestamp(record[2]))
+        call_durations.append(int(record[3]))
+
+    numbers = sorted(ids)
+    renumbered = array('i', bytes(4 * len(numbers)))
+    for new_id, number in enumerate(numbers):
+        renumbered[ids[number]] = new_id
+    for column in (text_senders, text_receivers, call_callers, call_receivers):
+        column[:] = array('i', [renumbered[old_id] for old_id in column])
+
+    encoded = [number.encode('utf-8') for number in numbers]
+    offsets = array('q', [0])
+    for number in encoded:
+        offsets.append(offsets[-1] + len(number))
+    dictionary = b''.join(encoded)
+
+    temporary = output + '.tmp'
+    with open(temporary, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(numbers), len(dictionary),
+                             len(text_times), len(call_times)))
+        offsets.tofile(f)
+        f.write(dictionary + bytes(_padding(len(dictionary))))
+        for column in (text_senders, text_receivers, text_times, call_callers, call_receivers, call_times,
+                       call_durations):
+            column.tofile(f)
+            f.write(bytes(_padding(len(column) * column.itemsize)))
+    # Readers never see a half-written cache
+    os.replace(temporary, output)
+    return output
+
+
+def open_columns(filename: str = DEFAULT_CACHE) -> CDRColumns:
+    """
+    Open a cache with mmap, without copying its columns.
+
+    Args:
+        filename (str): The name of the cache file.
+
+    Returns:
+        CDRColumns: Columns that are read-only views of the mapped file.
+    """
+    _check_byteorder()
+    with open(filename, 'rb') as f:
+        # The mapping stays valid after the file is closed
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapped) < _HEADER.size:
+        raise ValueError(f"{filename} is too short to be a record cache")
+    magic, version, _, num_numbers, dictionary_bytes, num_texts, num_calls = _HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError(f"{filename} is not a record cache")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"unsupported record cache version {version}")
+    sizes = [8 * (num_numbers + 1), dictionary_bytes, 4 * num_texts, 4 * num_texts, 8 * num_texts,
+             4 * num_calls, 4 * num_calls, 8 * num_calls, 4 * num_calls]
+    expected = _HEADER.size + sum(size + _padding(size) for size in sizes)
+    if len(mapped) != expected:
+        raise ValueError(f"{filename} has {len(mapped)} bytes, expected {expected}")
+
+    view = memoryview(mapped)
+    position = _HEADER.size
+
+    def section(size: int, typecode: str) -> memoryview:
+        nonlocal position
+        start, position = position, position + size + _padding(size)
+        return view[start:start + size].cast(typecode)
+
+    offsets = section(sizes[0], 'q')
+    blob = section(dictionary_bytes, 'B')
+    columns = [section(size, typecode) for size, typecode in zip(sizes[2:], 'iiqiiqi')]
+    return CDRColumns(NumberDictionary(offsets, blob), *columns)
+
+
+def summarize_columns(columns: CDRColumns) -> CDRSummary:
+    """
+    Compute the summary of Task0 to Task4 from the integer columns.
+
+    Args:
+        columns (CDRColumns): The records.
+
+    Returns:
+        CDRSummary: The same summary as `cdr_engine.summarize` on the CSV files.
+    """
+    numbers = columns.numbers
+    callers, receivers, durations = columns.call_callers, columns.call_receivers, columns.call_durations
+    summary = CDRSummary()
+    if len(columns.text_times):
+        summary.first_text = columns.text_record(0)
+    if len(columns.call_times):
+        summary.last_call = columns.call_record(len(columns.call_times) - 1)
+
+    # Task1 and Task4: one pass per column builds the id sets of every role
+    flags = [0] * len(numbers)
+    for column, role in ((columns.text_senders, TEXT_SENDER), (columns.text_receivers, TEXT_RECEIVER),
+                         (callers, CALLER), (receivers, CALL_RECEIVER)):
+        for number_id in set(column):
+            flags[number_id] |= role
+    summary.roles = {numbers[number_id]: role for number_id, role in enumerate(flags) if role}
+
+    # Task2: totals by id, reported in order of first appearance like the streaming engine
+    seconds = [0] * len(numbers)
+    for caller, receiver, during in zip(callers, receivers, durations):
+        seconds[caller] += during
+        seconds[receiver] += during
+    appearance = dict.fromkeys(number_id for pair in zip(callers, receivers) for number_id in pair)
+    summary.seconds = {numbers[number_id]: seconds[number_id] for number_id in appearance}
+
+    # Task3: Bangalore fixed lines are one range of ids
+    bangalore = columns.numbers.prefix_range(BANGALORE)
+    low, high = bangalore.start, bangalore.stop
+    called = set()
+    for caller, receiver in zip(callers, receivers):
+        if low <= caller < high:
+            summary.bangalore_calls += 1
+            if low <= receiver < high:
+                summary.bangalore_local_calls += 1
+            called.add(receiver)
+    summary.bangalore_codes = {area_code(numbers[number_id]) for number_id in called}
+    return summary
+
+
+def open_cached(texts_path: str = 'texts.csv', calls_path: str = 'calls.csv', cache: str = DEFAULT_CACHE,
+                rebuild: bool = False) -> CDRColumns:
+    """
+    Open the cache of the records, converting them first if the cache is
+    missing or older than either CSV file.
+
+    Args:
+        texts_path (str): The texts CSV file.
+        calls_path (str): The calls CSV file.
+        cache (str): The cache file.
+        rebuild (bool): Whether to convert the records even if the cache is fresh.
+
+    Returns:
+        CDRColumns: The records.
+    """
+    if rebuild or not os.path.exists(cache) or \
+            os.path.getmtime(cache) < max(os.path.getmtime(texts_path), os.path.getmtime(calls_path)):
+        convert(texts_path, calls_path, cache)
+    return open_columns(cache)
+
+
+def summarize_cached(texts_path: str = 'texts.csv', calls_path: str = 'calls.csv', cache: str = DEFAULT_CACHE,
+                     rebuild: bool = False) -> CDRSummary:
+    """
+    Summarize the records from their cache; see `open_cached`.
+
+    Returns:
+        CDRSummary: The summary of all records.
+    """
+    return summarize_columns(open_cached(texts_path, calls_path, cache, rebuild))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', default='texts.csv')
+    parser.add_argument('--calls', default='calls.csv')
+    parser.add_argument('--cache', default=DEFAULT_CACHE)
+    parser.add_argument('--rebuild', action='store_true', help="convert the records even if the cache is fresh")
+    args = parser.parse_args()
+
+    summary = summarize_cached(args.texts, args.calls, args.cache, args.rebuild)
+    for report in REPORTS:
+        print('\n'.join(report(summary)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+A single-pass engine for the call and text record (CDR) analyses of Task0 to Task4.
+
+Each CSV file is streamed once, row by row, into a `CDRSummary`. Its memory
+grows with the number of distinct phone numbers, not with the number of
+records. All five reports are then formatted from that one summary.
+
+Summaries are mergeable: the summary of a file equals the merge, in file
+order, of the summaries of consecutive pieces of it. This lets pieces be
+summarized in parallel.
+
+Usage:
+    python cdr_engine.py [--texts texts.csv] [--calls calls.csv]
+"""
+import argparse
+import calendar
+import csv
+import time
+from collections.abc import Iterable, Iterator
+from typing import Optional
+
+# Role flags of a phone number, combined with |
+CALLER = 1
+CALL_RECEIVER = 2
+TEXT_SENDER = 4
+TEXT_RECEIVER = 8
+
+BANGALORE = '(080)'
+
+# The format of the time column, e.g. "01-09-2016 06:01:12"
+TIMESTAMP_FORMAT = '%d-%m-%Y %H:%M:%S'
+
+# Midnight epoch of every date seen, since records share few dates
+_day_epochs: dict[str, int] = {}
+
+
+def area_code(number: str) -> str:
+    """
+    Return the area code or mobile prefix of a phone number, as defined in Task3.
+
+    Args:
+        number (str): A fixed line "(0xx)xxxxxxx", mobile "9xxxx xxxxx" or
+            telemarketer "140xxxxxxx" number.
+
+    Returns:
+        str: The digits between the parentheses of a fixed line, "140" for a
+            telemarketer, and the first four digits of a mobile number.
+    """
+    if number[0] == '(':
+        return number[1:].split(')')[0]
+    if number[0:3] == '140':
+        return '140'
+    return number[0:4]
+
+
+def parse_timestamp(text: str) -> int:
+    """
+    Convert a record time such as "01-09-2016 06:01:12" to seconds since the epoch.
+
+    The records carry no time zone, so they are read as UTC, which makes the
+    conversion exact in both directions.
+
+    Args:
+        text (str): The time column of a record.
+
+    Returns:
+        int: The seconds since 1970-01-01 00:00:00.
+    """
+    day_epoch = _day_epochs.get(text[:10]) if len(text) == 19 else None
+    if day_epoch is None:
+        parsed = time.strptime(text, TIMESTAMP_FORMAT)
+        epoch = calendar.timegm(parsed)
+        if len(text) == 19:
+            _day_epochs[text[:10]] = epoch - (parsed.tm_hour * 3600 + parsed.tm_min * 60 + parsed.tm_sec)
+        return epoch
+    return day_epoch + int(text[11:13]) * 3600 + int(text[14:16]) * 60 + int(text[17:19])
+
+
+def format_timestamp(epoch: int) -> str:
+    """
+    Convert seconds since the epoch back to the time format of the records.
+
+    Args:
+        epoch (int): The seconds since 1970-01-01 00:00:00 UTC.
+
+    Returns:
+        str: The time, e.g. "01-09-2016 06:01:12".
+    """
+    return time.strftime(TIMESTAMP_FORMAT, time.gmtime(epoch))
+
+
+def read_records(filename: str) -> Iterator[list[str]]:
+    """
+    Stream the rows of a CSV file without loading it into memory.
+
+    Args:
+        filename (str): The name of the file.
+
+    Yields:
+        list[str]: The fields of every row.
+    """
+    with open(filename, 'r', newline='') as f:
+        yield from csv.reader(f)
+
+
+class CDRSummary:
+    """
+    Everything Task0 to Task4 need to know about a stream of records.
+
+    Attributes:
+        first_text (Optional[list[str]]): The first text record seen.
+        last_call (Optional[list[str]]): The last call record seen.
+        roles (dict[str, int]): The role flags of every phone number.
+        seconds (dict[str, int]): The seconds every number spent on calls, in
+            order of first appearance in the calls.
+        bangalore_codes (set[str]): The codes called from Bangalore fixed lines.
+        bangalore_calls (int): The number of calls from Bangalore fixed lines.
+        bangalore_local_calls (int): How many of those went to Bangalore fixed lines.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty summary.
+        """
+        self.first_text: Optional[list[str]] = None
+        self.last_call: Optional[list[str]] = None
+        self.roles: dict[str, int] = {}
+        self.seconds: dict[str, int] = {}
+        self.bangalore_codes: set[str] = set()
+        self.bangalore_calls = 0
+        self.bangalore_local_calls = 0
+
+    def add_texts(self, texts: Iterable[list[str]]) -> "CDRSummary":
+        """
+        Add text records (sender, receiver, time).
+
+        Args:
+            texts (Iterable[list[str]]): The records, in file order.
+
+        Returns:
+            CDRSummary: This summary, for chaining.
+        """
+        roles = self.roles
+        for record in texts:
+            if not record:
+                # A blank line, e.g. at the end of a file
+                continue
+            if self.first_text is None:
+                self.first_text = record
+            sending_num, receiving_num = record[0], record[1]
+            roles[sending_num] = roles.get(sending_num, 0) | TEXT_SENDER
+            roles[receiving_num] = roles.get(receiving_num, 0) | TEXT_RECEIVER
+        return self
+
+    def add_calls(self, calls: Iterable[list[str]]) -> "CDRSummary":
+        """
+        Add call records (caller, receiver, time, duration in seconds).
+
+        Args:
+            calls (Iterable[list[str]]): The records, in file order.
+
+        Returns:
+            CDRSummary: This summary, for chaining.
+        """
+        roles, seconds, codes = self.roles, self.seconds, self.bangalore_codes
+        last_call = None
+        for record in calls:
+            if not record:
+                continue
+            last_call = record
+            calling_num, receiving_num, _, during = record
+            roles[calling_num] = roles.get(calling_num, 0) | CALLER
+            roles[receiving_num] = roles.get(receiving_num, 0) | CALL_RECEIVER
+            during = int(during)
+            seconds[calling_num] = seconds.get(calling_num, 0) + during
+            seconds[receiving_num] = seconds.get(receiving_num, 0) + during
+            if calling_num.startswith(BANGALORE):
+                self.bangalore_calls += 1
+                if receiving_num.startswith(BANGALORE):
+                    self.bangalore_local_calls += 1
+                codes.add(area_code(receiving_num))
+        if last_call is not None:
+            self.last_call = last_call
+        return self
+
+    def merge(self, other: "CDRSummary") -> "CDRSummary":
+        """
+        Fold in the summary of records that come after this summary's records.
+
+        Args:
+            other (CDRSummary): The summary of the following records.
+
+        Returns:
+            CDRSummary: This summary, for chaining.
+        """
+        if self.first_text is None:
+            self.first_text = other.first_text
+        if other.last_call is not None:
+            self.last_call = other.last_call
+        roles, seconds = self.roles, self.seconds
+        for number, flags in other.roles.items():
+            roles[number] = roles.get(number, 0) | flags
+        for number, during in other.seconds.items():
+            seconds[number] = seconds.get(number, 0) + during
+        self.bangalore_codes |= other.bangalore_codes
+        self.bangalore_calls += other.bangalore_calls
+        self.bangalore_local_calls += other.bangalore_local_calls
+        return self
+
+    def distinct_numbers(self) -> int:
+        """
+        Return how many different numbers appear in the records (Task1).
+        """
+        return len(self.roles)
+
+    def longest_on_phone(self) -> tuple[Optional[str], int]:
+        """
+        Return the number that spent the most seconds on calls and its total (Task2).
+
+        Ties go to the number that appeared first in the calls.
+        """
+        max_tele, max_during = None, 0
+        for tele, during in self.seconds.items():
+            if during > max_during:
+                max_tele, max_during = tele, during
+        return max_tele, max_during
+
+    def bangalore_local_percentage(self) -> float:
+        """
+        Return the percentage of Bangalore fixed-line calls made to Bangalore fixed lines (Task3).
+        """
+        if self.bangalore_calls == 0:
+            return 0.0
+        return self.bangalore_local_calls / self.bangalore_calls * 100
+
+    def telemarketers(self) -> list[str]:
+        """
+        Return, sorted, the numbers that make calls but never receive calls or
+        send or receive texts (Task4).
+        """
+        return sorted(number for number, flags in self.roles.items() if flags == CALLER)
+
+
+def summarize(texts_path: str = 'texts.csv', calls_path: str = 'calls.csv') -> CDRSummary:
+    """
+    Read both record files once and summarize them.
+
+    Args:
+        texts_path (str): The texts CSV file.
+        calls_path (str): The calls CSV file.
+
+    Returns:
+        CDRSummary: The summary of all records.
+    """
+    return CDRSummary().add_texts(read_records(texts_path)).add_calls(read_records(calls_path))
+
+
+def task0_report(summary: CDRSummary) -> list[str]:
+    incoming_number, answering_number, time = summary.first_text
+    lines = [f"First record of texts, <{incoming_number}> texts <{answering_number}> at time <{time}>"]
+    incoming_number, answering_number, time, during = summary.last_call
+    lines.append(f"Last record of calls, <{incoming_number}> calls <{answering_number}> at time <{time}>, "
+                 f"lasting <{during}> seconds")
+    return lines
+
+
+def task1_report(summary: CDRSummary) -> list[str]:
+    return [f"There are <{summary.distinct_numbers()}> different telephone numbers in the records."]
+
+
+def task2_report(summary: CDRSummary) -> list[str]:
+    max_tele, max_during = summary.longest_on_phone()
+    return [f"<{max_tele}> spent the longest time, <{max_during}> seconds, on the phone during September 2016."]
+
+
+def task3_report(summary: CDRSummary) -> list[str]:
+    lines = ["The numbers called by people in Bangalore have codes:"]
+    lines.extend(sorted(summary.bangalore_codes))
+    lines.append(f"<{summary.bangalore_local_percentage():.2f}> percent of calls from fixed lines in Bangalore "
+                 f"are calls to other fixed lines in Bangalore.")
+    return lines
+
+
+def task4_report(summary: CDRSummary) -> list[str]:
+    return ["These numbers could be telemarketers: ", *summary.telemarketers()]
+
+
+REPORTS = [task0_report, task1_report, task2_report, task3_report, task4_report]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', default='texts.csv')
+    parser.add_argument('--calls', default='calls.csv')
+    args = parser.parse_args()
+
+    summary = summarize(args.texts, args.calls)
+    for report in REPORTS:
+        print('\n'.join(report(summary)))
+
+
+if __name__ == '__main__':
+    main()
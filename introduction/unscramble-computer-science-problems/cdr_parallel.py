@@ -0,0 +1,113 @@
+"""
+Parallel chunked ingestion of call and text record files.
+
+Each file is cut into chunks of about --chunk-mb megabytes at line
+boundaries. A process pool summarizes the chunks, each into a
+`cdr_engine.CDRSummary`. The partial summaries are merged back in file
+order, so the result is exactly the serial one:
+
+- distinct numbers for Task1 are the union of the chunks' role tables;
+- per-number durations for Task2 are added up;
+- caller/receiver roles for Task4 are OR-ed together.
+
+Chunks are split on newlines, which assumes no field contains a quoted
+line break; call and text records never do.
+
+Usage:
+    python cdr_parallel.py [--texts texts.csv] [--calls calls.csv] [--workers 4] [--chunk-mb 64]
+"""
+import argparse
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from cdr_engine import REPORTS, CDRSummary
+
+DEFAULT_CHUNK_BYTES = 64 * 2**20
+
+
+def chunk_boundaries(filename: str, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> list[tuple[int, int]]:
+    """
+    Split a file into byte ranges of about `chunk_bytes` that start and end at line boundaries.
+
+    Args:
+        filename (str): The name of the file.
+        chunk_bytes (int): The approximate size of every range.
+
+    Returns:
+        list[tuple[int, int]]: The (start, end) byte offsets of the ranges, in file order.
+    """
+    size = os.path.getsize(filename)
+    starts = [0]
+    with open(filename, 'rb') as f:
+        position = chunk_bytes
+        while position < size:
+            # Move to the start of the next line; a range always ends after a newline
+            f.seek(position)
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            starts.append(position)
+            position += chunk_bytes
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _summarize_chunk(task: tuple[str, str, int, int]) -> CDRSummary:
+    kind, filename, start, end = task
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    records = csv.reader(io.StringIO(text, newline=''))
+    summary = CDRSummary()
+    return summary.add_texts(records) if kind == 'texts' else summary.add_calls(records)
+
+
+def summarize_parallel(texts_path: str = 'texts.csv', calls_path: str = 'calls.csv', workers: Optional[int] = None,
+                       chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> CDRSummary:
+    """
+    Summarize both record files with a process pool.
+
+    Args:
+        texts_path (str): The texts CSV file.
+        calls_path (str): The calls CSV file.
+        workers (Optional[int]): The number of worker processes; None uses one
+            per CPU and 1 runs everything in this process.
+        chunk_bytes (int): The approximate size of the chunk given to a worker at a time.
+
+    Returns:
+        CDRSummary: The same summary as `cdr_engine.summarize`.
+    """
+    tasks = [(kind, filename, start, end)
+             for kind, filename in (('texts', texts_path), ('calls', calls_path))
+             for start, end in chunk_boundaries(filename, chunk_bytes)]
+    summary = CDRSummary()
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            summary.merge(_summarize_chunk(task))
+        return summary
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map yields in task order, so partials are merged in file order as they complete
+        for partial in pool.map(_summarize_chunk, tasks):
+            summary.merge(partial)
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', default='texts.csv')
+    parser.add_argument('--calls', default='calls.csv')
+    parser.add_argument('--workers', type=int, default=None, help="the number of worker processes")
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_BYTES / 2**20,
+                        help="the approximate chunk size, in megabytes")
+    args = parser.parse_args()
+
+    summary = summarize_parallel(args.texts, args.calls, args.workers, max(1, int(args.chunk_mb * 2**20)))
+    for report in REPORTS:
+        print('\n'.join(report(summary)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+"""
+Checks for the CDR engines against the output of the original Task0 to
+Task4 scripts on calls.csv and texts.csv, kept in task_output.txt.
+
+Usage:
+    python cdr_test.py
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+from cdr_columns import convert, open_cached, open_columns, summarize_columns
+from cdr_engine import REPORTS, CDRSummary, area_code, parse_timestamp, read_records, summarize
+from cdr_parallel import chunk_boundaries, summarize_parallel
+from telemarketer_watch import TelemarketerDetector
+from time_index import TimeIndex
+from top_talkers import ApproximateTopK, ExactTopK, track_parallel
+from traffic_matrix import PrefixClassifier, TrafficMatrix, matrix_from_columns
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+TEXTS = os.path.join(HERE, 'texts.csv')
+CALLS = os.path.join(HERE, 'calls.csv')
+
+
+def expected_lines() -> list[str]:
+    with open(os.path.join(HERE, 'task_output.txt')) as f:
+        return f.read().splitlines()
+
+
+def report_lines(summary: CDRSummary) -> list[str]:
+    return [line for report in REPORTS for line in report(summary)]
+
+
+def test_serial_engine() -> None:
+    assert report_lines(summarize(TEXTS, CALLS)) == expected_lines()
+
+
+def test_task_scripts() -> None:
+    output = []
+    for task in range(5):
+        result = subprocess.run([sys.executable, f'Task{task}.py'], cwd=HERE, capture_output=True, text=True,
+                                check=True)
+        output.extend(result.stdout.splitlines())
+    assert output == expected_lines()
+
+
+def test_parallel_engine() -> None:
+    # Small chunks so every file is split many times, in this process and in a pool
+    for workers in (1, 2):
+        summary = summarize_parallel(TEXTS, CALLS, workers=workers, chunk_bytes=20000)
+        assert report_lines(summary) == expected_lines()
+
+
+def test_chunk_boundaries() -> None:
+    size = os.path.getsize(CALLS)
+    ranges = chunk_boundaries(CALLS, 10000)
+    assert ranges[0][0] == 0 and ranges[-1][1] == size
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    with open(CALLS, 'rb') as f:
+        data = f.read()
+    assert all(data[start - 1:start] == b'\n' for start, _ in ranges[1:])
+
+
+def test_columnar_cache() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        cache = convert(TEXTS, CALLS, os.path.join(directory, 'records.cdrc'))
+        columns = open_columns(cache)
+        assert report_lines(summarize_columns(columns)) == expected_lines()
+        calls = [record for record in read_records(CALLS) if record]
+        assert [columns.call_record(index) for index in range(len(calls))] == calls
+        texts = [record for record in read_records(TEXTS) if record]
+        assert [columns.text_record(index) for index in range(len(texts))] == texts
+        numbers = columns.numbers
+        assert list(numbers) == sorted(set(numbers))
+        assert numbers.index(calls[0][0]) == columns.call_callers[0]
+        assert all(numbers[number_id].startswith('(080)') for number_id in numbers.prefix_range('(080)'))
+        # open_cached reuses a fresh cache and rebuilds a stale one
+        assert report_lines(summarize_columns(open_cached(TEXTS, CALLS, cache))) == expected_lines()
+        os.utime(cache, (0, 0))
+        open_cached(TEXTS, CALLS, cache)
+        assert os.path.getmtime(cache) > 0
+
+
+def test_columnar_cache_rejects_other_files() -> None:
+    try:
+        open_columns(CALLS)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a CSV file must not open as a cache")
+
+
+def test_top_talkers() -> None:
+    exact = ExactTopK().add_calls(read_records(CALLS))
+    number, seconds = exact.top(1)[0]
+    assert expected_lines()[3] == (f"<{number}> spent the longest time, <{seconds}> seconds, "
+                                   f"on the phone during September 2016.")
+    totals = exact.totals
+    assert exact.top(10) == sorted(totals.items(), key=lambda item: -item[1])[:10]
+    assert track_parallel(CALLS, None, workers=1, chunk_bytes=20000).top(10) == exact.top(10)
+
+    for tracker in (ApproximateTopK(50, 512, 4).add_calls(read_records(CALLS)),
+                    track_parallel(CALLS, (50, 512, 4), workers=1, chunk_bytes=20000)):
+        # Estimates only overestimate, and Space-Saving knows by how much at most
+        assert all(estimate >= totals[number] for number, estimate in tracker.top(10))
+        candidates = tracker.candidates
+        assert all(candidates.counts[number] - candidates.errors[number] <= totals[number] <= candidates.counts[number]
+                   for number in candidates.counts)
+    # With room for every number the approximate tracker is exact
+    assert [number for number, _ in ApproximateTopK(1000).add_calls(read_records(CALLS)).top(10)] == \
+        [number for number, _ in exact.top(10)]
+
+
+def test_prefix_classifier() -> None:
+    numbers = [number for path in (TEXTS, CALLS) for record in read_records(path) if record for number in record[:2]]
+    classifier = PrefixClassifier()
+    assert classifier.classify_column(numbers) == [area_code(number) for number in numbers]
+    assert classifier.classify('(08214175)1234') == '08214175'
+    for number in ('1234567890', '14', '(080', '(180)1234567', '55555 55555', '9 123', ''):
+        try:
+            PrefixClassifier().classify(number)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{number!r} matches no prefix and must be rejected")
+
+
+def test_traffic_matrix() -> None:
+    lines = expected_lines()
+    first = lines.index("The numbers called by people in Bangalore have codes:") + 1
+    last = next(index for index, line in enumerate(lines) if line.endswith("fixed lines in Bangalore."))
+    matrix = TrafficMatrix().add_calls(read_records(CALLS))
+    assert matrix.destinations('080') == lines[first:last]
+    assert lines[last].startswith(f"<{matrix.percentage('080', '080'):.2f}> percent")
+    with tempfile.TemporaryDirectory() as directory:
+        cached = matrix_from_columns(open_columns(convert(TEXTS, CALLS, os.path.join(directory, 'records.cdrc'))))
+    assert cached.calls == matrix.calls
+
+
+def _telemarketers() -> list[str]:
+    lines = expected_lines()
+    return lines[lines.index("These numbers could be telemarketers: ") + 1:]
+
+
+def test_telemarketer_split_ingest_and_reload() -> None:
+    with open(TEXTS, 'rb') as f:
+        texts = f.read()
+    with open(CALLS, 'rb') as f:
+        calls = f.read()
+    with tempfile.TemporaryDirectory() as directory:
+        texts_path, calls_path = os.path.join(directory, 'texts.csv'), os.path.join(directory, 'calls.csv')
+        checkpoint = os.path.join(directory, 'telemarketers.json')
+        # The first part ends in the middle of a line, which must wait for the rest
+        with open(texts_path, 'wb') as f:
+            f.write(texts[:len(texts) // 2])
+        with open(calls_path, 'wb') as f:
+            f.write(calls[:len(calls) // 3])
+        detector = TelemarketerDetector()
+        detector.ingest(texts_path, calls_path)
+        detector.save(checkpoint)
+
+        with open(texts_path, 'ab') as f:
+            f.write(texts[len(texts) // 2:])
+        with open(calls_path, 'ab') as f:
+            f.write(calls[len(calls) // 3:])
+        restored = TelemarketerDetector.load(checkpoint)
+        assert restored.counters == detector.counters and restored.candidates == detector.candidates
+        added, removed = restored.ingest(texts_path, calls_path, final=True)
+        assert restored.telemarketers() == _telemarketers()
+        assert added == restored.candidates - detector.candidates
+        assert removed == detector.candidates - restored.candidates
+
+        # Nothing new: nothing changes
+        assert restored.ingest(texts_path, calls_path, final=True) == (set(), set())
+        with open(calls_path, 'wb') as f:
+            f.write(calls[:100])
+        try:
+            restored.ingest(texts_path, calls_path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("a file that shrank must be rejected")
+
+
+def test_time_index_windows() -> None:
+    calls = [record for record in read_records(CALLS) if record]
+    times = [parse_timestamp(record[2]) for record in calls]
+    ends = [time + int(record[3]) for time, record in zip(times, calls)]
+    rng = random.Random(0)
+    shuffled = list(range(len(calls)))
+    rng.shuffle(shuffled)
+    # The file is in time order; a shuffled copy exercises the sorting path
+    indexes = [(TimeIndex(times, [int(record[3]) for record in calls]), list(range(len(calls)))),
+               (TimeIndex([times[index] for index in shuffled], [int(calls[index][3]) for index in shuffled]),
+                shuffled)]
+    for _ in range(200):
+        start = rng.randrange(min(times) - 3600, max(times))
+        end = start + rng.randrange(1, 2 * 86400)
+        inside = [index for index, time in enumerate(times) if start <= time < end]
+        active = [index for index in range(len(times)) if times[index] < end and ends[index] > start]
+        minutes: dict[int, int] = {}
+        for index in inside:
+            minute = times[index] - times[index] % 60
+            minutes[minute] = minutes.get(minute, 0) + 1
+        busiest = max(sorted(minutes.items()), key=lambda item: item[1]) if minutes else None
+        for index, original in indexes:
+            assert index.count(start, end) == len(inside)
+            assert sorted(original[record] for record in index.records(start, end)) == inside
+            assert sorted(original[record] for record in index.active(start, end)) == active
+            assert index.busiest_minute(start, end) == busiest
+            hours = index.per_hour(start, end)
+            assert sum(count for _, count in hours) == len(inside)
+            assert all(count == sum(1 for position in inside if hour <= times[position] < hour + 3600)
+                       for hour, count in hours)
+
+
+if __name__ == '__main__':
+    for name, function in list(globals().items()):
+        if name.startswith('test_'):
+            function()
+    print("All tests pass!")
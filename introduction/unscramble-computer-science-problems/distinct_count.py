@@ -0,0 +1,228 @@
+"""
+Task1 for record files too large to hold every phone number: count the
+distinct numbers exactly with a set, or approximately with a HyperLogLog.
+
+A HyperLogLog keeps 2**precision one-byte registers, whatever the number of
+records, and estimates the count within about 1.04 / sqrt(2**precision)
+relative error. Two sketches merge by a register-wise maximum into the
+sketch of the union. Like the exact sets, they are therefore built per chunk
+and per file by a process pool and merged afterwards (see cdr_parallel.py).
+Numbers are hashed with BLAKE2b, not `hash`, whose string hashes differ
+between processes.
+
+Usage:
+    python distinct_count.py [--texts texts.csv] [--calls calls.csv] [--error 0.01]
+                             [--workers 4] [--chunk-mb 64]
+"""
+import argparse
+import csv
+import hashlib
+import io
+import math
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Union
+
+from cdr_parallel import DEFAULT_CHUNK_BYTES, chunk_boundaries
+
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+
+class HyperLogLog:
+    """
+    A mergeable estimator of the number of distinct strings added to it.
+
+    Attributes:
+        precision (int): The number of hash bits that choose a register.
+        registers (bytearray): The longest run of leading zero bits, plus one,
+            seen by every register.
+    """
+
+    def __init__(self, precision: int = 14) -> None:
+        """
+        Initialize an empty sketch.
+
+        Args:
+            precision (int): 4 to 18; the sketch has 2**precision registers.
+        """
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @classmethod
+    def with_error(cls, relative_error: float) -> "HyperLogLog":
+        """
+        Create the smallest sketch whose standard error is at most `relative_error`.
+
+        Args:
+            relative_error (float): The standard error, e.g. 0.01 for 1%.
+
+        Returns:
+            HyperLogLog: An empty sketch.
+
+        Raises:
+            ValueError: If the error needs more than 2**MAX_PRECISION registers.
+        """
+        if relative_error <= 0:
+            raise ValueError("relative_error must be positive")
+        precision = math.ceil(math.log2((1.04 / relative_error) ** 2))
+        if precision > MAX_PRECISION:
+            raise ValueError(f"a standard error of {relative_error} needs precision {precision}, "
+                             f"above the maximum of {MAX_PRECISION}; use the exact count instead")
+        return cls(max(precision, MIN_PRECISION))
+
+    @property
+    def relative_error(self) -> float:
+        """
+        The standard error of the estimate, relative to the true count.
+        """
+        return 1.04 / math.sqrt(len(self.registers))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the registers, in bytes.
+        """
+        return len(self.registers)
+
+    def add(self, item: str) -> None:
+        """
+        Add a string to the sketch.
+        """
+        self.update((item,))
+
+    def update(self, items: Iterable[str]) -> "HyperLogLog":
+        """
+        Add strings to the sketch.
+
+        Args:
+            items (Iterable[str]): The strings.
+
+        Returns:
+            HyperLogLog: This sketch, for chaining.
+        """
+        registers = self.registers
+        index_shift = 64 - self.precision
+        rest_mask = (1 << index_shift) - 1
+        blake2b, from_bytes = hashlib.blake2b, int.from_bytes
+        for item in items:
+            hashed = from_bytes(blake2b(item.encode(), digest_size=8).digest(), 'little')
+            index = hashed >> index_shift
+            # The position of the first one bit in the remaining bits
+            rank = index_shift - (hashed & rest_mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+        return self
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """
+        Fold in another sketch, so this one estimates the union of both.
+
+        Args:
+            other (HyperLogLog): A sketch with the same precision.
+
+        Returns:
+            HyperLogLog: This sketch, for chaining.
+        """
+        if other.precision != self.precision:
+            raise ValueError("only sketches with the same precision can be merged")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def estimate(self) -> int:
+        """
+        Return the estimated number of distinct strings added.
+        """
+        registers = self.registers
+        m = len(registers)
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        raw = alpha * m * m / math.fsum(2.0 ** -register for register in registers)
+        zeros = registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def __len__(self) -> int:
+        return self.estimate()
+
+
+def _count_chunk(task: tuple[Optional[int], str, int, int]) -> Union[set[str], HyperLogLog]:
+    precision, filename, start, end = task
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    # Both files have the two phone numbers of a record first
+    numbers = (number for record in csv.reader(io.StringIO(text, newline='')) if record for number in record[:2])
+    if precision is None:
+        return set(numbers)
+    return HyperLogLog(precision).update(numbers)
+
+
+def count_distinct(texts_path: str = 'texts.csv', calls_path: str = 'calls.csv',
+                   relative_error: Optional[float] = None, workers: Optional[int] = 1,
+                   chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Union[set[str], HyperLogLog]:
+    """
+    Collect the distinct phone numbers of both record files (Task1).
+
+    Args:
+        texts_path (str): The texts CSV file.
+        calls_path (str): The calls CSV file.
+        relative_error (Optional[float]): None for the exact set of numbers, or
+            the standard error of a HyperLogLog estimate.
+        workers (Optional[int]): The number of worker processes; None uses one
+            per CPU and 1 runs everything in this process.
+        chunk_bytes (int): The approximate size of the chunk given to a worker at a time.
+
+    Returns:
+        Union[set[str], HyperLogLog]: The numbers, or a sketch of them; `len`
+            of either is the count.
+    """
+    precision = None if relative_error is None else HyperLogLog.with_error(relative_error).precision
+    tasks = [(precision, filename, start, end)
+             for filename in (texts_path, calls_path)
+             for start, end in chunk_boundaries(filename, chunk_bytes)]
+    result = set() if precision is None else HyperLogLog(precision)
+    merge = result.update if precision is None else result.merge
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            merge(_count_chunk(task))
+        return result
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(_count_chunk, tasks):
+            merge(partial)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', default='texts.csv')
+    parser.add_argument('--calls', default='calls.csv')
+    parser.add_argument('--error', type=float, default=None,
+                        help="estimate with a HyperLogLog of this standard error instead of counting exactly")
+    parser.add_argument('--workers', type=int, default=1, help="the number of worker processes")
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_BYTES / 2**20,
+                        help="the approximate chunk size, in megabytes")
+    args = parser.parse_args()
+    if args.error is not None:
+        try:
+            HyperLogLog.with_error(args.error)
+        except ValueError as error:
+            parser.error(str(error))
+
+    numbers = count_distinct(args.texts, args.calls, args.error, args.workers,
+                             max(1, int(args.chunk_mb * 2**20)))
+    if isinstance(numbers, HyperLogLog):
+        print(f"There are about <{len(numbers)}> different telephone numbers in the records "
+              f"(standard error {numbers.relative_error:.2%}, {numbers.nbytes} bytes).")
+    else:
+        print(f"There are <{len(numbers)}> different telephone numbers in the records.")
+
+
+if __name__ == '__main__':
+    main()
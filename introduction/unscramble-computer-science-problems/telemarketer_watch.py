@@ -0,0 +1,223 @@
+"""
+Incremental telemarketer detection (Task4) over append-only record files.
+
+`TelemarketerDetector` keeps four counters per phone number: outgoing
+calls, incoming calls, texts sent and texts received. A number is a
+possible telemarketer while it has outgoing calls and every other counter
+is zero. The candidate set is updated as each record arrives, so a new
+batch of records costs time in proportion to the batch, not the history.
+
+The detector remembers how many bytes of each file it has read, and its
+counters and offsets are checkpointed to a JSON file. After a restart it
+reads only what was appended since the checkpoint. The files must only
+grow; one that shrank is an error, since its records can not be un-counted.
+
+By default a last line without a newline is left for the next read, as a
+writer may still be appending to it; --final reads it too, for files that
+are complete.
+
+Usage:
+    python telemarketer_watch.py [--texts texts.csv] [--calls calls.csv] [--checkpoint telemarketers.json]
+                                 [--final] [--follow 60]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import time
+from collections.abc import Iterable
+from typing import Optional
+
+# Indexes of a number's counters
+OUTGOING_CALLS = 0
+INCOMING_CALLS = 1
+TEXTS_SENT = 2
+TEXTS_RECEIVED = 3
+
+CHECKPOINT_VERSION = 1
+
+
+class TelemarketerDetector:
+    """
+    Per-number role counters and the numbers they make possible telemarketers.
+
+    Attributes:
+        counters (dict[str, list[int]]): The four counters of every number seen.
+        candidates (set[str]): The numbers that only make calls.
+        offsets (dict[str, int]): How many bytes of every record file have been read.
+    """
+
+    def __init__(self) -> None:
+        self.counters: dict[str, list[int]] = {}
+        self.candidates: set[str] = set()
+        self.offsets: dict[str, int] = {}
+
+    def _counters(self, number: str) -> list[int]:
+        counters = self.counters.get(number)
+        if counters is None:
+            counters = self.counters[number] = [0, 0, 0, 0]
+        return counters
+
+    def add_call(self, calling_num: str, receiving_num: str) -> None:
+        """
+        Count a call and update the candidates of both numbers.
+        """
+        caller = self._counters(calling_num)
+        caller[OUTGOING_CALLS] += 1
+        if caller[OUTGOING_CALLS] == 1 and not (caller[INCOMING_CALLS] or caller[TEXTS_SENT]
+                                               or caller[TEXTS_RECEIVED]):
+            self.candidates.add(calling_num)
+        self._counters(receiving_num)[INCOMING_CALLS] += 1
+        self.candidates.discard(receiving_num)
+
+    def add_text(self, sending_num: str, receiving_num: str) -> None:
+        """
+        Count a text; neither number can be a telemarketer any more.
+        """
+        self._counters(sending_num)[TEXTS_SENT] += 1
+        self._counters(receiving_num)[TEXTS_RECEIVED] += 1
+        self.candidates.discard(sending_num)
+        self.candidates.discard(receiving_num)
+
+    def add_calls(self, calls: Iterable[list[str]]) -> int:
+        """
+        Count call records (caller, receiver, time, duration).
+
+        Returns:
+            int: The number of records counted.
+        """
+        count = 0
+        for record in calls:
+            if record:
+                self.add_call(record[0], record[1])
+                count += 1
+        return count
+
+    def add_texts(self, texts: Iterable[list[str]]) -> int:
+        """
+        Count text records (sender, receiver, time).
+
+        Returns:
+            int: The number of records counted.
+        """
+        count = 0
+        for record in texts:
+            if record:
+                self.add_text(record[0], record[1])
+                count += 1
+        return count
+
+    def ingest(self, texts_path: str = 'texts.csv', calls_path: str = 'calls.csv',
+               final: bool = False) -> tuple[set[str], set[str]]:
+        """
+        Count the records appended to both files since they were last read.
+
+        Args:
+            texts_path (str): The texts CSV file.
+            calls_path (str): The calls CSV file.
+            final (bool): Whether to also read a last line without a newline.
+
+        Returns:
+            tuple[set[str], set[str]]: The numbers that became candidates and the
+                numbers that stopped being candidates.
+        """
+        before = set(self.candidates)
+        self.add_texts(self._appended(texts_path, final))
+        self.add_calls(self._appended(calls_path, final))
+        return self.candidates - before, before - self.candidates
+
+    def _appended(self, filename: str, final: bool) -> Iterable[list[str]]:
+        key = os.path.abspath(filename)
+        offset = self.offsets.get(key, 0)
+        size = os.path.getsize(filename)
+        if size < offset:
+            raise ValueError(f"{filename} shrank from {offset} to {size} bytes; it must only be appended to")
+        with open(filename, 'rb') as f:
+            f.seek(offset)
+            data = f.read(size - offset)
+        if not final:
+            data = data[:data.rfind(b'\n') + 1]
+        self.offsets[key] = offset + len(data)
+        return csv.reader(io.StringIO(data.decode('utf-8'), newline=''))
+
+    def telemarketers(self) -> list[str]:
+        """
+        Return, sorted, the numbers that make calls but never receive calls or
+        send or receive texts.
+        """
+        return sorted(self.candidates)
+
+    def save(self, filename: str) -> None:
+        """
+        Write a checkpoint, replacing the previous one only once it is complete.
+
+        Args:
+            filename (str): The checkpoint file.
+        """
+        state = {'version': CHECKPOINT_VERSION, 'offsets': self.offsets, 'counters': self.counters}
+        temporary = filename + '.tmp'
+        with open(temporary, 'w') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(temporary, filename)
+
+    @classmethod
+    def load(cls, filename: str) -> "TelemarketerDetector":
+        """
+        Restore a detector from a checkpoint.
+
+        Args:
+            filename (str): The checkpoint file.
+
+        Returns:
+            TelemarketerDetector: The detector as it was saved.
+        """
+        with open(filename) as f:
+            state = json.load(f)
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"unsupported checkpoint version {state.get('version')}")
+        detector = cls()
+        detector.offsets = state['offsets']
+        detector.counters = state['counters']
+        detector.candidates = {number for number, (outgoing, incoming, sent, received) in detector.counters.items()
+                               if outgoing and not (incoming or sent or received)}
+        return detector
+
+
+def open_detector(checkpoint: Optional[str]) -> TelemarketerDetector:
+    """
+    Load a detector from a checkpoint if there is one, or start an empty one.
+    """
+    if checkpoint is not None and os.path.exists(checkpoint):
+        return TelemarketerDetector.load(checkpoint)
+    return TelemarketerDetector()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--texts', default='texts.csv')
+    parser.add_argument('--calls', default='calls.csv')
+    parser.add_argument('--checkpoint', help="resume from and save to this file")
+    parser.add_argument('--final', action='store_true', help="also read a last line without a newline")
+    parser.add_argument('--follow', type=float, metavar='SECONDS',
+                        help="keep reading appended records at this interval and print the changes")
+    args = parser.parse_args()
+
+    detector = open_detector(args.checkpoint)
+    detector.ingest(args.texts, args.calls, args.final)
+    if args.checkpoint is not None:
+        detector.save(args.checkpoint)
+    print('\n'.join(["These numbers could be telemarketers: ", *detector.telemarketers()]))
+    while args.follow is not None:
+        time.sleep(args.follow)
+        added, removed = detector.ingest(args.texts, args.calls, args.final)
+        if args.checkpoint is not None:
+            detector.save(args.checkpoint)
+        for number in sorted(added):
+            print(f"+ {number}")
+        for number in sorted(removed):
+            print(f"- {number}")
+
+
+if __name__ == '__main__':
+    main()
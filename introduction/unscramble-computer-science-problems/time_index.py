@@ -0,0 +1,212 @@
+"""
+Time-window queries over the call and text records.
+
+A `TimeIndex` holds the record times as int64 epochs (see
+`cdr_engine.parse_timestamp`) in sorted order, so a window [start, end)
+is found with two bisections and counted without touching its records.
+The record files are already in time order; they are only sorted if not.
+
+Counts per hour follow from bisecting at every hour boundary. Records are
+also bucketed by minute, keeping only the minutes that have records, so
+the busiest minute of a window is a scan of those buckets. A call is on
+the phone from its start until its duration has passed; the longest
+duration bounds how far before a window a call that overlaps it can start.
+
+The index is built over the columnar cache of cdr_columns.py, which is
+built or refreshed first if needed.
+
+Usage:
+    python time_index.py --start "01-09-2016 09:00:00" --end "01-09-2016 10:00:00"
+                         [--texts texts.csv] [--calls calls.csv] [--cache records.cdrc]
+"""
+import argparse
+import bisect
+from array import array
+from collections.abc import Sequence
+from typing import Optional
+
+from cdr_columns import DEFAULT_CACHE, CDRColumns, open_cached
+from cdr_engine import format_timestamp, parse_timestamp
+
+
+class TimeIndex:
+    """
+    Records sorted by time, with per-minute buckets.
+
+    Attributes:
+        times (Sequence[int]): The record times, ascending.
+        order (Optional[array]): The record index at every sorted position, or
+            None when the records were already in time order.
+        ends (Optional[array]): For calls, the time every call ended, by sorted position.
+        max_duration (int): The longest call, in seconds.
+        minutes (array): The start of every minute that has records, ascending.
+        minute_starts (array): The sorted position of the first record of every
+            minute, followed by the number of records.
+    """
+
+    def __init__(self, times: Sequence[int], durations: Optional[Sequence[int]] = None) -> None:
+        """
+        Index records by time.
+
+        Args:
+            times (Sequence[int]): The time of every record, in seconds since the epoch.
+            durations (Optional[Sequence[int]]): For calls, the duration of every record.
+        """
+        if all(times[index] <= times[index + 1] for index in range(len(times) - 1)):
+            self.order = None
+            self.times = times
+        else:
+            self.order = array('i', sorted(range(len(times)), key=times.__getitem__))
+            self.times = array('q', [times[index] for index in self.order])
+        self.ends = None
+        self.max_duration = 0
+        if durations is not None:
+            if self.order is not None:
+                durations = [durations[index] for index in self.order]
+            self.ends = array('q', [time + duration for time, duration in zip(self.times, durations)])
+            self.max_duration = max(durations, default=0)
+
+        self.minutes, self.minute_starts = array('q'), array('q')
+        for position, time in enumerate(self.times):
+            minute = time - time % 60
+            if not self.minutes or self.minutes[-1] != minute:
+                self.minutes.append(minute)
+                self.minute_starts.append(position)
+        self.minute_starts.append(len(self.times))
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def positions(self, start: int, end: int) -> range:
+        """
+        Return the sorted positions of the records in [start, end).
+        """
+        return range(bisect.bisect_left(self.times, start), bisect.bisect_left(self.times, end))
+
+    def records(self, start: int, end: int) -> list[int]:
+        """
+        Return the indexes of the records in [start, end), in time order.
+        """
+        positions = self.positions(start, end)
+        if self.order is None:
+            return list(positions)
+        return [self.order[position] for position in positions]
+
+    def count(self, start: int, end: int) -> int:
+        """
+        Return how many records are in [start, end).
+        """
+        return len(self.positions(start, end))
+
+    def active(self, start: int, end: int) -> list[int]:
+        """
+        Return the indexes of the calls that were going on at some time in
+        [start, end), in order of their start.
+        """
+        if self.ends is None:
+            raise ValueError("only an index of calls knows when records end")
+        ends = self.ends
+        positions = self.positions(start - self.max_duration, end)
+        overlapping = [position for position in positions if ends[position] > start]
+        if self.order is None:
+            return overlapping
+        return [self.order[position] for position in overlapping]
+
+    def per_hour(self, start: int, end: int) -> list[tuple[int, int]]:
+        """
+        Return the number of records in every hour that overlaps [start, end).
+
+        Args:
+            start (int): The start of the window, in seconds since the epoch.
+            end (int): The end of the window, exclusive.
+
+        Returns:
+            list[tuple[int, int]]: The start of every hour and its number of records
+                inside the window, including hours without records.
+        """
+        counts = []
+        hour = start - start % 3600
+        while hour < end:
+            counts.append((hour, self.count(max(hour, start), min(hour + 3600, end))))
+            hour += 3600
+        return counts
+
+    def busiest_minute(self, start: int, end: int) -> Optional[tuple[int, int]]:
+        """
+        Return the minute with the most records, counting only those in [start, end).
+
+        Args:
+            start (int): The start of the window, in seconds since the epoch.
+            end (int): The end of the window, exclusive.
+
+        Returns:
+            Optional[tuple[int, int]]: The start of the busiest minute and its
+                number of records, the earliest on ties; None if the window is empty.
+        """
+        minutes, minute_starts = self.minutes, self.minute_starts
+        first = bisect.bisect_right(minutes, start) - 1
+        last = bisect.bisect_left(minutes, end)
+        window = self.positions(start, end)
+        best = None
+        for bucket in range(max(first, 0), last):
+            # The first and last minutes may be cut by the window
+            count = min(minute_starts[bucket + 1], window.stop) - max(minute_starts[bucket], window.start)
+            if count > 0 and (best is None or count > best[1]):
+                best = (minutes[bucket], count)
+        return best
+
+
+def call_index(columns: CDRColumns) -> TimeIndex:
+    """
+    Index the calls of a cache by start time.
+    """
+    return TimeIndex(columns.call_times, columns.call_durations)
+
+
+def text_index(columns: CDRColumns) -> TimeIndex:
+    """
+    Index the texts of a cache by time.
+    """
+    return TimeIndex(columns.text_times)
+
+
+def numbers_on_phone(columns: CDRColumns, calls: TimeIndex, start: int, end: int) -> list[str]:
+    """
+    Return, sorted, the numbers that were on a call at some time in [start, end).
+    """
+    callers, receivers = columns.call_callers, columns.call_receivers
+    ids = set()
+    for index in calls.active(start, end):
+        ids.add(callers[index])
+        ids.add(receivers[index])
+    # Ids are in the sorted order of the numbers
+    return [columns.numbers[number_id] for number_id in sorted(ids)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--start', required=True, help='the start of the window, e.g. "01-09-2016 09:00:00"')
+    parser.add_argument('--end', required=True, help="the end of the window, exclusive")
+    parser.add_argument('--texts', default='texts.csv')
+    parser.add_argument('--calls', default='calls.csv')
+    parser.add_argument('--cache', default=DEFAULT_CACHE)
+    args = parser.parse_args()
+
+    start, end = parse_timestamp(args.start), parse_timestamp(args.end)
+    columns = open_cached(args.texts, args.calls, args.cache)
+    calls, texts = call_index(columns), text_index(columns)
+    print(f"<{calls.count(start, end)}> calls and <{texts.count(start, end)}> texts "
+          f"from <{args.start}> to <{args.end}>.")
+    on_phone = numbers_on_phone(columns, calls, start, end)
+    print(f"<{len(on_phone)}> numbers were on the phone:")
+    print('\n'.join(on_phone))
+    print("Calls per hour:")
+    for hour, count in calls.per_hour(start, end):
+        print(f"{format_timestamp(hour)} {count}")
+    busiest = calls.busiest_minute(start, end)
+    if busiest is not None:
+        print(f"The busiest minute was <{format_timestamp(busiest[0])}> with <{busiest[1]}> calls.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""
+Streaming top-k talkers: the k numbers that spent the longest on the phone,
+the generalization of Task2, over streams too long to total every number.
+
+Both trackers take calls one at a time, can be asked for the top k at any
+point, and merge, so chunks of a file can be tracked by a process pool
+(see cdr_parallel.py) and combined:
+
+* `ExactTopK` totals every number and selects the top k with a heap. Its
+  memory grows with the number of distinct numbers.
+* `ApproximateTopK` has bounded memory. A Space-Saving summary keeps the
+  `capacity` heaviest numbers seen so far as candidates; any number whose
+  total exceeds 1/capacity of all seconds is guaranteed to be among them.
+  Both Space-Saving and a Count-Min sketch overestimate totals, so a
+  candidate is reported with the smaller of the two estimates.
+
+Usage:
+    python top_talkers.py [--calls calls.csv] [-k 10] [--approximate [--capacity 1000] [--width 2048] [--depth 4]]
+                          [--workers 4] [--chunk-mb 64] [--every 1000]
+"""
+import argparse
+import csv
+import hashlib
+import heapq
+import io
+import math
+from array import array
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import Optional, Union
+
+from cdr_engine import read_records
+from cdr_parallel import DEFAULT_CHUNK_BYTES, chunk_boundaries
+
+
+def _add_calls(tracker: Union["ExactTopK", "ApproximateTopK"], calls: Iterable[list[str]]) -> None:
+    add = tracker.add
+    for record in calls:
+        if not record:
+            continue
+        calling_num, receiving_num, _, during = record
+        during = int(during)
+        add(calling_num, during)
+        add(receiving_num, during)
+
+
+class ExactTopK:
+    """
+    Exact talk-time totals of every number.
+
+    Attributes:
+        totals (dict[str, int]): The seconds of every number, in order of first appearance.
+    """
+
+    def __init__(self) -> None:
+        self.totals: dict[str, int] = {}
+
+    def add(self, number: str, seconds: int) -> None:
+        """
+        Count seconds of talk time for a number.
+        """
+        self.totals[number] = self.totals.get(number, 0) + seconds
+
+    def add_calls(self, calls: Iterable[list[str]]) -> "ExactTopK":
+        """
+        Count the duration of call records (caller, receiver, time, duration) for both numbers.
+
+        Returns:
+            ExactTopK: This tracker, for chaining.
+        """
+        _add_calls(self, calls)
+        return self
+
+    def merge(self, other: "ExactTopK") -> "ExactTopK":
+        """
+        Fold in the totals of another tracker.
+
+        Returns:
+            ExactTopK: This tracker, for chaining.
+        """
+        totals = self.totals
+        for number, seconds in other.totals.items():
+            totals[number] = totals.get(number, 0) + seconds
+        return self
+
+    def top(self, k: int) -> list[tuple[str, int]]:
+        """
+        Return the k numbers with the most seconds, most first.
+
+        Ties go to the number that appeared first, as in Task2.
+        """
+        return heapq.nlargest(k, self.totals.items(), key=itemgetter(1))
+
+
+class CountMinSketch:
+    """
+    Overestimates of the totals of a stream of (item, count) pairs in
+    `depth` rows of `width` counters.
+
+    An estimate exceeds the true total by at most e / width of the grand
+    total, with probability at least 1 - exp(-depth).
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4) -> None:
+        if width < 1 or depth < 1:
+            raise ValueError("width and depth must be positive")
+        self.width = width
+        self.depth = depth
+        self.counters = array('q', bytes(8 * width * depth))
+
+    @classmethod
+    def with_error(cls, epsilon: float, delta: float) -> "CountMinSketch":
+        """
+        Create a sketch whose estimates are within epsilon of the grand total
+        with probability 1 - delta.
+        """
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    def _cells(self, item: str) -> list[int]:
+        # Row i uses h1 + i * h2, which is as good as independent hashes
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        width = self.width
+        return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+    def add(self, item: str, count: int = 1) -> None:
+        counters = self.counters
+        for cell in self._cells(item):
+            counters[cell] += count
+
+    def estimate(self, item: str) -> int:
+        counters = self.counters
+        return min(counters[cell] for cell in self._cells(item))
+
+    def merge(self, other: "CountMinSketch") -> "CountMinSketch":
+        """
+        Fold in a sketch of the same shape; the result sketches both streams.
+
+        Returns:
+            CountMinSketch: This sketch, for chaining.
+        """
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("only sketches of the same shape can be merged")
+        self.counters = array('q', map(sum, zip(self.counters, other.counters)))
+        return self
+
+
+class SpaceSaving:
+    """
+    The heaviest items of a weighted stream, in at most `capacity` counters.
+
+    A monitored item's count overestimates its true total by at most its
+    error, and by at most the smallest count when the summary is full.
+
+    Attributes:
+        counts (dict[str, int]): The count of every monitored item.
+        errors (dict[str, int]): How much of every count may be overestimated.
+    """
+
+    def __init__(self, capacity: int = 1000) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.counts: dict[str, int] = {}
+        self.errors: dict[str, int] = {}
+        # (count, item) pairs; entries whose count is out of date are skipped
+        self._heap: list[tuple[int, str]] = []
+
+    def add(self, item: str, count: int = 1) -> None:
+        counts, heap = self.counts, self._heap
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            # Replace the item with the smallest count, which the newcomer may have had
+            smallest = self.min_count()
+            evicted = heapq.heappop(heap)[1]
+            del counts[evicted], self.errors[evicted]
+            counts[item] = smallest + count
+            self.errors[item] = smallest
+        heapq.heappush(heap, (counts[item], item))
+        if len(heap) > 4 * self.capacity:
+            self._rebuild()
+
+    def min_count(self) -> int:
+        """
+        Return the smallest monitored count, or 0 while the summary has room.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        heap, counts = self._heap, self.counts
+        while counts.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+        return heap[0][0]
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Fold in another summary; the result summarizes both streams.
+
+        An item missing from a full summary may have had up to its smallest
+        count, so that is what it contributes.
+
+        Returns:
+            SpaceSaving: This summary, for chaining.
+        """
+        own_floor, other_floor = self.min_count(), other.min_count()
+        counts, errors = {}, {}
+        for item in dict.fromkeys([*self.counts, *other.counts]):
+            counts[item] = self.counts.get(item, own_floor) + other.counts.get(item, other_floor)
+            errors[item] = self.errors.get(item, own_floor) + other.errors.get(item, other_floor)
+        kept = heapq.nlargest(self.capacity, counts, key=counts.__getitem__)
+        self.counts = {item: counts[item] for item in kept}
+        self.errors = {item: errors[item] for item in kept}
+        self._rebuild()
+        return self
+
+    def _rebuild(self) -> None:
+        self._heap = [(count, item) for item, count in self.counts.items()]
+        heapq.heapify(self._heap)
+
+
+class ApproximateTopK:
+    """
+    Bounded-memory top-k talkers from a Space-Saving summary and a Count-Min sketch.
+    """
+
+    def __init__(self, capacity: int = 1000, width: int = 2048, depth: int = 4) -> None:
+        self.candidates = SpaceSaving(capacity)
+        self.sketch = CountMinSketch(width, depth)
+
+    def add(self, number: str, seconds: int) -> None:
+        """
+        Count seconds of talk time for a number.
+        """
+        self.candidates.add(number, seconds)
+        self.sketch.add(number, seconds)
+
+    def add_calls(self, calls: Iterable[list[str]]) -> "ApproximateTopK":
+        """
+        Count the duration of call records (caller, receiver, time, duration) for both numbers.
+
+        Returns:
+            ApproximateTopK: This tracker, for chaining.
+        """
+        _add_calls(self, calls)
+        return self
+
+    def merge(self, other: "ApproximateTopK") -> "ApproximateTopK":
+        """
+        Fold in another tracker of the same shape.
+
+        Returns:
+            ApproximateTopK: This tracker, for chaining.
+        """
+        self.candidates.merge(other.candidates)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def top(self, k: int) -> list[tuple[str, int]]:
+        """
+        Return the k candidates with the most estimated seconds, most first.
+
+        Estimates never undercount; each is the tighter of the two overestimates.
+        """
+        estimate = self.sketch.estimate
+        return heapq.nlargest(k, ((number, min(count, estimate(number)))
+                                  for number, count in self.candidates.counts.items()), key=itemgetter(1))
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The size of the Count-Min counters plus the monitored entries, in bytes,
+        not counting the number strings.
+        """
+        return self.sketch.counters.itemsize * len(self.sketch.counters) + 3 * 8 * self.candidates.capacity
+
+
+Tracker = Union[ExactTopK, ApproximateTopK]
+
+
+def _track_chunk(task: tuple[Optional[tuple[int, int, int]], str, int, int]) -> Tracker:
+    shape, filename, start, end = task
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode('utf-8')
+    tracker = ExactTopK() if shape is None else ApproximateTopK(*shape)
+    return tracker.add_calls(csv.reader(io.StringIO(text, newline='')))
+
+
+def track_parallel(calls_path: str = 'calls.csv', shape: Optional[tuple[int, int, int]] = None,
+                   workers: Optional[int] = None, chunk_bytes: int = DEFAULT_CHUNK_BYTES) -> Tracker:
+    """
+    Track the talk time of a calls file with a process pool.
+
+    Args:
+        calls_path (str): The calls CSV file.
+        shape (Optional[tuple[int, int, int]]): None for exact totals, or the
+            (capacity, width, depth) of an `ApproximateTopK`.
+        workers (Optional[int]): The number of worker processes; None uses one
+            per CPU and 1 runs everything in this process.
+        chunk_bytes (int): The approximate size of the chunk given to a worker at a time.
+
+    Returns:
+        Tracker: The merged tracker of all chunks.
+    """
+    tasks = [(shape, calls_path, start, end) for start, end in chunk_boundaries(calls_path, chunk_bytes)]
+    tracker = ExactTopK() if shape is None else ApproximateTopK(*shape)
+    if workers == 1 or len(tasks) <= 1:
+        for task in tasks:
+            tracker.merge(_track_chunk(task))
+        return tracker
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for partial in pool.map(_track_chunk, tasks):
+            tracker.merge(partial)
+    return tracker
+
+
+def _report(top: list[tuple[str, int]]) -> str:
+    return '\n'.join(f"<{number}> spent <{seconds}> seconds on the phone." for number, seconds in top)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', default='calls.csv')
+    parser.add_argument('-k', type=int, default=10, help="the number of talkers to report")
+    parser.add_argument('--approximate', action='store_true', help="track in bounded memory with sketches")
+    parser.add_argument('--capacity', type=int, default=1000, help="the numbers monitored by Space-Saving")
+    parser.add_argument('--width', type=int, default=2048, help="the counters per Count-Min row")
+    parser.add_argument('--depth', type=int, default=4, help="the Count-Min rows")
+    parser.add_argument('--workers', type=int, default=1, help="the number of worker processes")
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_BYTES / 2**20,
+                        help="the approximate chunk size, in megabytes")
+    parser.add_argument('--every', type=int, default=0,
+                        help="report the top k every this many calls while reading, in this process")
+    args = parser.parse_args()
+
+    shape = (args.capacity, args.width, args.depth) if args.approximate else None
+    if args.every > 0:
+        tracker = ExactTopK() if shape is None else ApproximateTopK(*shape)
+        for index, record in enumerate(read_records(args.calls), 1):
+            tracker.add_calls((record,))
+            if index % args.every == 0:
+                print(f"After {index} calls:\n{_report(tracker.top(args.k))}")
+    else:
+        tracker = track_parallel(args.calls, shape, args.workers, max(1, int(args.chunk_mb * 2**20)))
+    print(_report(tracker.top(args.k)))
+
+
+if __name__ == '__main__':
+    main()
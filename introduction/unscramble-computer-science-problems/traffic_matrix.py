@@ -0,0 +1,277 @@
+"""
+Task3 for every origin: the full matrix of calls between area codes and
+mobile prefixes, from which the codes called and the share of calls to
+each code follow for any origin, not just Bangalore.
+
+`PrefixClassifier` turns a number into its code (see Task3) by walking a
+prefix trie compiled once at import: "(0", digits and ")" for fixed lines,
+"140" for telemarketers, and 7, 8 or 9 then three digits for mobile
+prefixes. A number that matches no prefix is an error. Every distinct
+number is walked once and then looked up in a cache, and codes are
+interned, so a matrix holds one string per code.
+
+A `TrafficMatrix` is built in one pass over the calls, and matrices of
+chunks merge by adding counts. `matrix_from_columns` builds it from the
+columnar cache of cdr_columns.py: the dictionary of numbers is
+classified once, and calls are counted as pairs of integer code ids.
+
+Usage:
+    python traffic_matrix.py [--calls calls.csv | --cache records.cdrc] [--origin 080 ...] [--csv]
+"""
+import argparse
+import sys
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from typing import Optional
+
+from cdr_columns import CDRColumns, open_columns
+from cdr_engine import read_records
+
+FIXED_LINE = 'fixed line'
+MOBILE = 'mobile'
+TELEMARKETER = 'telemarketer'
+
+
+# The key of a trie node that ends a prefix: (kind, first, last) where the
+# code is number[first:position + last] for the position of the node's character
+_ACCEPT = ''
+_DIGITS = '0123456789'
+
+
+def _compile_trie() -> dict:
+    root: dict = {}
+    # Fixed lines: "(0", any digits, then ")"; the digit node loops on itself
+    digits: dict = {}
+    for digit in _DIGITS:
+        digits[digit] = digits
+    digits[')'] = {_ACCEPT: (FIXED_LINE, 1, 0)}
+    root['('] = {'0': digits}
+    # Telemarketers: "140"
+    root['1'] = {'4': {'0': {_ACCEPT: (TELEMARKETER, 0, 1)}}}
+    # Mobile prefixes: 7, 8 or 9 and three more digits
+    node: dict = {_ACCEPT: (MOBILE, 0, 1)}
+    for _ in range(3):
+        node = dict.fromkeys(_DIGITS, node)
+    for first in '789':
+        root[first] = node
+    return root
+
+
+_TRIE = _compile_trie()
+
+
+class PrefixClassifier:
+    """
+    Classifies phone numbers by area code or mobile prefix.
+    """
+
+    def __init__(self) -> None:
+        # The code of every number seen, and one copy of every code
+        self._numbers: dict[str, str] = {}
+        self._codes: dict[str, str] = {}
+
+    def classify(self, number: str) -> str:
+        """
+        Return the code of a number, as defined in Task3.
+
+        Args:
+            number (str): A fixed line "(0xx)xxxxxxx", mobile "9xxxx xxxxx" or
+                telemarketer "140xxxxxxx" number.
+
+        Returns:
+            str: The digits between the parentheses of a fixed line, "140" for a
+                telemarketer, and the first four digits of a mobile number.
+
+        Raises:
+            ValueError: If the number does not start with any known prefix.
+        """
+        code = self._numbers.get(number)
+        if code is None:
+            code = self._numbers[number] = self._walk(number)
+        return code
+
+    def _walk(self, number: str) -> str:
+        node = _TRIE
+        for position, char in enumerate(number):
+            node = node.get(char)
+            if node is None:
+                break
+            accept = node.get(_ACCEPT)
+            if accept is not None:
+                _, first, last = accept
+                code = number[first:position + last]
+                return self._codes.setdefault(code, code)
+        raise ValueError(f"{number!r} is not a fixed line, mobile or telemarketer number")
+
+    def classify_column(self, numbers: Iterable[str]) -> list[str]:
+        """
+        Return the code of every number of a column.
+
+        Args:
+            numbers (Iterable[str]): The numbers.
+
+        Returns:
+            list[str]: Their codes, in the same order.
+        """
+        return [self.classify(number) for number in numbers]
+
+    @staticmethod
+    def kind(code: str) -> str:
+        """
+        Return whether a code is a fixed line area code, a mobile prefix or
+        the telemarketer code.
+        """
+        if code == '140':
+            return TELEMARKETER
+        return FIXED_LINE if code.startswith('0') else MOBILE
+
+
+class TrafficMatrix:
+    """
+    The number of calls from every code to every code.
+
+    Attributes:
+        calls (dict[str, dict[str, int]]): The calls by origin code, then by
+            destination code.
+    """
+
+    def __init__(self) -> None:
+        self.calls: dict[str, dict[str, int]] = {}
+
+    def add(self, origin: str, destination: str, count: int = 1) -> None:
+        """
+        Count calls from one code to another.
+        """
+        row = self.calls.get(origin)
+        if row is None:
+            row = self.calls[origin] = {}
+        row[destination] = row.get(destination, 0) + count
+
+    def add_calls(self, calls: Iterable[list[str]],
+                  classifier: Optional[PrefixClassifier] = None) -> "TrafficMatrix":
+        """
+        Count call records (caller, receiver, time, duration).
+
+        Args:
+            calls (Iterable[list[str]]): The records.
+            classifier (Optional[PrefixClassifier]): The classifier to use; by
+                default a new one.
+
+        Returns:
+            TrafficMatrix: This matrix, for chaining.
+        """
+        # One record at a time; the classifier's cache makes repeated numbers a lookup
+        classify = (classifier or PrefixClassifier()).classify
+        add = self.add
+        for record in calls:
+            if record:
+                add(classify(record[0]), classify(record[1]))
+        return self
+
+    def merge(self, other: "TrafficMatrix") -> "TrafficMatrix":
+        """
+        Fold in the counts of another matrix.
+
+        Returns:
+            TrafficMatrix: This matrix, for chaining.
+        """
+        for origin, row in other.calls.items():
+            for destination, count in row.items():
+                self.add(origin, destination, count)
+        return self
+
+    def origins(self) -> list[str]:
+        """
+        Return the codes that made calls, sorted.
+        """
+        return sorted(self.calls)
+
+    def destinations(self, origin: str) -> list[str]:
+        """
+        Return the codes called from an origin, sorted (Task3 Part A for Bangalore).
+        """
+        return sorted(self.calls.get(origin, ()))
+
+    def total(self, origin: str) -> int:
+        """
+        Return the number of calls made from an origin.
+        """
+        return sum(self.calls.get(origin, {}).values())
+
+    def percentage(self, origin: str, destination: str) -> float:
+        """
+        Return the percentage of calls from an origin made to a destination
+        (Task3 Part B for Bangalore to Bangalore), or 0.0 if the origin made none.
+        """
+        total = self.total(origin)
+        if total == 0:
+            return 0.0
+        return self.calls[origin].get(destination, 0) / total * 100
+
+    def percentages(self, origin: str) -> dict[str, float]:
+        """
+        Return the percentage of calls from an origin made to every destination, by destination.
+        """
+        total = self.total(origin)
+        row = self.calls.get(origin, {})
+        return {destination: row[destination] / total * 100 for destination in sorted(row)}
+
+
+def matrix_from_columns(columns: CDRColumns, classifier: Optional[PrefixClassifier] = None) -> TrafficMatrix:
+    """
+    Build the matrix from a columnar cache, classifying every distinct number once.
+
+    Args:
+        columns (CDRColumns): The records.
+        classifier (Optional[PrefixClassifier]): The classifier to use; by default a new one.
+
+    Returns:
+        TrafficMatrix: The calls between codes.
+    """
+    classifier = classifier or PrefixClassifier()
+    number_codes = classifier.classify_column(columns.numbers)
+    codes = list(dict.fromkeys(number_codes))
+    code_ids = {code: code_id for code_id, code in enumerate(codes)}
+    code_of: Sequence[int] = [code_ids[code] for code in number_codes]
+    # One integer per (origin, destination) pair
+    width = len(codes)
+    pairs = Counter(code_of[caller] * width + code_of[receiver]
+                    for caller, receiver in zip(columns.call_callers, columns.call_receivers))
+    matrix = TrafficMatrix()
+    for pair, count in pairs.items():
+        origin, destination = divmod(pair, width)
+        matrix.add(codes[origin], codes[destination], count)
+    return matrix
+
+
+def origin_report(matrix: TrafficMatrix, origin: str) -> list[str]:
+    lines = [f"The numbers called from <{origin}> have codes:"]
+    lines.extend(f"{destination} {share:.2f}%" for destination, share in matrix.percentages(origin).items())
+    lines.append(f"<{matrix.percentage(origin, origin):.2f}> percent of calls from <{origin}> are calls to <{origin}>.")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', default='calls.csv')
+    parser.add_argument('--cache', help="read the calls from this cache of cdr_columns.py instead")
+    parser.add_argument('--origin', nargs='+', default=['080'], help="the codes to report on")
+    parser.add_argument('--csv', action='store_true', help="print the whole matrix as origin,destination,calls,percent")
+    args = parser.parse_args()
+
+    if args.cache is not None:
+        matrix = matrix_from_columns(open_columns(args.cache))
+    else:
+        matrix = TrafficMatrix().add_calls(read_records(args.calls))
+    if args.csv:
+        sys.stdout.write("origin,destination,calls,percent\n")
+        for origin in matrix.origins():
+            for destination, share in matrix.percentages(origin).items():
+                sys.stdout.write(f"{origin},{destination},{matrix.calls[origin][destination]},{share:.2f}\n")
+        return
+    for origin in args.origin:
+        print('\n'.join(origin_report(matrix, origin)))
+
+
+if __name__ == '__main__':
+    main()